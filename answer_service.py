@@ -0,0 +1,351 @@
+"""
+Общий сервис базы ответов для всех процессов бота.
+
+Сервис (AnswerService) держит одну KnowledgeBase и отвечает по HTTP на
+localhost; процессы бота (pool_runner, daemon, scheduler) спрашивают его
+через AnswerClient вместо того, чтобы каждый собирал свою копию базы:
+
+    GET  /lookup?q=...                  - самый похожий вопрос и ответы на него
+    POST /learn {"question", "answers"} - правильные ответы, узнанные после отправки
+    GET  /changes?since=N&epoch=...     - ожидание изменений базы (long-poll)
+    GET  /stats                         - число вопросов в базе
+
+AnswerClient кэширует ответы сервиса в LRU (ANSWER_SERVICE["cache_size"]),
+а фоновый поток держит запрос /changes: как только база изменилась
+(ответ выучен любым процессом или поменялись файлы-источники), из кэша
+удаляются затронутые вопросы и все неизвестные. Выученный одним процессом
+ответ остальные получают сразу, без промаха и без перечитывания файлов.
+
+Если сервис недоступен, клиент загружает базу в своем процессе
+(KnowledgeBase.load) и через retry_interval снова пробует сервис.
+
+Запуск сервиса:
+    python answer_service.py
+Проверка и обучение вручную:
+    python answer_service.py --lookup "Текст вопроса"
+    python answer_service.py --learn "Текст вопроса" "Ответ 1" "Ответ 2"
+"""
+
+import argparse
+import collections
+import json
+import logging
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from config import ANSWER_SERVICE
+from knowledge_base import KnowledgeBase
+from option_matcher import AnswerSet
+from question_index import QuestionMatch
+from utils import canonical_text, setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerService:
+    """База ответов с номером версии и журналом изменений для сброса кэшей клиентов"""
+
+    def __init__(self, knowledge_base: Optional[KnowledgeBase] = None, changelog: int = ANSWER_SERVICE["changelog"]):
+        self.knowledge_base = knowledge_base if knowledge_base is not None else KnowledgeBase.load()
+        self.epoch = uuid.uuid4().hex       # Новый при каждом запуске: клиенты сбрасывают кэш целиком
+        self.version = 0
+        self._changes = collections.deque(maxlen=changelog)    # (версия, каноническая форма вопроса)
+        self._reset_version = 0             # Последняя версия, после которой сбрасывается весь кэш
+        self._condition = threading.Condition()
+
+    def lookup(self, text: str) -> dict:
+        with self._condition:
+            if self.knowledge_base.refresh():
+                # Изменились файлы-источники: что именно поменялось, не отслеживается
+                self._bump(None)
+            match = self.knowledge_base.lookup(text)
+            if match is None:
+                return {"question": None, "epoch": self.epoch, "version": self.version}
+            return {"question": match.question, "score": match.score,
+                    "answers": self.knowledge_base.answers(match.question), "epoch": self.epoch,
+                    "version": self.version}
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {"questions": len(self.knowledge_base), "epoch": self.epoch, "version": self.version}
+
+    def learn(self, question: str, answers: List[str]) -> dict:
+        with self._condition:
+            learned = self.knowledge_base.learn(question, answers)
+            if learned:
+                self._bump(canonical_text(question))
+                logger.info("🎓 Выучен ответ: %s: %s", question, answers)
+            return {"learned": learned, "epoch": self.epoch, "version": self.version}
+
+    def changes(self, since: int, epoch: Optional[str], timeout: float) -> dict:
+        """Изменения после версии since; ждет их не дольше timeout"""
+        with self._condition:
+            if epoch == self.epoch:
+                self._condition.wait_for(lambda: self.version > since, timeout)
+            if epoch != self.epoch or since < self._reset_version or (
+                    self.version > since and (not self._changes or self._changes[0][0] > since + 1)):
+                return {"epoch": self.epoch, "version": self.version, "reset": True}
+            changed = [question for version, question in self._changes if version > since]
+            return {"epoch": self.epoch, "version": self.version, "reset": False, "changed": changed}
+
+    def watch_sources(self, interval: float):
+        """Фоновая проверка файлов-источников, чтобы клиенты узнавали о правках без запросов"""
+        while True:
+            time.sleep(interval)
+            with self._condition:
+                if self.knowledge_base.refresh():
+                    self._bump(None)
+
+    def _bump(self, question: Optional[str]):
+        self.version += 1
+        if question is None:
+            self._reset_version = self.version
+        else:
+            self._changes.append((self.version, question))
+        self._condition.notify_all()
+
+
+def make_server(service: AnswerService, host: str = ANSWER_SERVICE["host"],
+                port: int = ANSWER_SERVICE["port"]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, data: dict):
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path == "/lookup" and "q" in params:
+                return self._send(200, service.lookup(params["q"]))
+            if url.path == "/changes":
+                timeout = min(float(params.get("timeout", ANSWER_SERVICE["poll_timeout"])),
+                              ANSWER_SERVICE["poll_timeout"])
+                return self._send(200, service.changes(int(params.get("since", 0)), params.get("epoch"), timeout))
+            if url.path == "/stats":
+                return self._send(200, service.stats())
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/learn":
+                return self._send(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                data = json.loads(self.rfile.read(length).decode("utf-8"))
+                question, answers = data["question"], [str(answer) for answer in data["answers"]]
+            except (ValueError, KeyError, TypeError) as e:
+                return self._send(400, {"error": str(e)})
+            self._send(200, service.learn(question, answers))
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+class AnswerClient:
+    """База ответов через сервис с LRU кэшем; тот же интерфейс, что у KnowledgeBase для TestAutomation"""
+
+    def __init__(self, url: Optional[str] = None, cache_size: int = ANSWER_SERVICE["cache_size"],
+                 timeout: float = ANSWER_SERVICE["timeout"], watch: bool = True):
+        self.url = (url or f"http://{ANSWER_SERVICE['host']}:{ANSWER_SERVICE['port']}").rstrip("/")
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.watch = watch
+        # LRU: каноническая форма текста со страницы -> (совпадение, ответы); (None, None) - вопроса нет в базе
+        self._cache: Dict[str, Tuple[Optional[QuestionMatch], Optional[AnswerSet]]] = collections.OrderedDict()
+        self._answer_sets: Dict[str, AnswerSet] = {}    # вопрос из базы -> ответы (только для вопросов из кэша)
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._fallback: Optional[KnowledgeBase] = None
+        self._retry_at = 0.0
+        self._watcher: Optional[threading.Thread] = None
+        self.epoch: Optional[str] = None
+        self.version = 0
+        self.hits = self.misses = 0
+
+    # --- интерфейс KnowledgeBase ---
+
+    def lookup(self, question_text: str) -> Optional[QuestionMatch]:
+        key = canonical_text(question_text)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        self.misses += 1
+
+        data = self._request("GET", "/lookup", params={"q": question_text})
+        if data is None:
+            return self._local().lookup(question_text)
+        if data["question"] is None:
+            entry = (None, None)
+        else:
+            entry = (QuestionMatch(data["question"], data["score"]), AnswerSet(data["answers"]))
+        with self._lock:
+            if data.get("epoch") != self.epoch or data.get("version", 0) < self.version:
+                # Пока шел запрос, база изменилась: ответ мог устареть, в кэш он не попадает
+                return entry[0]
+            self._cache[key] = entry
+            if entry[0] is not None:
+                self._answer_sets[entry[0].question] = entry[1]
+            while len(self._cache) > self.cache_size:
+                _, (match, _) = self._cache.popitem(last=False)
+                if match is not None:
+                    self._answer_sets.pop(match.question, None)
+        return entry[0]
+
+    def answers(self, question: str) -> List[str]:
+        return self.answer_set(question).answers
+
+    def answer_set(self, question: str) -> AnswerSet:
+        with self._lock:
+            answer_set = self._answer_sets.get(question)
+        if answer_set is not None:
+            return answer_set
+        # Вопрос вытеснен из кэша или найден в локальной базе, пока сервис был недоступен
+        self.lookup(question)
+        with self._lock:
+            answer_set = self._answer_sets.get(question)
+        if answer_set is None and self._fallback is not None:
+            return self._fallback.answer_set(question)
+        return answer_set if answer_set is not None else AnswerSet([])
+
+    def learn(self, question: str, answers: List[str]) -> bool:
+        """Отправляет выученные ответы в сервис (или в локальную базу, если сервис недоступен)"""
+        data = self._request("POST", "/learn", json={"question": question, "answers": list(answers)})
+        if data is None:
+            return self._local().learn(question, answers)
+        self._invalidate([canonical_text(question)])
+        return data["learned"]
+
+    @property
+    def questions(self) -> Dict[str, List[str]]:
+        """Вся база; для этого она загружается в процессе"""
+        return self._local().questions
+
+    def __len__(self):
+        """Число вопросов в базе сервиса; база загружается в процессе, только если сервис недоступен"""
+        data = self._request("GET", "/stats")
+        return len(self._local()) if data is None else data["questions"]
+
+    # --- сервис и кэш ---
+
+    def _request(self, method: str, path: str, **kwargs) -> Optional[dict]:
+        """Ответ сервиса или None, если он недоступен (тогда - локальная база до retry_interval)"""
+        if time.monotonic() < self._retry_at:
+            return None
+        try:
+            response = self._session.request(method, self.url + path, timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            if not self._retry_at:
+                logger.warning("Сервис базы ответов недоступен (%s), используется локальная база", type(e).__name__)
+            self._retry_at = time.monotonic() + ANSWER_SERVICE["retry_interval"]
+            return None
+        if self._retry_at:
+            # Сервис снова доступен: ответы локальной базы могли устареть
+            self._retry_at = 0.0
+            self._invalidate(None)
+        if self.epoch is None:
+            # Кэш заполняется с этой версии: изменения ждем начиная с нее
+            self.epoch, self.version = data.get("epoch"), data.get("version", 0)
+        if self.watch and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="answer-service-watch", daemon=True)
+            self._watcher.start()
+        return data
+
+    def _local(self) -> KnowledgeBase:
+        if self._fallback is None:
+            self._fallback = KnowledgeBase.load()
+        return self._fallback
+
+    def _watch(self):
+        """Long-poll изменений базы: затронутые вопросы и все неизвестные удаляются из кэша"""
+        session = requests.Session()
+        poll_timeout = ANSWER_SERVICE["poll_timeout"]
+        while True:
+            try:
+                response = session.get(self.url + "/changes", timeout=poll_timeout + self.timeout,
+                                       params={"since": self.version, "epoch": self.epoch or "",
+                                               "timeout": poll_timeout})
+                response.raise_for_status()
+                data = response.json()
+            except (requests.RequestException, ValueError):
+                time.sleep(ANSWER_SERVICE["retry_interval"])
+                continue
+            if data["reset"] or data["epoch"] != self.epoch:
+                self._invalidate(None)
+            elif data["changed"]:
+                self._invalidate(data["changed"])
+            self.epoch, self.version = data["epoch"], data["version"]
+
+    def _invalidate(self, changed: Optional[List[str]]):
+        """Сброс кэша: changed - канонические формы изменившихся вопросов, None - весь кэш"""
+        with self._lock:
+            if changed is None:
+                self._cache.clear()
+                self._answer_sets.clear()
+                return
+            changed = set(changed)
+            for key, (match, _) in list(self._cache.items()):
+                # Новый вопрос в базе может подойти к тексту, для которого раньше не было совпадения
+                if match is None or key in changed or canonical_text(match.question) in changed:
+                    del self._cache[key]
+                    if match is not None:
+                        self._answer_sets.pop(match.question, None)
+
+
+def create_knowledge_base(enabled: bool = None):
+    """AnswerClient или KnowledgeBase в процессе в зависимости от config.ANSWER_SERVICE["enabled"]"""
+    if enabled is None:
+        enabled = ANSWER_SERVICE["enabled"]
+    return AnswerClient() if enabled else KnowledgeBase.load()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=ANSWER_SERVICE["host"])
+    parser.add_argument("--port", type=int, default=ANSWER_SERVICE["port"])
+    parser.add_argument("--lookup", metavar="QUESTION", help="Спросить запущенный сервис")
+    parser.add_argument("--learn", nargs="+", metavar="TEXT", help="Вопрос и правильные ответы для запущенного сервиса")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.lookup or args.learn:
+        client = AnswerClient(f"http://{args.host}:{args.port}", watch=False)
+        if args.learn:
+            question, *answers = args.learn
+            print("Выучено" if client.learn(question, answers) else "Ответы уже в базе")
+        else:
+            match = client.lookup(args.lookup)
+            print(f"{match.question} ({match.score:.2f}): {client.answers(match.question)}" if match
+                  else "Вопрос не найден")
+        return
+
+    service = AnswerService()
+    server = make_server(service, args.host, args.port)
+    threading.Thread(target=service.watch_sources, args=(service.knowledge_base.reload_interval,),
+                     name="answer-service-sources", daemon=True).start()
+    print(f"📚 Сервис базы ответов: http://{args.host}:{args.port} ({len(service.knowledge_base)} вопросов)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
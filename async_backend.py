@@ -0,0 +1,291 @@
+"""
+Асинхронный бэкенд прохождения теста поверх CDP (websocket, trio).
+
+Классический TestAutomation на каждом шаге опрашивает страницу командами
+WebDriver: каждая команда - отдельный HTTP запрос к chromedriver. Здесь
+браузер сам сообщает об изменениях:
+
+    - в страницу (и в каждую следующую после перехода, через
+      Page.addScriptToEvaluateOnNewDocument) встраивается MutationObserver,
+      который при изменении вопроса, вариантов или кнопок вызывает
+      привязку Runtime.addBinding с JSON состоянием страницы;
+    - события Runtime.bindingCalled приходят по websocket без опроса;
+    - клики по вариантам и по кнопке "Ответить"/"Завершить" выполняются
+      одной командой Runtime.evaluate, ожидание кнопки - внутри страницы.
+
+Решение, какие варианты выбрать, принимает тот же TestAutomation.choose_options,
+поэтому база ответов, журнал неизвестных вопросов и метрики общие.
+Синхронный API не меняется; бэкенд выбирается в config.BACKEND.
+
+    automation = AsyncTestAutomation(driver)
+    trio.run(automation.run_automation)
+"""
+
+import json
+import logging
+import time
+from typing import List, NamedTuple, Optional
+
+import trio
+
+from config import RECOVERY, SELECTORS, WAIT_TIMEOUTS
+from test_automation import TestAutomation
+from unknown_journal import question_hash
+from utils import log_context
+
+logger = logging.getLogger(__name__)
+
+BINDING = "__levelupState"
+
+# Встраивается в страницу; селекторы подставляются при сборке скрипта
+OBSERVER_SCRIPT = """
+(() => {
+    if (window.__levelupAct) return;
+    const selectors = %(selectors)s;
+    const selectedClasses = %(selected_classes)s;
+
+    function findAll(selector) {
+        if (selector.startsWith('/') || selector.startsWith('(')) {
+            const found = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            const nodes = [];
+            for (let i = 0; i < found.snapshotLength; i++) nodes.push(found.snapshotItem(i));
+            return nodes;
+        }
+        return Array.from(document.querySelectorAll(selector));
+    }
+
+    function visible(selector) {
+        const element = findAll(selector)[0];
+        return element && element.getClientRects().length ? element : null;
+    }
+
+    function isSelected(target) {
+        return selectedClasses.some(name => target.classList.contains(name))
+            || target.getAttribute('aria-checked') === 'true' || target.getAttribute('aria-pressed') === 'true';
+    }
+
+    function options() {
+        return findAll(selectors.answer_options).filter(span => span.innerText.trim());
+    }
+
+    function state() {
+        const question = findAll(selectors.question)[0];
+        return {
+            question: question ? question.innerText.trim() : null,
+            options: options().map(span => span.innerText.trim()),
+            submit: !!visible(selectors.submit_button),
+            complete: !!visible(selectors.complete_button),
+        };
+    }
+
+    // Сообщаем только об изменившемся состоянии, не чаще раза за задачу
+    let last = null, scheduled = false;
+    function report() {
+        scheduled = false;
+        const current = JSON.stringify(state());
+        if (current !== last) {
+            last = current;
+            window.%(binding)s(current);
+        }
+    }
+    function schedule() {
+        if (!scheduled) {
+            scheduled = true;
+            setTimeout(report, 0);
+        }
+    }
+
+    // Текущее состояние по запросу (после сбоя, когда событий об изменениях нет)
+    window.__levelupRead = () => JSON.stringify(state());
+
+    // Клики по вариантам, затем по первой появившейся кнопке "Ответить" или "Завершить".
+    // Уже выбранные варианты (после повтора) не кликаются: повторный клик снял бы выбор
+    window.__levelupAct = async (indices, timeout) => {
+        const spans = options();
+        const clicked = [];
+        for (const index of indices) {
+            const parent = spans[index] && spans[index].parentElement;
+            const target = parent ? parent.querySelector(':scope > ' + selectors.answer_container + ' > div') : null;
+            if (target) {
+                if (!isSelected(target)) target.click();
+                clicked.push(index);
+            }
+        }
+        const deadline = Date.now() + timeout;
+        while (true) {
+            const submit = visible(selectors.submit_button);
+            if (submit) { submit.click(); return {clicked: clicked, action: 'submit'}; }
+            const complete = visible(selectors.complete_button);
+            if (complete) { complete.click(); return {clicked: clicked, action: 'complete'}; }
+            if (Date.now() > deadline) return {clicked: clicked, action: null};
+            await new Promise(resolve => setTimeout(resolve, 16));
+        }
+    };
+
+    function start() {
+        new MutationObserver(schedule).observe(document.documentElement,
+            {subtree: true, childList: true, characterData: true, attributes: true});
+        schedule();
+    }
+    if (document.readyState === 'loading') document.addEventListener('DOMContentLoaded', start);
+    else start();
+})();
+"""
+
+
+class PageState(NamedTuple):
+    question: Optional[str]
+    options: List[str]
+    submit: bool        # Видна кнопка "Ответить"
+    complete: bool      # Видна кнопка "Завершить"
+
+    @property
+    def finished(self) -> bool:
+        """Вопросов больше нет, осталась только кнопка "Завершить" """
+        return self.complete and not self.submit
+
+
+def build_observer_script() -> str:
+    return OBSERVER_SCRIPT % {"selectors": json.dumps(SELECTORS, ensure_ascii=False), "binding": BINDING,
+                              "selected_classes": json.dumps(RECOVERY["selected_classes"])}
+
+
+class AsyncTestAutomation:
+    def __init__(self, driver, automation: TestAutomation = None, **kwargs):
+        """kwargs передаются в TestAutomation (metrics, knowledge_base, unknown_journal, history)"""
+        self.automation = automation or TestAutomation(driver, **kwargs)
+        self.driver = self.automation.driver
+        self.metrics = self.automation.metrics
+        self.session = None
+        self.devtools = None
+        self.events = None
+
+    async def run_automation(self):
+        """Основной цикл автоматизации"""
+        with log_context(run_id=self.automation.run_id):
+            return await self._run_connected()
+
+    async def _run_connected(self):
+        logger.info("⚡ Запуск автоматизации (CDP)")
+        async with self.driver.bidi_connection() as connection:
+            self.session, self.devtools = connection.session, connection.devtools
+            await self._install()
+            try:
+                return await self._run()
+            finally:
+                self.events.close()
+
+    async def _install(self):
+        """Привязка для событий страницы и наблюдатель в текущей и всех следующих страницах"""
+        runtime, page = self.devtools.runtime, self.devtools.page
+        self.events = self.session.listen(runtime.BindingCalled, buffer_size=64)
+        await self.session.execute(runtime.enable())
+        await self.session.execute(page.enable())
+        await self.session.execute(runtime.add_binding(name=BINDING))
+        script = build_observer_script()
+        await self.session.execute(page.add_script_to_evaluate_on_new_document(source=script))
+        await self._evaluate(script)
+
+    async def _run(self):
+        questions_count = 0
+        with self.metrics.span("question_fetch"):
+            state = await self.wait_state(lambda s: bool(s.question) or s.finished, WAIT_TIMEOUTS["first_question"])
+        if state is None:
+            logger.warning("🌚 Вопрос не найден")
+            return questions_count
+
+        retries = 0
+        while state and not state.finished:
+            if not retries:
+                questions_count += 1
+                logger.info("--- Вопрос %d ---", questions_count)
+            with self.metrics.span("question"), log_context(question_id=question_hash(state.question)):
+                state, sent = await self._run_question(state)
+            if sent:
+                retries = 0
+                continue
+            # Ответ не отправлен: вопрос повторяется по перечитанному состоянию страницы
+            retries += 1
+            if retries > RECOVERY["question_retries"]:
+                logger.error("🛑 Лимит повторов вопроса исчерпан")
+                state = None
+
+        if state and state.finished:
+            await self.act([])
+            logger.info("🏁 Прохождение теста завершено")
+        self.metrics.export()
+        self.automation.history.finish_run()
+        return questions_count
+
+    async def _run_question(self, state: PageState):
+        """Ответ на вопрос: (следующее состояние страницы, ответ отправлен)"""
+        started = time.perf_counter()
+        decision = self.automation.decide(state.question, state.options)
+        if not decision.indices:
+            # Вариантов на странице нет: кнопку не нажимаем, страница перечитывается
+            logger.warning("🌚 Не удалось найти варианты ответов")
+            self._record(state, decision, [], "no_options", started)
+            return await self.read_state(), False
+
+        with self.metrics.span("click"):
+            result = await self.act(decision.indices)
+        clicked = result.get("clicked", [])
+        logger.info("Выбрано %d из %d ответов", len(clicked), len(decision.indices))
+        action = result.get("action")
+        if action is None:
+            logger.warning("🌚 Ответ не отправлен: %s", result.get("error") or "кнопка не появилась")
+            self._record(state, decision, clicked, "submit_failed" if clicked else "click_failed", started)
+            return await self.read_state(), False
+
+        outcome = "submitted" if action == "submit" else "complete"
+        self._record(state, decision, clicked, outcome, started)
+        if outcome != "submitted":
+            logger.info("🚀 Прохождение теста завершено")
+            return None, True
+        logger.info("✅ Ответ отправлен")
+
+        previous = state.question
+        with self.metrics.span("question_fetch"):
+            return await self.wait_state(lambda s: (s.question and s.question != previous) or s.finished,
+                                         WAIT_TIMEOUTS["next_question"]), True
+
+    def _record(self, state: PageState, decision, clicked: List[int], outcome: str, started: float):
+        self.automation.history.record(state.question, state.options, clicked, decision.expected, outcome,
+                                       time.perf_counter() - started)
+
+    async def read_state(self) -> Optional[PageState]:
+        """Текущее состояние страницы; если страница в переходе - первое состояние из событий"""
+        try:
+            return PageState(**json.loads(await self._evaluate("window.__levelupRead()")))
+        except Exception:
+            return await self.wait_state(lambda s: bool(s.question) or s.finished, WAIT_TIMEOUTS["next_question"])
+
+    async def wait_state(self, condition, timeout: float) -> Optional[PageState]:
+        """Первое состояние страницы из событий, для которого condition истинно"""
+        with trio.move_on_after(timeout):
+            async for event in self.events:
+                if event.name != BINDING:
+                    continue
+                state = PageState(**json.loads(event.payload))
+                if condition(state):
+                    return state
+        return None
+
+    async def act(self, indices: List[int]) -> dict:
+        """Клики по вариантам и по кнопке одной командой; action None - кнопка не нажата или результат неизвестен"""
+        expression = f"window.__levelupAct({json.dumps(indices)}, {WAIT_TIMEOUTS['buttons'] * 1000})"
+        try:
+            return await self._evaluate(expression) or {"clicked": [], "action": None}
+        except Exception as e:
+            # Результат не получен (например, страница ушла в переход): успехом это не считается,
+            # состояние страницы перечитывается
+            message = str(e).splitlines()
+            return {"clicked": [], "action": None, "error": message[0] if message else type(e).__name__}
+
+    async def _evaluate(self, expression: str):
+        result, exception = await self.session.execute(
+            self.devtools.runtime.evaluate(expression=expression, return_by_value=True, await_promise=True)
+        )
+        if exception is not None:
+            raise RuntimeError(exception.text)
+        return result.value
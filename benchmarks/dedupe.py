@@ -0,0 +1,57 @@
+"""
+Скорость поиска повторов dedupe_bank на синтетической базе.
+
+База из --size вопросов (как в benchmarks.lookup), четверть из них -
+перефразированные копии (пробелы, ё, кавычки, опечатка), часть с другими
+ответами. Замеряется построение TF-IDF матрицы, блочный подсчет похожести
+и сборка кластеров; проверяется, что найдены добавленные повторы.
+
+Запуск из корня проекта:
+    python -m benchmarks.dedupe
+    python -m benchmarks.dedupe --size 20000 --threshold 0.9
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.lookup import make_corpus, perturb
+from dedupe_bank import Entry, build_clusters, ngram_matrix, similar_pairs
+from utils import canonical_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = make_corpus(args.size * 3 // 4, rng)
+    entries = [Entry(question, answers, "base", 0) for question, answers in corpus.items()]
+    planted = 0
+    for question, answers in rng.sample(list(corpus.items()), args.size - len(entries)):
+        copy_answers = answers if rng.random() < 0.8 else [f"{answers[0]} (другой)"]
+        entries.append(Entry(perturb(question, rng), copy_answers, "copies", 1))
+        planted += 1
+    rng.shuffle(entries)
+
+    started = time.perf_counter()
+    matrix = ngram_matrix([canonical_text(entry.question) for entry in entries])
+    vectorized = time.perf_counter()
+    rows, _ = similar_pairs(matrix, args.threshold)
+    compared = time.perf_counter()
+    clusters = build_clusters(entries, args.threshold)
+    finished = time.perf_counter()
+
+    found = sum(1 for cluster in clusters if {entry.source for entry in cluster.entries} == {"base", "copies"})
+    conflicts = sum(cluster.conflict for cluster in clusters)
+    print(f"Вопросов: {len(entries)}, матрица {matrix.shape[0]}x{matrix.shape[1]}, ненулевых {matrix.nnz}")
+    print(f"TF-IDF: {vectorized - started:.2f} с, похожесть блоками: {compared - vectorized:.2f} с, пар: {len(rows)}")
+    print(f"Полный build_clusters: {finished - compared:.2f} с")
+    print(f"Найдено повторов: {found} из {planted}, с конфликтом ответов: {conflicts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Сквозной замер: настоящая автоматизация против локального тестового сервера.
+
+Поднимает mock_server.MockQuizServer, запускает Chrome без окна и проходит
+тест через TestAutomation.run_automation с замерами instrumentation.Metrics.
+Выводит вопросы в секунду, p50/p95 времени на вопрос и количество команд WebDriver.
+С --backend можно сравнить задержку на вопрос у нескольких способов прохождения:
+classic (команды WebDriver), async (CDP, async_backend.py) и http (запросы
+без браузера, http_mode.py).
+
+Запуск из корня проекта:
+    python -m benchmarks.e2e
+    python -m benchmarks.e2e --questions 50 --latency 0.05 --runs 3
+    python -m benchmarks.e2e --backend classic async http
+"""
+
+import argparse
+import statistics
+import time
+from collections import Counter
+
+from browser import create_driver
+from instrumentation import Metrics
+from mock_server import MockQuizServer
+from run_history import NullHistory
+from test_automation import TestAutomation
+
+BACKENDS = ("classic", "async", "http")
+
+
+def run_once(url, backend="classic"):
+    """Одно прохождение; возвращает (время по вопросам, общее время, команды WebDriver)"""
+    metrics = Metrics()
+    if backend == "http":
+        from http_mode import HttpAutomation, HttpQuizClient
+
+        started = time.perf_counter()
+        HttpAutomation(HttpQuizClient(url), metrics=metrics, history=NullHistory()).run_automation()
+        question = metrics.spans.get("question")
+        return (question.samples if question else []), time.perf_counter() - started, Counter()
+
+    with create_driver(lean=True) as driver:
+        driver.get(url)
+        automation = TestAutomation(driver, metrics=metrics, history=NullHistory())
+        started = time.perf_counter()
+        if backend == "async":
+            import trio
+            from async_backend import AsyncTestAutomation
+
+            trio.run(AsyncTestAutomation(driver, automation).run_automation)
+        else:
+            automation.run_automation()
+        finished = time.perf_counter()
+
+    question = metrics.spans.get("question")
+    commands = Counter({command: len(timing.samples) for command, timing in metrics.commands.items()})
+    return (question.samples if question else []), finished - started, commands
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_backend(server, backend, runs):
+    latencies, total_seconds, commands = [], 0.0, Counter()
+    for _ in range(runs):
+        per_question, seconds, run_commands = run_once(server.url, backend)
+        latencies += per_question
+        total_seconds += seconds
+        commands += run_commands
+    return latencies, total_seconds, commands
+
+
+def report(backend, latencies, total_seconds, commands):
+    print(f"\n=== {backend} ===")
+    print(f"Вопросов в секунду: {len(latencies) / total_seconds:.2f}")
+    print(f"На вопрос: p50 {percentile(latencies, 0.5) * 1000:.0f} мс, p95 {percentile(latencies, 0.95) * 1000:.0f} мс,"
+          f" среднее {statistics.mean(latencies) * 1000:.0f} мс")
+    total_commands = sum(commands.values())
+    print(f"Команд WebDriver: {total_commands} ({total_commands / max(len(latencies), 1):.1f} на вопрос)")
+    for command, count in commands.most_common():
+        print(f"  {command:<30} {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--options", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка сервера, секунды")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=["classic"])
+    args = parser.parse_args()
+
+    backends = list(dict.fromkeys(args.backend))
+    with MockQuizServer(port=0, questions=args.questions, options=args.options, latency=args.latency) as server:
+        results = {backend: run_backend(server, backend, args.runs) for backend in backends}
+        stats = server.stats()
+
+    print(f"Прохождений: {stats['completed']}, правильно: {stats['correct']}/{stats['answered']}")
+    for backend, result in results.items():
+        report(backend, *result)
+
+    if len(results) > 1:
+        baseline = backends[0]
+        print()
+        for backend in backends[1:]:
+            ratio = statistics.mean(results[baseline][0]) / statistics.mean(results[backend][0])
+            print(f"{backend} быстрее {baseline} в {ratio:.1f} раза по среднему времени на вопрос")
+
+
+if __name__ == "__main__":
+    main()
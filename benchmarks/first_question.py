@@ -0,0 +1,51 @@
+"""
+Время до первого вопроса: обычный профиль браузера против облегченного (LEAN_PROFILE).
+
+Замеряется путь от запуска Chrome до появления вопроса на странице:
+старт браузера, driver.get и ожидание question_ready.
+
+Запуск из корня проекта:
+    python -m benchmarks.first_question --runs 5
+    python -m benchmarks.first_question --url http://127.0.0.1:8000/ --profile profiles/ivanov
+"""
+
+import argparse
+import statistics
+import time
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from browser import create_driver
+from config import LEVEL_UP_URL, WAIT_POLL_INTERVAL, WAIT_TIMEOUTS
+from waits import question_ready
+
+
+def time_to_first_question(url, lean, profile=None):
+    """Секунды до запуска браузера, до загрузки страницы и до первого вопроса"""
+    started = time.perf_counter()
+    with create_driver(profile, lean=lean) as driver:
+        launched = time.perf_counter()
+        driver.get(url)
+        loaded = time.perf_counter()
+        WebDriverWait(driver, WAIT_TIMEOUTS["first_question"], WAIT_POLL_INTERVAL).until(question_ready)
+        ready = time.perf_counter()
+    return launched - started, loaded - started, ready - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=LEVEL_UP_URL)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--profile", help="Каталог профиля Chrome с авторизацией")
+    args = parser.parse_args()
+
+    for lean in (False, True):
+        timings = [time_to_first_question(args.url, lean, args.profile) for _ in range(args.runs)]
+        launched, loaded, ready = (statistics.median(column) for column in zip(*timings))
+        name = "облегченный" if lean else "обычный"
+        print(f"{name:<12} запуск: {launched:6.2f} с  driver.get: {loaded:6.2f} с  первый вопрос: {ready:6.2f} с"
+              f"  (медиана из {args.runs})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Сравнение старого линейного поиска вопроса с индексом QuestionIndex
+на синтетической базе из 50 000 вопросов.
+
+Запуск из корня проекта:
+    python -m benchmarks.lookup
+    python -m benchmarks.lookup --size 10000 --queries 500
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from question_index import QuestionIndex
+from utils import normalize_text
+
+LETTERS = "абвгдежзийклмнопрстуфхцчшщыэюя"
+
+
+def legacy_find_best_match(question_text: str, questions_dict: Dict[str, List[str]]) -> Optional[str]:
+    """Прежняя реализация utils.find_best_match: нормализация всех ключей на каждый вызов"""
+    normalized_input = normalize_text(question_text)
+
+    best_match = None
+    best_score = 0
+
+    for question in questions_dict.keys():
+        normalized_question = normalize_text(question)
+
+        if normalized_input in normalized_question or normalized_question in normalized_input:
+            score = len(set(normalized_input.split()) & set(normalized_question.split()))
+            if score > best_score:
+                best_score = score
+                best_match = question
+
+    return best_match
+
+
+def make_corpus(size: int, rng: random.Random) -> Dict[str, List[str]]:
+    # Словарь из нескольких тысяч "слов" - порядка лексики реальной базы вопросов
+    vocabulary = ["".join(rng.choices(LETTERS, k=rng.randint(2, 10))) for _ in range(5_000)]
+    corpus = {}
+    while len(corpus) < size:
+        words = rng.choices(vocabulary, k=rng.randint(6, 16))
+        question = f"{' '.join(words).capitalize()} №{rng.randint(1, 10 ** 6)}?"
+        corpus[question] = [f"Ответ {len(corpus)}"]
+    return corpus
+
+
+def perturb(question: str, rng: random.Random) -> str:
+    """Те же различия, что встречаются на странице: пробелы, кавычки, пунктуация, ё, опечатки"""
+    text = question.replace(" ", "  ", 1).rstrip("?")
+    if rng.random() < 0.5:
+        # Опечатка: пропущенная буква - точного совпадения нет, работает поиск по триграммам
+        position = rng.randrange(len(text))
+        text = text[:position] + text[position + 1:]
+    text = text.replace("е", "ё", 1) if rng.random() < 0.5 else f"«{text}»"
+    return text + rng.choice(["", " ?", "."])
+
+
+def timed(lookup, queries):
+    durations, found = [], 0
+    for query, expected in queries:
+        started = time.perf_counter()
+        result = lookup(query)
+        durations.append(time.perf_counter() - started)
+        found += result == expected
+    return durations, found
+
+
+def report(name, durations, found):
+    durations = sorted(durations)
+    p95 = durations[int(len(durations) * 0.95) - 1]
+    print(f"{name:<10} запросов: {len(durations):>5}  найдено: {found / len(durations):6.1%}  "
+          f"среднее: {statistics.mean(durations) * 1000:9.3f} мс  p95: {p95 * 1000:9.3f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50_000, help="Количество вопросов в базе")
+    parser.add_argument("--queries", type=int, default=2_000, help="Количество запросов к индексу")
+    parser.add_argument("--legacy-queries", type=int, default=20, help="Количество запросов к старому поиску")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = make_corpus(args.size, rng)
+    questions = list(corpus)
+    queries = []
+    for _ in range(args.queries):
+        question = rng.choice(questions)
+        queries.append((perturb(question, rng), question))
+
+    started = time.perf_counter()
+    index = QuestionIndex(corpus)
+    print(f"База: {len(corpus)} вопросов, построение индекса: {time.perf_counter() - started:.2f} с")
+
+    report("индекс", *timed(lambda query: getattr(index.lookup(query), "question", None), queries))
+    report("линейный", *timed(lambda query: legacy_find_best_match(query, corpus), queries[:args.legacy_queries]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Пропускная способность слоя решений без браузера.
+
+Строит синтетический корпус трасс из базы ответов (вопросы с теми же
+отличиями, что встречаются на странице: пробелы, ё, кавычки, точки в ответах)
+и воспроизводит его через session_trace.replay: решения TestAutomation
+(KnowledgeBase + OptionMatcher) и прежний путь utils.find_best_match/validate_answers.
+
+Запуск из корня проекта:
+    python -m benchmarks.replay
+    python -m benchmarks.replay --sessions 5000 --keep traces-bench
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+
+from knowledge_base import KnowledgeBase
+from session_trace import TraceRecorder, read_trace, replay, trace_files
+
+
+def vary(text: str, rng: random.Random) -> str:
+    """Текст, как он может выглядеть на странице"""
+    if rng.random() < 0.3:
+        text = text.rstrip(".")
+    if rng.random() < 0.3:
+        text = text.replace("е", "ё", 1)
+    if rng.random() < 0.2:
+        text = f" {text}  "
+    return text
+
+
+def write_corpus(directory: str, sessions: int, questions_per_session: int, seed: int = 0):
+    """Трассы: по файлу на прохождение, решения из правильных ответов базы"""
+    rng = random.Random(seed)
+    questions = list(KnowledgeBase.load().questions.items())
+    for session in range(sessions):
+        recorder = TraceRecorder(directory, run_id=f"bench-{session:06d}")
+        for question, answers in rng.sample(questions, min(questions_per_session, len(questions))):
+            options = [vary(answer, rng) for answer in answers] + [f"Неверный вариант {k}" for k in range(2)]
+            rng.shuffle(options)
+            plan = [index for index, option in enumerate(options) if not option.startswith("Неверный")]
+            recorder.record(vary(question, rng), options, plan, plan, "submitted", rng.uniform(0.2, 0.6))
+        recorder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=20, help="Вопросов в одном прохождении")
+    parser.add_argument("--keep", help="Сохранить корпус в этот каталог вместо временного")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = args.keep or temporary
+        os.makedirs(directory, exist_ok=True)
+        with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+            write_corpus(directory, args.sessions, args.questions)
+        files = trace_files([directory])
+        entries = [entry for path in files for entry in read_trace(path)]
+
+    print(f"Корпус: {len(files)} трасс, {len(entries)} вопросов")
+    for path in ("automation", "utils"):
+        result = replay(entries, path)
+        print(f"{path:<11} {result.per_second:>10,.0f} решений/с  {result.seconds:6.2f} с"
+              f"  изменилось: {len(result.changed)}, не найдено: {result.unknown}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Холодный старт: время импорта и время до driver.get.
+
+Каждый замер - отдельный процесс Python, как при запуске из планировщика:
+    - python -X importtime -c "import main" и импорт модулей, нужных для прохождения
+      (browser, test_automation), с самыми медленными модулями;
+    - от старта процесса до завершения driver.get для трех способов запуска
+      chromedriver: Selenium Manager, закрепленный драйвер из кэша, резидентный
+      chromedriver (DRIVER_SERVICE).
+
+Итоги дописываются в benchmarks/startup_history.jsonl (файл хранится в git),
+чтобы видеть, как меняется старт от коммита к коммиту.
+
+Запуск из корня проекта:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --url http://127.0.0.1:8000/
+    python -m benchmarks.startup --no-browser
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_history.jsonl")
+MODES = ("selenium_manager", "cached", "resident")
+
+# Выполняется в отдельном процессе: время от старта интерпретатора до конца driver.get
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+mode, url = sys.argv[1], sys.argv[2]
+from browser import create_driver
+from driver_service import ResidentService, cached_driver_path
+from selenium.webdriver.chrome.service import Service
+imported = time.perf_counter()
+service = {"selenium_manager": Service, "cached": lambda: Service(cached_driver_path()), "resident": ResidentService}[mode]()
+driver = create_driver(lean=True, service=service)
+launched = time.perf_counter()
+driver.get(url)
+loaded = time.perf_counter()
+driver.quit()
+print(json.dumps({"import": imported - started, "launch": launched - imported, "get": loaded - started}))
+"""
+
+
+def import_times(module: str):
+    """Общее время импорта модуля и самые медленные модули (по -X importtime), секунды"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(cumulative) / 1e6, len(name) - len(name.lstrip())))
+    # Модули запуска интерпретатора (до site) к импорту модуля не относятся
+    names = [name for name, _, _ in modules]
+    if "site" in names:
+        modules = modules[names.index("site") + 1:]
+    total = next(seconds for name, seconds, _ in reversed(modules) if name == module)
+    top_level = sorted(((name, seconds) for name, seconds, depth in modules if depth <= 3 and name != module),
+                       key=lambda item: item[1], reverse=True)
+    return total, top_level
+
+
+def time_to_get(mode: str, url: str):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", CHILD_SCRIPT, mode, url], capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "ошибка запуска")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    # Добавляем запуск самого интерпретатора
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--url", default="about:blank")
+    parser.add_argument("--no-browser", action="store_true", help="Только время импорта")
+    parser.add_argument("--no-history", action="store_true", help="Не дописывать итоги в историю")
+    args = parser.parse_args()
+
+    entry = {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "revision": git_revision(),
+             "python": platform.python_version(), "import": {}, "driver_get": {}}
+
+    for module in ("main", "browser", "test_automation"):
+        totals = []
+        for _ in range(args.runs):
+            total, top_level = import_times(module)
+            totals.append(total)
+        entry["import"][module] = round(statistics.median(totals), 4)
+        print(f"import {module:<16} {statistics.median(totals) * 1000:7.1f} мс (медиана из {args.runs})")
+        for name, seconds in top_level[:5]:
+            print(f"    {name:<40} {seconds * 1000:7.1f} мс")
+
+    if not args.no_browser:
+        for mode in MODES:
+            try:
+                runs = [time_to_get(mode, args.url) for _ in range(args.runs)]
+            except Exception as e:
+                print(f"{mode:<17} не удалось: {e}")
+                continue
+            median = {key: round(statistics.median(run[key] for run in runs), 4) for key in runs[0]}
+            entry["driver_get"][mode] = median
+            print(f"{mode:<17} импорт: {median['import']:5.2f} с  запуск: {median['launch']:5.2f} с"
+                  f"  до driver.get: {median['total']:5.2f} с")
+
+    if not args.no_history:
+        with open(HISTORY, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        print(f"Итоги добавлены в {HISTORY}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Память: K вкладок в одном Chrome против K отдельных Chrome.
+
+Считается суммарный RSS всех процессов браузера (chromedriver и все его
+дочерние процессы Chrome) после загрузки страницы во всех вкладках/окнах.
+
+Запуск из корня проекта:
+    python -m benchmarks.tabs_memory --tabs 4
+    python -m benchmarks.tabs_memory --tabs 4 --url http://127.0.0.1:8000/
+"""
+
+import argparse
+import time
+
+import psutil
+
+from browser import create_driver
+from config import LEVEL_UP_URL
+
+
+def browser_rss(driver) -> int:
+    """Суммарный RSS chromedriver и всех процессов Chrome, запущенных им"""
+    root = psutil.Process(driver.service.process.pid)
+    total = 0
+    for process in [root] + root.children(recursive=True):
+        try:
+            total += process.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+def measure_tabs(url, count, settle):
+    with create_driver() as driver:
+        for number in range(count):
+            if number:
+                driver.switch_to.new_window("tab")
+            driver.get(url)
+        time.sleep(settle)
+        return browser_rss(driver)
+
+
+def measure_browsers(url, count, settle):
+    drivers = []
+    try:
+        for _ in range(count):
+            driver = create_driver()
+            drivers.append(driver)
+            driver.get(url)
+        time.sleep(settle)
+        return sum(browser_rss(driver) for driver in drivers)
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tabs", type=int, default=4, help="K - количество сессий")
+    parser.add_argument("--url", default=LEVEL_UP_URL)
+    parser.add_argument("--settle", type=float, default=3.0, help="Пауза перед замером, секунды")
+    args = parser.parse_args()
+
+    megabyte = 1024 * 1024
+    tabs = measure_tabs(args.url, args.tabs, args.settle)
+    browsers = measure_browsers(args.url, args.tabs, args.settle)
+    print(f"{args.tabs} вкладок в одном браузере: {tabs / megabyte:8.1f} МБ")
+    print(f"{args.tabs} отдельных браузеров:      {browsers / megabyte:8.1f} МБ")
+    print(f"Экономия: {(browsers - tabs) / megabyte:.1f} МБ ({1 - tabs / browsers:.0%})")
+
+
+if __name__ == "__main__":
+    main()
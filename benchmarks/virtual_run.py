@@ -0,0 +1,182 @@
+"""
+Прохождение теста в виртуальном времени против фейкового драйвера.
+
+TestAutomation работает как обычно (RunMachine, PageWaiter, план кликов,
+человекоподобный темп), но часы - pacing.VirtualClock: паузы, опрос страницы
+и таймауты только передвигают виртуальное время. FakeQuizDriver отвечает на
+скрипты снимка страницы и плана кликов, а следующий вопрос показывает через
+--latency виртуальных секунд после нажатия "Ответить". На последнем вопросе
+вместо "Ответить" видна кнопка "Завершить", и ее нажимает тот же скрипт.
+
+Выводит виртуальное и настоящее время прохождения; 20 вопросов с темпом
+проходятся быстрее секунды. С одинаковым --seed задержки и виртуальное время
+повторяются от запуска к запуску.
+
+Запуск из корня проекта:
+    python -m benchmarks.virtual_run
+    python -m benchmarks.virtual_run --questions 100 --latency 0.5 --seed 7
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import time
+
+from click_plan import CLICK_PLAN_SCRIPT
+from config import MOCK_SERVER, PACING
+from instrumentation import create_metrics
+from knowledge_base import KnowledgeBase
+from locators import RESOLVE_SCRIPT, default_registry
+from mock_server import build_questions
+from pacing import Pacer, VirtualClock
+from page_snapshot import SNAPSHOT_SCRIPT
+from run_history import NullHistory
+from run_state import Checkpoint
+from session_trace import create_recorder
+from test_automation import TestAutomation
+from utils import setup_logging
+
+
+class FakeElement:
+    def __init__(self, action):
+        self._action = action
+
+    def click(self):
+        self._action()
+
+
+class FakeQuizDriver:
+    """Страница теста в памяти; каждый скрипт стоит script_seconds виртуального времени"""
+
+    def __init__(self, clock: VirtualClock, questions, latency: float, script_seconds: float):
+        self.clock = clock
+        self.questions = questions
+        self.latency = latency
+        self.script_seconds = script_seconds
+        self.position = 0
+        self.loading = False
+        self.completed = False
+        self.correct = 0
+        self.scripts = 0
+        self._selected = set()
+
+    def execute_script(self, script, *args):
+        self.scripts += 1
+        self.clock.advance(self.script_seconds)
+        if script is SNAPSHOT_SCRIPT:
+            return self._snapshot()
+        if script is RESOLVE_SCRIPT:
+            return {"found": {name: None for name in args[0]}, "locators": []}
+        return None
+
+    def execute_async_script(self, script, targets, delays_ms, submit_strategies, complete_strategies, timeout_ms,
+                             *args):
+        assert script is CLICK_PLAN_SCRIPT
+        self.scripts += 1
+        self.clock.advance(self.script_seconds)
+        for target, delay in zip(targets, delays_ms):
+            target.click()
+            self.clock.sleep(delay / 1000)
+        action = None
+        if submit_strategies:
+            if self._showing() and not self._last():
+                self._submit()
+                action = "submit"
+            elif self._showing():
+                self._complete()
+                action = "complete"
+            else:
+                # Ни одна кнопка так и не появилась: скрипт ждет до таймаута
+                self.clock.sleep(timeout_ms / 1000)
+        return {"clicked": list(range(len(targets))), "action": action}
+
+    def refresh(self):
+        self._selected = set()
+
+    def _showing(self) -> bool:
+        return not self.loading and not self.completed and self.position < len(self.questions)
+
+    def _last(self) -> bool:
+        return self.position == len(self.questions) - 1
+
+    def _snapshot(self):
+        if not self._showing():
+            return {"question": None, "options": [], "submit": None, "complete": None, "locators": []}
+        question, options, _ = self.questions[self.position]
+        return {
+            "question": question,
+            "options": [{"text": text, "target": FakeElement(lambda text=text: self._selected.add(text))}
+                        for text in options],
+            "submit": None if self._last() else FakeElement(self._submit),
+            "complete": FakeElement(self._complete) if self._last() else None,
+            "locators": [],
+        }
+
+    def _check(self):
+        self.correct += self._selected == set(self.questions[self.position][2])
+        self._selected = set()
+
+    def _submit(self):
+        self._check()
+        self.position += 1
+        self.loading = True
+        self.clock.call_later(self.latency, self._loaded)
+
+    def _loaded(self):
+        self.loading = False
+
+    def _complete(self):
+        self._check()
+        self.position += 1
+        self.completed = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=MOCK_SERVER["questions"])
+    parser.add_argument("--options", type=int, default=MOCK_SERVER["options"])
+    parser.add_argument("--latency", type=float, default=0.3, help="Загрузка следующего вопроса, виртуальные секунды")
+    parser.add_argument("--script-ms", type=float, default=5.0, help="Время одного скрипта в браузере, виртуальные мс")
+    parser.add_argument("--seed", type=int, default=PACING["seed"] if PACING["seed"] is not None else 1)
+    parser.add_argument("--no-pacing", action="store_true", help="Без человекоподобного темпа")
+    parser.add_argument("--verbose", action="store_true", help="Показать вывод прохождения")
+    args = parser.parse_args()
+
+    questions = build_questions(args.questions, args.options)
+    clock = VirtualClock()
+    driver = FakeQuizDriver(clock, questions, args.latency, args.script_ms / 1000)
+    # Статистика локаторов фейковой страницы не сохраняется
+    default_registry().stats_file = None
+
+    with tempfile.TemporaryDirectory() as directory:
+        automation = TestAutomation(
+            driver,
+            metrics=create_metrics(False),
+            knowledge_base=KnowledgeBase.from_questions({question: answers for question, _, answers in questions}),
+            recorder=create_recorder(False),
+            history=NullHistory(),
+            pacer=Pacer(clock, seed=args.seed, enabled=not args.no_pacing),
+        )
+        checkpoint = Checkpoint(os.path.join(directory, "checkpoint.json"))
+        if args.verbose:
+            setup_logging()
+        else:
+            logging.disable(logging.CRITICAL)
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        started = time.perf_counter()
+        with output:
+            automation.run_automation(checkpoint)
+        real_seconds = time.perf_counter() - started
+
+    answered = driver.position
+    print(f"Вопросов: {answered}, правильно: {driver.correct}/{len(questions)}, пройден: {driver.completed}")
+    print(f"Виртуальное время: {clock.now():.1f} с (из них пауз и ожиданий {clock.slept:.1f} с)")
+    print(f"Скриптов в браузере: {driver.scripts}")
+    print(f"Настоящее время: {real_seconds * 1000:.0f} мс ({real_seconds / max(answered, 1) * 1000:.1f} мс на вопрос)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Создание и настройка браузера для автоматизации
+"""
+
+import logging
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.options import Options
+
+from config import BROWSER_CONFIG, LEAN_PROFILE
+from driver_service import create_service, replacement_service
+
+logger = logging.getLogger(__name__)
+
+
+def build_options(user_data_dir=None, lean=None):
+    """
+    Настройки Chrome.
+    user_data_dir - отдельный профиль (куки, авторизация) для аккаунта,
+    lean - облегченный профиль из LEAN_PROFILE (по умолчанию LEAN_PROFILE["enabled"])
+    """
+    if lean is None:
+        lean = LEAN_PROFILE["enabled"]
+
+    options = Options()
+    width, height = BROWSER_CONFIG["window_size"]
+    options.add_argument(f"--window-size={width},{height}")
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+
+    if lean:
+        options.page_load_strategy = LEAN_PROFILE["page_load_strategy"]
+        if LEAN_PROFILE["headless"]:
+            options.add_argument("--headless=new")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--mute-audio")
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+        })
+    return options
+
+
+def block_resources(driver, patterns=None):
+    """Блокирует загрузку ресурсов по шаблонам URL через CDP (картинки, шрифты, медиа, аналитика)"""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns or LEAN_PROFILE["blocked_urls"]})
+
+
+def configure_driver(driver, lean=False):
+    """Применяет BROWSER_CONFIG к запущенному драйверу"""
+    driver.implicitly_wait(BROWSER_CONFIG["implicit_wait"])
+    driver.set_page_load_timeout(BROWSER_CONFIG["page_load_timeout"])
+    if lean:
+        block_resources(driver)
+    return driver
+
+
+def create_driver(user_data_dir=None, lean=None, service=None):
+    """Запускает Chrome с настройками проекта; service по умолчанию - из DRIVER_SERVICE"""
+    if lean is None:
+        lean = LEAN_PROFILE["enabled"]
+    own_service = service is None
+    service = service or create_service()
+    try:
+        driver = webdriver.Chrome(options=build_options(user_data_dir, lean), service=service)
+    except SessionNotCreatedException as e:
+        # Chrome обновился, а chromedriver из кэша остался прежним: переустановка и одна повторная попытка
+        if not own_service or service is None or "version" not in str(e).lower():
+            raise
+        logger.warning("chromedriver не подходит к Chrome: %s", str(e).strip().splitlines()[0])
+        driver = webdriver.Chrome(options=build_options(user_data_dir, lean), service=replacement_service())
+    return configure_driver(driver, lean)
@@ -0,0 +1,99 @@
+"""
+План ответа на вопрос, выполняемый одним вызовом скрипта в браузере.
+
+Решение (какие варианты выбрать и нужно ли сразу нажать "Ответить")
+оформляется как ClickPlan. Браузер получает элементы вариантов из снимка
+страницы, кликает по ним по очереди, при необходимости выдерживает паузы
+между кликами и нажимает "Ответить" или "Завершить" - ту кнопку, которая
+станет видна первой (на последнем вопросе "Ответить" нет).
+В ответ возвращается, какие клики прошли, так что проверка результата
+занимает один запрос к WebDriver вместо запроса на каждый клик.
+"""
+
+from typing import List, NamedTuple, Optional, Sequence
+
+from config import WAIT_TIMEOUTS
+from locators import LOCATE_JS, default_registry
+from page_snapshot import PageSnapshot
+
+# Аргументы: элементы для клика, паузы после каждого клика (мс), способы найти кнопки
+# "Ответить" и "Завершить" или null, сколько ждать кнопку (мс); последний аргумент - callback
+CLICK_PLAN_SCRIPT = """
+const [targets, delays, submitStrategies, completeStrategies, timeout, done] = arguments;
+""" + LOCATE_JS + """
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+(async () => {
+    const clicked = [];
+    for (let i = 0; i < targets.length; i++) {
+        try {
+            targets[i].click();
+            clicked.push(i);
+        } catch (e) {}
+        if (delays[i]) await sleep(delays[i]);
+    }
+
+    let action = null;
+    if (submitStrategies) {
+        const deadline = Date.now() + timeout;
+        while (Date.now() <= deadline) {
+            const submit = isVisible(findFirst(submitStrategies));
+            if (submit) {
+                submit.click();
+                action = 'submit';
+                break;
+            }
+            const complete = isVisible(findFirst(completeStrategies));
+            if (complete) {
+                complete.click();
+                action = 'complete';
+                break;
+            }
+            await sleep(16);
+        }
+    }
+    return {clicked: clicked, action: action};
+})().then(done, error => done({clicked: [], action: null, error: String(error)}));
+"""
+
+
+class ClickPlan(NamedTuple):
+    indices: List[int]      # Номера вариантов на странице в порядке кликов
+    submit: bool = False    # Сразу после кликов нажать "Ответить" (или "Завершить" на последнем вопросе)
+
+
+class ClickResult(NamedTuple):
+    clicked: List[int]              # Номера вариантов, по которым клик прошел
+    action: Optional[str] = None    # Нажатая кнопка: "submit", "complete" или None - кнопка не появилась
+    error: Optional[str] = None
+
+    @property
+    def submitted(self) -> bool:
+        """Нажата кнопка "Ответить" """
+        return self.action == "submit"
+
+    def complete(self, plan: ClickPlan) -> bool:
+        """Все клики плана выполнены"""
+        return len(self.clicked) == len(plan.indices) and (self.action is not None or not plan.submit)
+
+
+def run_click_plan(driver, snapshot: PageSnapshot, plan: ClickPlan, delays: Sequence[float] = (),
+                   registry=None) -> ClickResult:
+    """Выполняет план одним execute_async_script; delays - паузы после каждого клика, секунды"""
+    options = [snapshot.options[index] for index in plan.indices if 0 <= index < len(snapshot.options)]
+    targets = [option for option in options if option.target is not None]
+    if not targets and not plan.submit:
+        return ClickResult([])
+
+    registry = registry or default_registry()
+    delays_ms = [int(delay * 1000) for delay in delays] + [0] * (len(targets) - len(delays))
+    raw = driver.execute_async_script(
+        CLICK_PLAN_SCRIPT,
+        [option.target for option in targets],
+        delays_ms[:len(targets)],
+        registry.ordered("submit_button") if plan.submit else None,
+        registry.ordered("complete_button") if plan.submit else None,
+        WAIT_TIMEOUTS["buttons"] * 1000,
+    )
+    clicked = [targets[position].index for position in raw["clicked"]]
+    return ClickResult(clicked, raw.get("action"), raw.get("error"))
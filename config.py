@@ -1,15 +1,97 @@
-import random
+import os
 
 # Конфигурация проекта
 LEVEL_UP_URL = 'https://levelup.t2.ru/'
 
+QUESTION_OF_THE_DAY_URL = LEVEL_UP_URL    # Страница "Вопрос дня"
+
+# Ожидание открытия игр (scheduler.py): доступность проверяется легким HTTP запросом
+# с куками из браузера, Chrome запускается только когда игра открыта
+SCHEDULER = {
+    "games": {
+        # Игра открыта, если страница отвечает 200 и в ней есть marker (None - достаточно ответа 200)
+        "king_of_the_hill": {"url": LEVEL_UP_URL, "marker": "Начать игру"},
+        "question_of_the_day": {"url": QUESTION_OF_THE_DAY_URL, "marker": "Вопрос дня"},
+    },
+    "cookies_file": "cookies.json",     # Куки, выгруженные из браузера после каждого запуска
+    # Кука сессии авторизации; без нее (или если она истекла) проверка дает unknown и игра проходится
+    # в браузере. None - достаточно любой непросроченной куки
+    "session_cookie": None,
+    "request_timeout": 10,              # Таймаут проверки, секунды
+    "initial_delay": 60,                # Первая пауза между проверками, секунды
+    "max_delay": 1800,                  # Максимальная пауза между проверками
+    "backoff_factor": 2.0,              # Во сколько раз растет пауза после каждой неудачной проверки
+    "jitter": 0.2,                      # Случайное отклонение паузы, доля от нее
+    "deadline": 12 * 3600,              # Сколько всего ждать открытия игр, секунды
+}
+
+# Резидентный режим (daemon.py): браузер остается запущенным между прогонами по расписанию.
+# Перед каждым прогоном снимаются память и CPU браузера; превышение любого из порогов
+# limits - перезапуск браузера до прогона
+DAEMON = {
+    "games": list(SCHEDULER["games"]),  # Игры, которые ждать и проходить каждый день
+    "start_time": "09:00",              # Ежедневное начало ожидания игр (местное время)
+    "sample_interval": 300,             # Замер браузера между прогонами, секунды
+    "blank_between_runs": True,         # Между прогонами держать открытой about:blank, чтобы освободить память вкладки
+    "limits": {
+        "browser_rss_mb": 1500,         # Суммарный RSS всех процессов браузера
+        "renderer_rss_mb": 600,         # RSS самого большого процесса отрисовки
+        "js_heap_mb": 256,              # Занятая куча JS вкладки (CDP Performance.getMetrics)
+        "dom_nodes": 50000,             # Узлов DOM во вкладке
+        "cpu_percent": 50,              # CPU процессов браузера в простое, проценты одного ядра
+        "runs": 50,                     # Прогонов в одном браузере
+        "age_hours": 24,                # Время жизни одного браузера
+    },
+}
+
+# Локальный тестовый сервер (mock_server.py) для замеров без обращения к сайту
+MOCK_SERVER = {
+    "host": "127.0.0.1",
+    "port": 8000,
+    "questions": 20,    # Количество вопросов в тесте
+    "options": 4,       # Вариантов ответа на вопрос (правильные + неверные)
+    "latency": 0.0,     # Искусственная задержка каждого ответа сервера, секунды
+}
+
+# Параллельный запуск нескольких аккаунтов (pool_runner.py)
+ACCOUNTS_FILE = "accounts.json"         # Список аккаунтов, см. accounts.example.json
+PROFILES_DIR = "profiles"               # Каталог с профилями Chrome (по одному на аккаунт)
+POOL = {
+    "workers": os.cpu_count() or 2,     # Сколько браузеров работает одновременно
+    "timeout": 900,                     # Максимальное время прохождения для одного аккаунта, секунды
+}
+
 # Настройки браузера
 BROWSER_CONFIG = {
-    "implicit_wait": 10,
+    "implicit_wait": 0,             # Неявное ожидание выключено: ожидания явные, см. WAIT_TIMEOUTS
     "page_load_timeout": 30,
     "window_size": (1920, 1080)
 }
 
+# Запуск chromedriver (driver_service.py)
+DRIVER_SERVICE = {
+    "cached": True,             # Брать chromedriver из локального кэша, без проверки версии по сети
+    "cache_dir": ".drivers",    # Каталог кэша chromedriver
+    "version": None,            # Закрепленная версия, например "119.0.6045.105"; None - версия первой установки
+    "resident": False,          # Не останавливать chromedriver между прогонами
+    "port": 9515,               # Порт резидентного chromedriver
+}
+
+# Облегченный профиль браузера: без картинок, шрифтов, медиа и аналитики.
+# Для теста нужны только текст и несколько кликабельных div
+LEAN_PROFILE = {
+    "enabled": False,               # Использовать облегченный профиль по умолчанию
+    "headless": True,               # Запуск без окна
+    "page_load_strategy": "eager",  # Не ждать загрузки картинок и стилей, только DOM
+    "blocked_urls": [               # Шаблоны для CDP Network.setBlockedURLs
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+        "*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav",
+        "*google-analytics.com*", "*googletagmanager.com*", "*mc.yandex.ru*",
+        "*top-fwz1.mail.ru*", "*doubleclick.net*", "*vk.com/rtrg*",
+    ],
+}
+
 # CSS селекторы для элементов на странице
 SELECTORS = {
     "start_game": "//div[@class='inlay']/b[text()='Начать игру']",      # Начать игру
@@ -18,22 +100,174 @@ SELECTORS = {
     "answer_container": "section.orange_color.orange_bg",               # Контейнер для клика по ответу
     "submit_button": "//div[@class='inlay']/b[text()='Ответить']",      # Ответить
     "complete_button": "//div[@class='inlay']/b[text()='Завершить']",   # Завершить тест
+    "question_of_the_day": "//div[@class='inlay']/b[text()='Вопрос дня']",  # Открыть "Вопрос дня"
+}
+
+# Запасные способы найти элементы (locators.py); первым пробуется селектор из SELECTORS, запасные -
+# только если он сломан (запасные могут быть шире основного).
+# answer_target - div для клика по варианту, ищется от родителя span с текстом варианта
+LOCATOR_FALLBACKS = {
+    "start_game": ["//div[contains(@class, 'inlay')]/b[normalize-space()='Начать игру']"],
+    "question": ["div.question_text p", "//div[contains(@class, 'question_text')]//p"],
+    "answer_options": ["span.white_color"],
+    "answer_target": ["./section[contains(@class, 'orange_bg')]/div"],
+    "submit_button": ["//div[contains(@class, 'inlay')]/b[normalize-space()='Ответить']"],
+    "complete_button": ["//div[contains(@class, 'inlay')]/b[normalize-space()='Завершить']"],
+    "question_of_the_day": ["//div[contains(@class, 'inlay')]/b[normalize-space()='Вопрос дня']"],
 }
 
-# Настройки логирования
+# Статистика и порядок способов поиска элементов (locators.py)
+LOCATORS = {
+    "stats_file": "locator_stats.json",     # Статистика между прогонами
+    "min_samples": 5,                       # Попыток, после которых способ считается проверенным
+    "min_hit_rate": 0.9,                    # Ниже этой доли находок способ считается сломанным
+    "probe_every": 25,                      # Каждый N-й поиск пробует все способы, а не до первой находки
+    "slow_ms": 20,                          # Основной селектор медленнее этого попадает в отчет
+}
+
+# Бэкенд прохождения: "classic" - команды WebDriver (test_automation.py),
+# "async" - события и клики через CDP по websocket (async_backend.py)
+BACKEND = "classic"
+
+# Прохождение по HTTP без браузера (http_mode.py)
+HTTP_MODE = {
+    "button_form_attribute": "data-form",   # Атрибут кнопки с id формы, которую она отправляет
+    "answer_field": "options",              # Поле формы с выбранными вариантами (через запятую)
+    "timeout": 10,                          # Таймаут запроса, секунды
+}
+
+# Таймауты ожидания изменений на странице (секунды). Шаг завершается, как только
+# страница готова; таймаут - только верхняя граница
+WAIT_TIMEOUTS = {
+    "first_question": 30,   # Первый вопрос после открытия страницы
+    "buttons": 10,          # Появление кнопки "Ответить" или "Завершить"
+    "next_question": 10,    # Смена вопроса после отправки ответа
+    "start_game": 10,       # Кнопка "Начать игру"
+}
+WAIT_POLL_INTERVAL = 0.1    # Как часто проверять страницу во время ожидания
+
+# Человекоподобный темп: если включен, шаг длится не меньше случайной задержки
+# из PACING (время ожидания страницы засчитывается в эту задержку)
+HUMAN_PACING = False
+
+# Задержки человекоподобного темпа (pacing.py): для каждого ключа - имя метода
+# random.Random и его параметры, "constant" - постоянная задержка. У каждого
+# ключа свой генератор от seed; None - новая последовательность при каждом запуске
+PACING = {
+    "seed": None,
+    "delays": {
+        "between_clicks": ("uniform", 1.0, 3.0),    # Задержка между кликами по ответам
+        "after_submit": ("uniform", 1.0, 3.0),      # Задержка после отправки ответов
+        "page_load": ("uniform", 1.0, 3.0),         # Задержка при загрузке страницы
+        "scrol": ("uniform", 1.0, 3.0),             # Задержка при прокрутке страницы
+    },
+    "default": ("constant", 0.5),                   # Для ключей, которых нет в delays
+}
+
+# Поиск вопросов в базе ответов
+MATCHING = {
+    "question_threshold": 0.95,  # Минимальная похожесть (0..1), при которой вопрос считается найденным
+    "option_threshold": 0.85,    # Минимальная похожесть варианта на странице на правильный ответ
+    "option_margin": 0.05,       # На сколько лучший вариант должен быть похожее следующего за ним
+    # Слова, меняющие смысл: тексты, различающиеся числами, отрицаниями (вместе со следующим словом)
+    # или модальными словами, не считаются похожими
+    "negations": ["не", "ни", "нет"],
+    "modal_words": ["можно", "нельзя", "нужно", "надо", "необходимо", "обязательно", "запрещено", "разрешено",
+                    "должен", "должна", "должно", "должны", "всегда", "никогда"],
+}
+
+# База ответов (knowledge_base.py): все источники собираются в один индекс.
+# Более поздние источники перекрывают более ранние. Журнал unknown_questions.jsonl можно
+# добавить в список: вопросы, у которых вписано поле "answers", попадут в базу, остальные пропускаются
+KNOWLEDGE_BASE = {
+    "sources": ["questions.py", "custom_questions.txt", "knowledge_base.jsonl", "learned_answers.jsonl"],
+    "learned": "learned_answers.jsonl",     # Ответы, узнанные после отправки (KnowledgeBase.learn)
+    "cache": ".kb_cache.pickle",    # Собранная база с индексом; пересобирается при изменении источников
+    "reload_interval": 5.0,         # Как часто проверять изменения источников, секунды
+}
+
+# Общий сервис базы ответов (answer_service.py): один процесс держит базу, остальные
+# процессы бота спрашивают его по HTTP на localhost через LRU кэш. Если сервис
+# недоступен, база загружается в процессе как раньше
+ANSWER_SERVICE = {
+    "enabled": False,
+    "host": "127.0.0.1",
+    "port": 8765,
+    "timeout": 2.0,             # Таймаут запроса к сервису, секунды
+    "cache_size": 4096,         # Вопросов в LRU кэше процесса
+    "poll_timeout": 30,         # Сколько сервис держит запрос об изменениях базы (long-poll), секунды
+    "retry_interval": 30,       # Через сколько снова пробовать сервис после ошибки, секунды
+    "changelog": 1000,          # Сколько последних изменений сервис помнит для выборочного сброса кэша
+    "result_selector": None,    # Варианты, отмеченные сайтом правильными после отправки (CSS/XPath); None - не читать
+    "result_timeout": 1.0,      # Сколько ждать отметки правильных ответов после отправки, секунды
+}
+
+# Поиск почти одинаковых вопросов и объединение базы (dedupe_bank.py)
+DEDUPE = {
+    "threshold": 0.85,      # Косинусная похожесть TF-IDF векторов, начиная с которой вопросы - повторы
+    "ngram": 3,             # Длина символьных n-грамм
+    "max_df": 0.05,         # n-граммы, встречающиеся чаще чем в этой доле вопросов, не учитываются
+    "block_size": 4096,     # Строк матрицы в одном блоке при поиске пар
+    "prefix_extra": 8,      # Дополнительная длина префикса редких n-грамм: меньше пар-кандидатов
+    "output": "knowledge_base.merged.jsonl",
+    "report": "dedupe_conflicts.json",
+}
+
+# Журнал неизвестных вопросов (unknown_journal.py)
+UNKNOWN_JOURNAL = {
+    "path": "unknown_questions.jsonl",  # По записи на каждый уникальный вопрос
+    "flush_interval": 2.0,              # Как часто фоновый поток сбрасывает журнал на диск, секунды
+}
+
+# Замеры времени по фазам и командам WebDriver (instrumentation.py)
+INSTRUMENTATION = {
+    "enabled": False,           # Включить замеры и выгрузку метрик после каждого прогона
+    "output_dir": "metrics",    # Каталог для run-<id>.json и run-<id>.prom
+}
+
+# Трассы прохождений для воспроизведения без браузера (session_trace.py)
+TRACES = {
+    "enabled": False,           # Записывать каждый вопрос, решение и результат
+    "output_dir": "traces",     # Каталог для trace-<id>.jsonl.gz
+}
+
+# Восстановление после сбоев и продолжение прохождения (run_state.py)
+RECOVERY = {
+    "checkpoint_file": "run_checkpoint.json",  # Позиция прохождения: номер вопроса и отвеченные вопросы
+    "max_age": 6 * 60 * 60,         # Точка старше этого (секунды) считается прохождением прошлой игры
+    "question_retries": 2,          # Повторов одного вопроса после временных ошибок драйвера
+    "run_retries": 8,               # Повторов за все прохождение
+    "browser_restarts": 2,          # Перезапусков упавшего браузера
+    # Классы, которыми сайт отмечает выбранный вариант: после сбоя выбранные варианты не кликаются
+    # повторно (повторный клик снял бы выбор)
+    "selected_classes": ["selected", "active", "checked"],
+}
+
+# История прохождений (run_history.py)
+RUN_HISTORY = {
+    "enabled": True,                    # Записывать каждый вопрос и обновлять статистику по вопросам
+    "path": "run_history.sqlite3",      # База SQLite
+    "busy_timeout": 10,                 # Сколько ждать блокировки базы другим процессом, секунды
+}
+
+# Настройки логирования (utils.setup_logging): события пишутся в консоль или файл
+# отдельным потоком, прохождение не ждет вывода
 LOGGING = {
     "level": "INFO",
-    "format": "%(asctime)s - %(levelname)s - %(message)s"
+    "format": "%(asctime)s - %(levelname)s - [%(worker)s %(run_id)s %(question_id)s] %(message)s",
+    "json": False,          # Одна строка JSON на событие (время, уровень, сообщение, run_id, worker, question_id)
+    "file": None,           # Файл лога, например "logs/{worker}.log"; None - консоль (stderr)
+    "queue_size": 10000,    # Событий в очереди; при переполнении новые события отбрасываются
 }
 
 
 # Настройки задержек
 class RandomDelays:
+    """Случайные задержки по ключам из PACING; распределения собираются один раз (см. pacing.Pacer)"""
+
+    def __init__(self, seed=None):
+        from pacing import Pacer
+        self._pacer = Pacer(seed=seed if seed is not None else PACING["seed"])
+
     def __getitem__(self, key):
-        delays = {
-            "between_clicks": random.uniform(1.0, 3.0),  # Задержка между кликами по ответам
-            "after_submit": random.uniform(1.0, 3.0),    # Задержка после отправки ответов
-            "page_load": random.uniform(1.0, 3.0),       # Задержка при загрузке страницы
-            "scrol": random.uniform(1.0, 3.0),           # Задержка при прокрутке страницы
-        }
-        return delays.get(key, 0.5)                            # Значение по умолчанию, если ключ не найден
+        return self._pacer.delay(key)
@@ -0,0 +1,303 @@
+"""
+Резидентный режим: бот работает постоянно и проходит игры по расписанию.
+
+Каждый день в DAEMON["start_time"] запускается ожидание игр из scheduler.py,
+но все прогоны идут в одном заранее запущенном браузере (WarmBrowser):
+прогон начинается сразу с открытия страницы, без запуска chromedriver и Chrome.
+
+Браузер за долгую работу разрастается, поэтому перед каждым прогоном и
+между прогонами (раз в DAEMON["sample_interval"]) снимаются:
+
+    - CDP Performance.getMetrics вкладки: занятая куча JS, узлы DOM,
+      занятость главного потока (TaskDuration);
+    - процессы браузера (CDP SystemInfo.getProcessInfo или дерево процессов
+      chromedriver) и их RSS и CPU через psutil.
+
+Если перед прогоном превышен любой порог из DAEMON["limits"] или браузер не
+отвечает, он перезапускается до прогона. Замеры пишутся в метрики
+(gauge browser_rss_bytes, renderer_rss_bytes и т.д.; см. INSTRUMENTATION),
+в metrics/run-daemon-<pid>.json и .prom.
+
+Запуск:
+    python daemon.py
+    python daemon.py --once     # одно ожидание игр без перехода к следующему дню
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import psutil
+import urllib3
+from selenium.common.exceptions import WebDriverException
+
+from config import DAEMON, INSTRUMENTATION, SCHEDULER
+from instrumentation import Metrics, NullMetrics, create_metrics
+from utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+MEGABYTE = 1024 * 1024
+
+
+class BrowserSample(NamedTuple):
+    browser_rss: int            # Суммарный RSS всех процессов браузера, байты
+    renderer_rss: int           # RSS самого большого процесса отрисовки, байты
+    processes: int              # Процессов браузера
+    cpu_percent: float          # CPU всех процессов с прошлого замера, проценты одного ядра
+    js_heap: int                # Занятая куча JS вкладки, байты
+    dom_nodes: int              # Узлов DOM во вкладке
+    task_busy: float            # Доля времени, когда главный поток вкладки был занят, с прошлого замера
+
+    def describe(self) -> str:
+        return (f"RSS {self.browser_rss / MEGABYTE:.0f} МБ ({self.processes} процессов), "
+                f"отрисовка {self.renderer_rss / MEGABYTE:.0f} МБ, куча JS {self.js_heap / MEGABYTE:.0f} МБ, "
+                f"DOM {self.dom_nodes}, CPU {self.cpu_percent:.0f}%")
+
+
+def page_metrics(driver) -> Dict[str, float]:
+    """Показатели вкладки из CDP Performance.getMetrics: JSHeapUsedSize, Nodes, TaskDuration и др."""
+    driver.execute_cdp_cmd("Performance.enable", {})
+    raw = driver.execute_cdp_cmd("Performance.getMetrics", {})
+    return {metric["name"]: metric["value"] for metric in raw.get("metrics", [])}
+
+
+def browser_processes(driver) -> Dict[int, str]:
+    """Процессы браузера: {pid: тип} (browser, renderer, gpu, utility...)"""
+    try:
+        info = driver.execute_cdp_cmd("SystemInfo.getProcessInfo", {})
+        processes = {int(process["id"]): process["type"] for process in info.get("processInfo", [])}
+        if processes:
+            return processes
+    except WebDriverException:
+        pass
+    # Команда доступна не во всех версиях chromedriver: дерево процессов chromedriver
+    service_process = getattr(getattr(driver, "service", None), "process", None)
+    if service_process is None:
+        return {}
+    processes = {}
+    for process in psutil.Process(service_process.pid).children(recursive=True):
+        try:
+            arguments = process.cmdline()
+        except psutil.Error:
+            continue
+        types = [argument.split("=", 1)[1] for argument in arguments if argument.startswith("--type=")]
+        processes[process.pid] = types[0] if types else "browser"
+    return processes
+
+
+class BrowserMonitor:
+    """Замеры одного браузера; CPU и занятость вкладки считаются между соседними замерами"""
+
+    def __init__(self):
+        self._processes: Dict[int, psutil.Process] = {}
+        self._task_duration: Optional[float] = None
+        self._sampled: Optional[float] = None
+
+    def sample(self, driver) -> BrowserSample:
+        metrics = page_metrics(driver)
+        processes = browser_processes(driver)
+
+        browser_rss = renderer_rss = 0
+        cpu_percent = 0.0
+        tracked = {}
+        for pid, kind in processes.items():
+            process = self._processes.get(pid)
+            try:
+                if process is None:
+                    process = psutil.Process(pid)
+                    process.cpu_percent(None)   # Первый вызов только запоминает время CPU
+                else:
+                    cpu_percent += process.cpu_percent(None)
+                rss = process.memory_info().rss
+            except psutil.Error:
+                continue
+            tracked[pid] = process
+            browser_rss += rss
+            if kind == "renderer":
+                renderer_rss = max(renderer_rss, rss)
+        self._processes = tracked
+
+        now = time.monotonic()
+        task_duration = metrics.get("TaskDuration", 0.0)
+        task_busy = 0.0
+        if self._task_duration is not None and now > self._sampled and task_duration >= self._task_duration:
+            task_busy = (task_duration - self._task_duration) / (now - self._sampled)
+        self._task_duration, self._sampled = task_duration, now
+
+        return BrowserSample(browser_rss, renderer_rss, len(tracked), cpu_percent,
+                             int(metrics.get("JSHeapUsedSize", 0)), int(metrics.get("Nodes", 0)), task_busy)
+
+
+def exceeded(sample: Optional[BrowserSample], runs: int, age: float, limits: Dict[str, float]) -> List[str]:
+    """Причины перезапуска браузера; пустой список - браузер можно использовать дальше"""
+    if sample is None:
+        return ["браузер не отвечает"]
+    checks = [
+        (sample.browser_rss / MEGABYTE, "browser_rss_mb", "RSS браузера {:.0f} МБ"),
+        (sample.renderer_rss / MEGABYTE, "renderer_rss_mb", "RSS отрисовки {:.0f} МБ"),
+        (sample.js_heap / MEGABYTE, "js_heap_mb", "куча JS {:.0f} МБ"),
+        (sample.dom_nodes, "dom_nodes", "узлов DOM {}"),
+        (sample.cpu_percent, "cpu_percent", "CPU в простое {:.0f}%"),
+        (runs, "runs", "прогонов {}"),
+        (age / 3600, "age_hours", "работает {:.1f} ч"),
+    ]
+    return [f"{text.format(value)} (порог {limits[key]})" for value, key, text in checks
+            if limits.get(key) is not None and value >= limits[key]]
+
+
+class WarmBrowser:
+    """Браузер, который остается запущенным между прогонами и перезапускается по порогам"""
+
+    def __init__(self, driver_factory=None, metrics=None, limits: Dict[str, float] = None,
+                 blank_between_runs: bool = DAEMON["blank_between_runs"]):
+        if driver_factory is None:
+            from browser import create_driver
+            driver_factory = create_driver
+        self.driver_factory = driver_factory
+        self.metrics = metrics if metrics is not None else create_metrics()
+        self.limits = limits or DAEMON["limits"]
+        self.blank_between_runs = blank_between_runs
+        self.driver = None
+        self.monitor = BrowserMonitor()
+        self.runs = 0
+        self.started = 0.0
+        self.recycles = 0
+
+    def acquire(self):
+        """Драйвер для прогона: запущенный браузер или новый, если старый превысил пороги"""
+        if self.driver is None:
+            self._start()
+            return self.driver
+        reasons = exceeded(self.sample(), self.runs, time.monotonic() - self.started, self.limits)
+        if reasons:
+            logger.info("♻ Перезапуск браузера: %s", "; ".join(reasons))
+            self.recycles += 1
+            self.metrics.gauge("browser_recycles", self.recycles)
+            self._stop()
+            self._start()
+        else:
+            logger.info("🔥 Прогон в запущенном браузере (%d прогонов, %.1f ч)",
+                        self.runs, (time.monotonic() - self.started) / 3600)
+        return self.driver
+
+    def release(self):
+        """Прогон окончен: вкладка освобождается до следующего прогона"""
+        self.runs += 1
+        if self.driver is not None and self.blank_between_runs:
+            try:
+                self.driver.get("about:blank")
+            except (WebDriverException, OSError, urllib3.exceptions.HTTPError):
+                pass
+
+    def sample(self) -> Optional[BrowserSample]:
+        """Замер браузера в метрики; None - браузер не отвечает или не запущен"""
+        if self.driver is None:
+            return None
+        try:
+            sample = self.monitor.sample(self.driver)
+        except (WebDriverException, psutil.Error, OSError, urllib3.exceptions.HTTPError) as e:
+            message = str(e).strip().splitlines()
+            logger.warning("Замер браузера не удался: %s: %s", type(e).__name__, message[0] if message else "")
+            return None
+        for name, value in (("browser_rss_bytes", sample.browser_rss), ("renderer_rss_bytes", sample.renderer_rss),
+                            ("browser_processes", sample.processes), ("browser_cpu_percent", sample.cpu_percent),
+                            ("js_heap_used_bytes", sample.js_heap), ("dom_nodes", sample.dom_nodes),
+                            ("page_task_busy_ratio", sample.task_busy)):
+            self.metrics.gauge(name, value)
+        self.metrics.export(quiet=True)
+        return sample
+
+    def close(self):
+        self._stop()
+
+    def _start(self):
+        started = time.perf_counter()
+        self.driver = self.driver_factory()
+        self.metrics.record("browser_start", time.perf_counter() - started)
+        self.monitor = BrowserMonitor()
+        self.runs = 0
+        self.started = time.monotonic()
+        logger.info("🚀 Браузер запущен за %.1f с", time.perf_counter() - started)
+
+    def _stop(self):
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
+
+
+def seconds_until(start_time: str) -> float:
+    """Секунд до ближайшего наступления времени "ЧЧ:ММ" (местное время)"""
+    hour, minute = (int(part) for part in start_time.split(":"))
+    now = datetime.datetime.now()
+    start = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if start <= now:
+        start += datetime.timedelta(days=1)
+    return (start - now).total_seconds()
+
+
+def idle(browser: WarmBrowser, seconds: float, interval: float = DAEMON["sample_interval"]):
+    """Ожидание следующего запуска с замерами браузера"""
+    wake_at = time.monotonic() + seconds
+    while True:
+        remaining = wake_at - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(interval, remaining))
+        sample = browser.sample()
+        if sample:
+            logger.info("📈 Браузер: %s", sample.describe())
+
+
+def run_daemon(games: List[str] = None, once: bool = False, start_time: str = DAEMON["start_time"]):
+    from answer_service import create_knowledge_base
+    from scheduler import play, run_scheduler
+
+    games = games or DAEMON["games"]
+    metrics = Metrics(run_id=f"daemon-{os.getpid()}") if INSTRUMENTATION["enabled"] else NullMetrics()
+    browser = WarmBrowser(metrics=metrics)
+    # База ответов одна на все прогоны и сама подхватывает правки источников
+    knowledge_base = create_knowledge_base()
+
+    def player(game, url):
+        return play(game, url, browser=browser, knowledge_base=knowledge_base)
+
+    try:
+        browser.acquire()
+        while True:
+            results = run_scheduler(games, player=player)
+            for game, done in results.items():
+                logger.info("%s %s", "✅" if done else "❌", game)
+            if once:
+                return results
+            wait = seconds_until(start_time)
+            logger.info("💤 Следующий запуск в %s, через %.1f ч", start_time, wait / 3600)
+            idle(browser, wait)
+    finally:
+        browser.close()
+        metrics.export()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", nargs="+", choices=list(SCHEDULER["games"]), default=DAEMON["games"])
+    parser.add_argument("--start-time", default=DAEMON["start_time"], help="Ежедневный запуск, ЧЧ:ММ")
+    parser.add_argument("--once", action="store_true", help="Одно ожидание игр и выход")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        run_daemon(args.games, args.once, args.start_time)
+    except KeyboardInterrupt:
+        print("🛑 Остановлено")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Поиск почти одинаковых вопросов в базе ответов и сборка объединенной базы.
+
+Все вопросы из источников базы (KNOWLEDGE_BASE["sources"]) и журнала
+неизвестных вопросов переводятся в TF-IDF векторы символьных n-грамм
+канонического текста (scipy.sparse, строки нормированы). Кандидаты в повторы
+ищутся блоками строк по префиксам из самых редких n-грамм (P[блок] @ P.T),
+для кандидатов считается точная косинусная похожесть. Память ограничена
+размером блока, а вся работа идет в операциях над разреженными матрицами,
+без попарного цикла на Python. Пары с похожестью не ниже порога объединяются
+в кластеры (связные компоненты графа).
+
+В объединенную базу попадают все формулировки вопросов кластера (сайт
+показывает каждую из них), с ответами из самого позднего источника (как в
+KnowledgeBase). Кластеры, в которых у вопросов разные ответы, не
+объединяются: каждая формулировка остается со своими ответами, а кластер
+попадает в отчет о конфликтах для ручного разбора.
+
+Запуск:
+    python dedupe_bank.py
+    python dedupe_bank.py --threshold 0.9 --output knowledge_base.merged.jsonl --report conflicts.json
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from config import DEDUPE, KNOWLEDGE_BASE, UNKNOWN_JOURNAL
+from knowledge_base import load_source, save_jsonl_questions
+from unknown_journal import read_journal
+from utils import canonical_text
+
+
+class Entry(NamedTuple):
+    question: str
+    answers: List[str]      # Пусто для неизвестных вопросов
+    source: str
+    priority: int           # Номер источника: более поздние перекрывают более ранние
+
+
+class Cluster(NamedTuple):
+    entries: List[Entry]
+    question: str                   # Вопрос из самого позднего источника (для отчета)
+    answers: List[str]              # Его ответы
+    conflict: bool                  # У вопросов кластера разные наборы ответов
+
+
+def load_entries(sources: List[str], journal: Optional[str] = None) -> List[Entry]:
+    """Вопросы всех источников (без объединения одинаковых текстов)"""
+    entries = []
+    for priority, filename in enumerate(sources):
+        try:
+            questions = load_source(filename)
+        except FileNotFoundError:
+            continue
+        entries += [Entry(question, list(answers), filename, priority) for question, answers in questions.items()]
+    if journal:
+        entries += [Entry(record["question"], [], journal, -1) for record in read_journal(journal).values()]
+    return entries
+
+
+def dense_ids(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Различные значения и номер каждого элемента среди них (как np.unique с return_inverse)"""
+    if len(values) and values.max() < 64 * len(values):
+        # Небольшой диапазон значений: подсчет вместо сортировки
+        present = np.flatnonzero(np.bincount(values))
+        lookup = np.zeros(present[-1] + 1, dtype=np.int64)
+        lookup[present] = np.arange(len(present))
+        return present, lookup[values]
+    unique, inverse = np.unique(values, return_inverse=True)
+    return unique, inverse.astype(np.int64).ravel()
+
+
+def ngram_matrix(texts: List[str], n: int = DEDUPE["ngram"], max_df: float = DEDUPE["max_df"]) -> sparse.csr_matrix:
+    """TF-IDF символьных n-грамм, строки нормированы (скалярное произведение - косинус)"""
+    padded = [f" {text} " for text in texts]
+    lengths = np.array([len(text) for text in padded], dtype=np.int64)
+    symbols = dense_ids(np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32))[1]
+
+    # n-грамма - число в системе счисления по размеру алфавита; окна на стыке текстов отбрасываются
+    windows = np.maximum(lengths - n + 1, 0)
+    indptr = np.concatenate(([0], np.cumsum(windows)))
+    starts = np.repeat(np.cumsum(lengths) - lengths, windows) + np.arange(indptr[-1]) - np.repeat(indptr[:-1], windows)
+    keys = np.zeros(len(starts), dtype=np.int64)
+    for offset in range(n):
+        keys = keys * (symbols.max(initial=0) + 1) + symbols[starts + offset]
+    vocabulary, indices = dense_ids(keys)
+
+    counts = sparse.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                               shape=(len(texts), len(vocabulary)))
+    counts.sum_duplicates()
+
+    document_frequency = np.bincount(counts.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)).astype(np.float32) + 1
+    # Слишком частые n-граммы почти не влияют на похожесть, но делают произведение плотным
+    if len(texts) > 1000:
+        idf[document_frequency > max_df * len(texts)] = 0
+
+    matrix = counts @ sparse.diags(idf)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.diags(1 / norms) @ matrix
+    matrix.eliminate_zeros()
+    return matrix.tocsr()
+
+
+def prefix_matrix(matrix: sparse.csr_matrix, threshold: float, extra: int = DEDUPE["prefix_extra"]) -> sparse.csr_matrix:
+    """Бинарная матрица префиксов: у каждой строки только самые редкие n-граммы.
+
+    Если у двух вопросов совпадает не меньше threshold их n-грамм, то среди
+    len - ceil(threshold * len) + 1 + extra самых редких (в общем порядке по
+    частоте) у них не меньше extra + 1 общих. Редкие n-граммы встречаются
+    в немногих вопросах, поэтому произведение префиксов остается разреженным.
+    """
+    features = matrix.shape[1]
+    by_rarity = np.argsort(np.bincount(matrix.indices, minlength=features), kind="stable")
+    rank = np.empty_like(by_rarity)
+    rank[by_rarity] = np.arange(features)
+
+    # Сортировка одного ключа (строка, редкость) упорядочивает n-граммы внутри каждой строки
+    lengths = np.diff(matrix.indptr)
+    row_of = np.repeat(np.arange(matrix.shape[0], dtype=np.int64), lengths)
+    keys = np.sort(row_of * features + rank[matrix.indices])
+    position = np.arange(len(keys)) - matrix.indptr[row_of]
+    prefix = lengths - np.ceil(threshold * lengths).astype(np.int64) + 1 + extra
+    keep = position < prefix[row_of]
+
+    return sparse.csr_matrix((np.ones(keep.sum(), dtype=np.float32),
+                              (row_of[keep], by_rarity[keys[keep] % features])), shape=matrix.shape)
+
+
+def similar_pairs(matrix: sparse.csr_matrix, threshold: float, block_size: int = DEDUPE["block_size"],
+                  extra: int = DEDUPE["prefix_extra"]) -> Tuple[np.ndarray, np.ndarray]:
+    """Пары строк (i < j) с косинусной похожестью не ниже threshold; блоками по block_size строк.
+
+    Кандидаты - пары с extra + 1 общими n-граммами в префиксах (prefix_matrix;
+    у коротких вопросов префикс - весь вопрос), для них считается точная
+    косинусная похожесть TF-IDF векторов.
+    """
+    prefixes = prefix_matrix(matrix, threshold, extra)
+    required = np.minimum(np.diff(prefixes.indptr), extra + 1)
+    rows, columns = [], []
+    for start in range(0, matrix.shape[0], block_size):
+        # Строки от начала блока против блока: каждая пара (i, j) считается один раз
+        shared = (prefixes[start:] @ prefixes[start:start + block_size].T).tocoo()
+        left, right = shared.col + start, shared.row + start
+        candidate = (left < right) & (shared.data >= np.minimum(required[left], required[right]))
+        left, right = left[candidate], right[candidate]
+        if not len(left):
+            continue
+        similarity = np.asarray(matrix[left].multiply(matrix[right]).sum(axis=1)).ravel()
+        keep = similarity >= threshold
+        rows.append(left[keep])
+        columns.append(right[keep])
+    empty = np.array([], dtype=np.int64)
+    return np.concatenate(rows or [empty]), np.concatenate(columns or [empty])
+
+
+def answers_key(answers: List[str]) -> frozenset:
+    return frozenset(canonical_text(answer) for answer in answers)
+
+
+def build_clusters(entries: List[Entry], threshold: float = DEDUPE["threshold"]) -> List[Cluster]:
+    """Кластеры почти одинаковых вопросов (включая кластеры из одного вопроса)"""
+    canonical = [canonical_text(entry.question) for entry in entries]
+    matrix = ngram_matrix(canonical)
+    rows, columns = similar_pairs(matrix, threshold)
+    graph = sparse.coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, columns)), shape=(len(entries),) * 2)
+    _, labels = connected_components(graph, directed=False)
+
+    groups = defaultdict(list)
+    for entry, label in zip(entries, labels):
+        groups[label].append(entry)
+
+    clusters = []
+    for members in groups.values():
+        answered = [entry for entry in members if entry.answers]
+        if answered:
+            chosen = max(answered, key=lambda entry: entry.priority)
+            conflict = len({answers_key(entry.answers) for entry in answered}) > 1
+        else:
+            chosen, conflict = members[0], False
+        clusters.append(Cluster(members, chosen.question, list(chosen.answers), conflict))
+    return clusters
+
+
+def consolidated_bank(clusters: List[Cluster]) -> Dict[str, List[str]]:
+    """Объединенная база: все формулировки с ответами; в конфликтных кластерах у каждой свои ответы"""
+    bank = {}
+    for cluster in clusters:
+        # Более поздний источник перекрывает тот же текст вопроса из более раннего
+        for entry in sorted(cluster.entries, key=lambda entry: entry.priority):
+            if entry.answers:
+                bank[entry.question] = list(entry.answers) if cluster.conflict else cluster.answers
+    return bank
+
+
+def conflict_report(clusters: List[Cluster]) -> List[dict]:
+    return [
+        {
+            "question": cluster.question,
+            "variants": [{"question": entry.question, "answers": entry.answers, "source": entry.source}
+                         for entry in cluster.entries if entry.answers],
+        }
+        for cluster in clusters if cluster.conflict
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", nargs="+", default=KNOWLEDGE_BASE["sources"])
+    parser.add_argument("--journal", default=UNKNOWN_JOURNAL["path"], help="Журнал неизвестных вопросов")
+    parser.add_argument("--threshold", type=float, default=DEDUPE["threshold"], help="Косинусная похожесть 0..1")
+    parser.add_argument("--output", default=DEDUPE["output"], help="Объединенная база (JSONL)")
+    parser.add_argument("--report", default=DEDUPE["report"], help="Отчет о конфликтующих ответах (JSON)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    entries = load_entries(args.sources, args.journal)
+    clusters = build_clusters(entries, args.threshold)
+    seconds = time.perf_counter() - started
+
+    duplicates = [cluster for cluster in clusters if len(cluster.entries) > 1]
+    bank = consolidated_bank(clusters)
+    conflicts = conflict_report(clusters)
+    save_jsonl_questions(bank, args.output)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(conflicts, f, ensure_ascii=False, indent=2)
+
+    print(f"Вопросов: {len(entries)}, кластеров: {len(clusters)} ({seconds:.2f} с)")
+    print(f"Кластеров с повторами: {len(duplicates)}, с конфликтом ответов: {len(conflicts)}")
+    print(f"Без ответов (только из журнала): {sum(1 for cluster in clusters if not cluster.answers)}")
+    print(f"Объединенная база: {len(bank)} вопросов -> {args.output}")
+    print(f"Конфликты -> {args.report}")
+    for conflict in conflicts[:10]:
+        print(f"  ⚠ {conflict['question']}")
+        for variant in conflict["variants"]:
+            print(f"      {variant['source']}: {', '.join(variant['answers'])}")
+
+
+if __name__ == "__main__":
+    main()
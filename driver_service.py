@@ -0,0 +1,192 @@
+"""
+Быстрый запуск драйвера.
+
+По умолчанию webdriver.Chrome() при каждом старте ищет chromedriver через
+Selenium Manager (с проверкой версии по сети) и запускает новый процесс
+chromedriver. Здесь:
+
+    - cached_driver_path() - chromedriver из локального кэша (DRIVER_SERVICE["cache_dir"]),
+      закрепленный на версии DRIVER_SERVICE["version"]; сеть нужна только
+      при первой установке или смене версии;
+    - ResidentService - chromedriver на постоянном порту, который не
+      останавливается после driver.quit() и подхватывается следующими
+      прогонами (и параллельными процессами pool_runner).
+
+Если Chrome обновился и chromedriver из кэша к нему не подходит
+(SessionNotCreatedException), browser.create_driver вызывает
+replacement_service(): chromedriver переустанавливается под установленный
+Chrome (или, если версия закреплена, используется Selenium Manager), и
+запуск повторяется один раз.
+
+Остановить резидентный chromedriver:
+    python driver_service.py --shutdown
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import stat
+import subprocess
+import time
+from typing import Optional
+from urllib import request
+from urllib.error import URLError
+
+from selenium.webdriver.chrome.service import Service
+
+from config import DRIVER_SERVICE
+from utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+
+
+def _manifest_path() -> str:
+    return os.path.join(DRIVER_SERVICE["cache_dir"], MANIFEST)
+
+
+def read_manifest() -> Optional[dict]:
+    try:
+        with open(_manifest_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def driver_version(path: str) -> str:
+    """Версия chromedriver из вывода --version"""
+    output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10).stdout
+    match = re.search(r"\d+(\.\d+)+", output)
+    return match.group(0) if match else "unknown"
+
+
+def cached_driver_path(version: Optional[str] = None) -> str:
+    """Путь к закрепленному chromedriver из локального кэша; без обращения к сети, если он уже установлен"""
+    version = version or DRIVER_SERVICE["version"]
+    manifest = read_manifest()
+    if manifest and os.path.isfile(manifest["path"]) and (not version or manifest["version"] == version):
+        return manifest["path"]
+    return install_driver(version)
+
+
+def install_driver(version: Optional[str] = None) -> str:
+    """Скачивает chromedriver (webdriver_manager) и копирует его в локальный кэш"""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    logger.info("⬇ Установка chromedriver %s", version or "(версия под установленный Chrome)")
+    downloaded = ChromeDriverManager(driver_version=version).install()
+    version = version or driver_version(downloaded)
+
+    target_dir = os.path.join(DRIVER_SERVICE["cache_dir"], version)
+    os.makedirs(target_dir, exist_ok=True)
+    target = os.path.join(target_dir, os.path.basename(downloaded))
+    shutil.copy2(downloaded, target)
+    os.chmod(target, os.stat(target).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    temporary = f"{_manifest_path()}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "path": os.path.abspath(target), "installed": time.time()}, f)
+    os.replace(temporary, _manifest_path())
+    return os.path.abspath(target)
+
+
+def service_running(port: int = DRIVER_SERVICE["port"]) -> bool:
+    """На порту уже отвечает chromedriver"""
+    try:
+        with request.urlopen(f"http://localhost:{port}/status", timeout=1) as response:
+            return "value" in json.load(response)
+    except (OSError, URLError, ValueError):
+        return False
+
+
+def shutdown_service(port: int = DRIVER_SERVICE["port"]) -> bool:
+    """Останавливает резидентный chromedriver; False, если он не запущен"""
+    if not service_running(port):
+        return False
+    try:
+        request.urlopen(f"http://localhost:{port}/shutdown", timeout=5).close()
+    except (OSError, URLError):
+        pass
+    return True
+
+
+class ResidentService(Service):
+    """chromedriver на постоянном порту: запускается один раз и остается работать после driver.quit()"""
+
+    def __init__(self, executable_path: Optional[str] = None, port: int = DRIVER_SERVICE["port"], **kwargs):
+        if os.name == "nt":
+            popen_kw = {"creation_flags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            popen_kw = {"start_new_session": True}
+        super().__init__(executable_path=executable_path or cached_driver_path(), port=port,
+                         popen_kw=popen_kw, **kwargs)
+
+    def start(self):
+        if service_running(self.port):
+            return
+        super().start()
+        logger.info("🚗 chromedriver запущен на порту %s и останется для следующих прогонов", self.port)
+
+    def stop(self):
+        """chromedriver не останавливается; см. shutdown()"""
+
+
+def create_service():
+    """Service для webdriver.Chrome по DRIVER_SERVICE; None - поиск драйвера средствами Selenium"""
+    try:
+        if DRIVER_SERVICE["resident"]:
+            return ResidentService()
+        if DRIVER_SERVICE["cached"]:
+            return Service(executable_path=cached_driver_path())
+    except Exception as e:
+        logger.warning("Локальный chromedriver недоступен (%s), используется Selenium Manager", str(e).splitlines()[0])
+    return None
+
+
+def replacement_service():
+    """Service взамен chromedriver из кэша, который не подошел к Chrome; None - Selenium Manager"""
+    if not (DRIVER_SERVICE["resident"] or DRIVER_SERVICE["cached"]):
+        return None
+    try:
+        if DRIVER_SERVICE["resident"] and shutdown_service():
+            # Старый chromedriver освобождает порт не сразу
+            deadline = time.monotonic() + 5
+            while service_running() and time.monotonic() < deadline:
+                time.sleep(0.1)
+        if DRIVER_SERVICE["version"]:
+            # Закрепленная версия не подходит к Chrome: переустановка той же версии не поможет
+            raise RuntimeError(f"закреплена версия {DRIVER_SERVICE['version']}")
+        path = install_driver()
+        return ResidentService(path) if DRIVER_SERVICE["resident"] else Service(executable_path=path)
+    except Exception as e:
+        logger.warning("chromedriver не переустановлен (%s), используется Selenium Manager", str(e).splitlines()[0])
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--install", metavar="VERSION", nargs="?", const="",
+                        help="Установить chromedriver в кэш (по умолчанию DRIVER_SERVICE['version'])")
+    parser.add_argument("--shutdown", action="store_true", help="Остановить резидентный chromedriver")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.install is not None:
+        print(install_driver(args.install or DRIVER_SERVICE["version"]))
+    elif args.shutdown:
+        port = DRIVER_SERVICE["port"]
+        if shutdown_service(port):
+            print(f"chromedriver на порту {port} остановлен")
+        else:
+            print(f"На порту {port} chromedriver не запущен")
+    else:
+        manifest = read_manifest()
+        print(json.dumps(manifest, ensure_ascii=False) if manifest else "chromedriver в кэше не установлен")
+
+
+if __name__ == "__main__":
+    main()
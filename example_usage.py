@@ -6,8 +6,8 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from main import TestAutomation
+from driver_service import cached_driver_path
+from test_automation import TestAutomation
 from utils import setup_logging, save_results
 import time
 
@@ -22,8 +22,8 @@ def setup_chrome_driver():
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--window-size=1920,1080")
     
-    # Автоматическая установка драйвера
-    service = Service(ChromeDriverManager().install())
+    # Драйвер из локального кэша (скачивается только при первом запуске)
+    service = Service(cached_driver_path())
     driver = webdriver.Chrome(service=service, options=chrome_options)
     
     return driver
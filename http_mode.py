@@ -0,0 +1,342 @@
+"""
+Прохождение теста по HTTP без отрисовки страниц.
+
+После входа через браузер прохождение - это последовательность переходов
+между состояниями страницы. HttpAutomation забирает куки из драйвера
+Selenium и проходит тест запросами через requests.Session с пулом
+соединений:
+
+    - страница разбирается html.parser; вопрос, варианты, контейнеры для
+      клика и кнопки ищутся по тем же config.SELECTORS (поддерживается
+      используемое в них подмножество CSS и XPath);
+    - клик по кнопке - отправка формы, с которой она связана
+      (атрибут HTTP_MODE["button_form_attribute"]), выбранные варианты
+      передаются в поле HTTP_MODE["answer_field"].
+
+Решения принимает TestAutomation.choose_options, как и в браузере. Если
+страница не распознана, run_with_fallback продолжает прохождение через
+Selenium.
+
+Проверка на локальном сервере без браузера:
+    python http_mode.py --mock
+"""
+
+import argparse
+import logging
+import re
+import time
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_MODE, SELECTORS
+from unknown_journal import question_hash
+from utils import log_context, setup_logging
+
+logger = logging.getLogger(__name__)
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class HttpModeError(Exception):
+    """Страница не распознана - прохождение нужно продолжить в браузере"""
+
+
+# --- разбор страницы ---
+
+class Node:
+    __slots__ = ("tag", "attrs", "children", "parent", "own_text")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Node"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Node] = []
+        self.parent = parent
+        self.own_text: List[str] = []   # Текстовые узлы непосредственно внутри элемента
+
+    @property
+    def classes(self) -> List[str]:
+        return self.attrs.get("class", "").split()
+
+    def text(self) -> str:
+        """Весь текст элемента с потомками, как innerText без разметки"""
+        parts = list(self.own_text)
+        for child in self.children:
+            parts.append(child.text())
+        return " ".join(" ".join(parts).split())
+
+    def iter(self):
+        for child in self.children:
+            yield child
+            yield from child.iter()
+
+
+class TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", {})
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {name: value or "" for name, value in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        if data.strip():
+            self.current.own_text.append(data)
+
+
+def parse_html(html: str) -> Node:
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+_XPATH_STEP = re.compile(r"(//|/)([\w*-]+)((?:\[[^\]]+\])*)")
+_XPATH_PREDICATE = re.compile(r"\[\s*(@[\w-]+|text\(\))\s*=\s*['\"]([^'\"]*)['\"]\s*\]")
+_CSS_COMPOUND = re.compile(r"^([\w*-]*)((?:\.[\w-]+)*)$")
+
+
+def _xpath_matches(node: Node, tag: str, predicates: str) -> bool:
+    if tag != "*" and node.tag != tag:
+        return False
+    for name, value in _XPATH_PREDICATE.findall(predicates):
+        if name == "text()":
+            if " ".join(" ".join(node.own_text).split()) != value:
+                return False
+        elif node.attrs.get(name[1:]) != value:
+            return False
+    return True
+
+
+def _css_matches(node: Node, compound: str) -> bool:
+    match = _CSS_COMPOUND.match(compound)
+    if not match:
+        raise ValueError(f"Селектор не поддерживается: {compound}")
+    tag, classes = match.groups()
+    if tag and tag != "*" and node.tag != tag:
+        return False
+    return all(name in node.classes for name in classes.split(".") if name)
+
+
+def select(root: Node, selector: str) -> List[Node]:
+    """Элементы по селектору из config.SELECTORS: XPath (//a[@b='c']/d[text()='e']) или CSS (a.b > c d)"""
+    if selector.startswith("/"):
+        nodes = [root]
+        for axis, tag, predicates in _XPATH_STEP.findall(selector):
+            candidates = (n for node in nodes for n in (node.iter() if axis == "//" else node.children))
+            nodes = list(dict.fromkeys(n for n in candidates if _xpath_matches(n, tag, predicates)))
+        return nodes
+
+    tokens = selector.replace(">", " > ").split()
+    nodes = [root]
+    combinator = " "
+    for token in tokens:
+        if token == ">":
+            combinator = ">"
+            continue
+        candidates = (n for node in nodes for n in (node.children if combinator == ">" else node.iter()))
+        nodes = list(dict.fromkeys(n for n in candidates if _css_matches(n, token)))
+        combinator = " "
+    return nodes
+
+
+class HttpOption(NamedTuple):
+    text: str
+    value: str      # Значение варианта для формы (data-index контейнера или порядковый номер)
+
+
+class HttpPage(NamedTuple):
+    url: str
+    question: Optional[str]
+    options: List[HttpOption]
+    buttons: Dict[str, Node]    # "submit" / "complete" / "start_game" -> элемент кнопки
+    root: Node
+
+    @property
+    def option_texts(self) -> List[str]:
+        return [option.text for option in self.options]
+
+
+def read_page(html: str, url: str) -> HttpPage:
+    """Вопрос, варианты и кнопки страницы по config.SELECTORS"""
+    root = parse_html(html)
+    question = next(iter(select(root, SELECTORS["question"])), None)
+
+    options = []
+    for span in select(root, SELECTORS["answer_options"]):
+        text = span.text()
+        if not text:
+            continue
+        target = next(iter(select(span.parent, "> " + SELECTORS["answer_container"] + " > div")), None)
+        value = target.attrs.get("data-index") if target is not None else None
+        options.append(HttpOption(text, value if value is not None else str(len(options))))
+
+    buttons = {}
+    for name, key in (("submit", "submit_button"), ("complete", "complete_button"), ("start_game", "start_game")):
+        found = select(root, SELECTORS[key])
+        if found:
+            buttons[name] = found[0]
+    return HttpPage(url, question.text() if question is not None else None, options, buttons, root)
+
+
+# --- клиент ---
+
+class HttpQuizClient:
+    def __init__(self, url: str, session: Optional[requests.Session] = None):
+        self.url = url
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_driver(cls, driver) -> "HttpQuizClient":
+        """Клиент с куками и User-Agent авторизованного браузера"""
+        session = requests.Session()
+        for cookie in driver.get_cookies():
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"),
+                                path=cookie.get("path", "/"))
+        session.headers["User-Agent"] = driver.execute_script("return navigator.userAgent")
+        return cls(driver.current_url, session)
+
+    def fetch(self) -> HttpPage:
+        response = self.session.get(self.url, timeout=HTTP_MODE["timeout"])
+        response.raise_for_status()
+        self.url = response.url
+        return read_page(response.text, response.url)
+
+    def click(self, page: HttpPage, button: Node, selected: List[str] = ()) -> HttpPage:
+        """Нажатие кнопки: отправка связанной с ней формы; возвращает следующую страницу"""
+        form_id = button.attrs.get(HTTP_MODE["button_form_attribute"])
+        form = next((node for node in page.root.iter() if node.tag == "form" and node.attrs.get("id") == form_id), None)
+        if form is None:
+            raise HttpModeError(f"Кнопка '{button.text()}' не связана с формой")
+
+        data = {node.attrs["name"]: node.attrs.get("value", "") for node in form.iter()
+                if node.tag == "input" and "name" in node.attrs}
+        data[HTTP_MODE["answer_field"]] = ",".join(selected)
+        action = urljoin(page.url, form.attrs.get("action", ""))
+        method = form.attrs.get("method", "get").lower()
+        if method == "post":
+            response = self.session.post(action, data=data, timeout=HTTP_MODE["timeout"])
+        else:
+            response = self.session.get(action, params=data, timeout=HTTP_MODE["timeout"])
+        response.raise_for_status()
+        self.url = response.url
+        return read_page(response.text, response.url)
+
+
+class HttpAutomation:
+    def __init__(self, client: HttpQuizClient, automation=None, **kwargs):
+        """automation - TestAutomation для решений (по умолчанию без драйвера); kwargs передаются в него"""
+        if automation is None:
+            from test_automation import TestAutomation
+            automation = TestAutomation(None, **kwargs)
+        self.client = client
+        self.automation = automation
+        self.metrics = automation.metrics
+
+    def run_automation(self) -> int:
+        """Прохождение теста запросами; возвращает количество вопросов"""
+        with log_context(run_id=self.automation.run_id):
+            return self._run()
+
+    def _run(self) -> int:
+        logger.info("🛰 Запуск автоматизации (HTTP)")
+        with self.metrics.span("question_fetch"):
+            page = self.client.fetch()
+        if page.question is None and "start_game" in page.buttons:
+            page = self.client.click(page, page.buttons["start_game"])
+
+        questions_count = 0
+        while page.question:
+            questions_count += 1
+            logger.info("--- Вопрос %d ---", questions_count)
+            with self.metrics.span("question"), log_context(question_id=question_hash(page.question)):
+                page = self._run_question(page)
+
+        if "complete" in page.buttons:
+            self.client.click(page, page.buttons["complete"])
+            logger.info("🏁 Прохождение теста завершено")
+        elif not questions_count:
+            raise HttpModeError("На странице нет вопроса")
+        self.metrics.export()
+        self.automation.history.finish_run()
+        return questions_count
+
+    def _run_question(self, page: HttpPage) -> HttpPage:
+        started = time.perf_counter()
+        decision = self.automation.decide(page.question, page.option_texts)
+        if "submit" in page.buttons:
+            button, outcome = page.buttons["submit"], "submitted"
+        elif "complete" in page.buttons:
+            # Последний вопрос: вместо "Ответить" только "Завершить", ответы уходят вместе с ней
+            button, outcome = page.buttons["complete"], "complete"
+        else:
+            raise HttpModeError("На странице с вопросом нет кнопки 'Ответить' или 'Завершить'")
+        selected = [page.options[index].value for index in decision.indices]
+        logger.info("Выбрано %d ответов", len(selected))
+        with self.metrics.span("submit"):
+            next_page = self.client.click(page, button, selected)
+        if next_page.question == page.question:
+            raise HttpModeError("Вопрос не сменился после ответа")
+        self.automation.history.record(page.question, page.option_texts, decision.indices, decision.expected,
+                                       outcome, time.perf_counter() - started)
+        if outcome == "complete":
+            logger.info("🏁 Прохождение теста завершено")
+        return next_page
+
+
+def run_with_fallback(driver, automation=None) -> int:
+    """HTTP прохождение с куками драйвера; при нераспознанной странице - обычное прохождение в браузере"""
+    from test_automation import TestAutomation
+
+    automation = automation or TestAutomation(driver)
+    try:
+        return HttpAutomation(HttpQuizClient.from_driver(driver), automation).run_automation()
+    except (HttpModeError, requests.RequestException) as e:
+        logger.warning("HTTP прохождение недоступно (%s), продолжаем в браузере", e)
+        driver.refresh()
+        return automation.run_automation()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mock", action="store_true", help="Пройти тест на локальном тестовом сервере")
+    parser.add_argument("--questions", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.mock:
+        from mock_server import MockQuizServer
+        from run_history import NullHistory
+
+        with MockQuizServer(port=0, questions=args.questions, start_page=True) as server:
+            count = HttpAutomation(HttpQuizClient(server.url), history=NullHistory()).run_automation()
+            stats = server.stats()
+        print(f"Вопросов: {count}, правильно: {stats['correct']}/{stats['answered']}, завершено: {stats['completed']}")
+    else:
+        from browser import create_driver
+        from config import LEVEL_UP_URL
+
+        with create_driver() as driver:
+            driver.get(LEVEL_UP_URL)
+            run_with_fallback(driver)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Замеры времени по фазам прохождения и по командам WebDriver.
+
+Metrics собирает длительности именованных фаз (span) и каждой команды
+WebDriver (драйвер оборачивается на уровне driver.execute, поэтому
+учитываются и команды элементов: click, getText и т.д.), а также показатели
+ресурсов (gauge: память и CPU браузера, см. daemon.py). Итоги прогона
+выгружаются в JSON и в текстовом формате Prometheus.
+
+Включается в config.INSTRUMENTATION; в выключенном состоянии используется
+NullMetrics, у которого все методы пустые.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List
+
+from config import INSTRUMENTATION
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_PREFIX = "levelup"
+
+
+class Timing:
+    """Длительности одной фазы или одной команды"""
+
+    __slots__ = ("samples", "total", "max")
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, fraction: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": len(self.samples),
+            "total": round(self.total, 6),
+            "max": round(self.max, 6),
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+        }
+
+
+class Gauge:
+    """Снятые значения одного показателя: последнее, минимум, максимум и среднее"""
+
+    __slots__ = ("count", "last", "min", "max", "total")
+
+    def __init__(self):
+        self.count = 0
+        self.last = 0.0
+        self.min = 0.0
+        self.max = 0.0
+        self.total = 0.0
+
+    def add(self, value: float):
+        if not self.count or value < self.min:
+            self.min = value
+        if not self.count or value > self.max:
+            self.max = value
+        self.count += 1
+        self.last = value
+        self.total += value
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "last": round(self.last, 6),
+            "min": round(self.min, 6),
+            "max": round(self.max, 6),
+            "mean": round(self.total / self.count, 6) if self.count else 0.0,
+        }
+
+
+class Metrics:
+    enabled = True
+
+    def __init__(self, run_id: str = None):
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.started = time.time()
+        self.spans: Dict[str, Timing] = {}
+        self.commands: Dict[str, Timing] = {}
+        self.gauges: Dict[str, Gauge] = {}
+
+    def record(self, name: str, seconds: float):
+        timing = self.spans.get(name)
+        if timing is None:
+            timing = self.spans[name] = Timing()
+        timing.add(seconds)
+
+    def gauge(self, name: str, value: float):
+        """Снятое значение показателя ресурсов, например browser_rss_bytes"""
+        gauge = self.gauges.get(name)
+        if gauge is None:
+            gauge = self.gauges[name] = Gauge()
+        gauge.add(value)
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """Замер фазы: with metrics.span("kb_lookup"): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def instrument_driver(self, driver):
+        """Оборачивает driver.execute, чтобы считать и замерять каждую команду WebDriver
+
+        Драйвер оборачивается один раз, а команды попадают в Metrics, который последним вызвал
+        instrument_driver (driver._metrics): у каждого прогона в уже запущенном браузере
+        (daemon.py) свои замеры команд
+        """
+        if driver is None:
+            return driver
+        driver._metrics = self
+        if getattr(driver, "_metrics_wrapped", False):
+            return driver
+        execute = driver.execute
+
+        def timed_execute(command, params=None):
+            metrics = driver._metrics
+            if metrics is None:
+                return execute(command, params)
+            started = time.perf_counter()
+            try:
+                return execute(command, params)
+            finally:
+                timing = metrics.commands.get(command)
+                if timing is None:
+                    timing = metrics.commands[command] = Timing()
+                timing.add(time.perf_counter() - started)
+
+        driver.execute = timed_execute
+        driver._metrics_wrapped = True
+        return driver
+
+    def to_dict(self) -> Dict:
+        return {
+            "run_id": self.run_id,
+            "started": self.started,
+            "duration": round(time.time() - self.started, 3),
+            "spans": {name: timing.to_dict() for name, timing in self.spans.items()},
+            "webdriver_commands": {name: timing.to_dict() for name, timing in self.commands.items()},
+            "gauges": {name: gauge.to_dict() for name, gauge in self.gauges.items()},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Итоги прогона в текстовом формате Prometheus (для node_exporter textfile collector)"""
+        lines = []
+
+        def family(name, kind, help_text, table, label, value):
+            metric = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for key, timing in sorted(table.items()):
+                lines.append(f'{metric}{{run_id="{self.run_id}",{label}="{key}"}} {value(timing):.6g}')
+
+        total, count, longest = (lambda t: t.total), (lambda t: len(t.samples)), (lambda t: t.max)
+        family("span_seconds_total", "counter", "Total time spent in a run phase.", self.spans, "span", total)
+        family("span_count_total", "counter", "Number of times a run phase was entered.", self.spans, "span", count)
+        family("span_seconds_max", "gauge", "Longest single run phase.", self.spans, "span", longest)
+        family("webdriver_command_seconds_total", "counter", "Total time spent in a WebDriver command.",
+               self.commands, "command", total)
+        family("webdriver_command_count_total", "counter", "Number of WebDriver commands sent.",
+               self.commands, "command", count)
+        family("gauge_value", "gauge", "Last sampled value of a resource gauge.",
+               self.gauges, "gauge", lambda g: g.last)
+        family("gauge_max", "gauge", "Largest sampled value of a resource gauge.",
+               self.gauges, "gauge", lambda g: g.max)
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_run_duration_seconds Wall-clock duration of the run.")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge")
+        lines.append(f'{PROMETHEUS_PREFIX}_run_duration_seconds{{run_id="{self.run_id}"}} '
+                     f"{time.time() - self.started:.6g}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str = INSTRUMENTATION["output_dir"], quiet: bool = False):
+        """Сохраняет итоги прогона: run-<id>.json и run-<id>.prom"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"run-{self.run_id}")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+        with open(base + ".prom", "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        if not quiet:
+            logger.info("📊 Метрики сохранены в %s.json и %s.prom", base, base)
+
+
+class NullMetrics:
+    """Выключенные замеры: ничего не считает и не оборачивает драйвер"""
+
+    enabled = False
+    _span = contextlib.nullcontext()
+
+    def record(self, name, seconds):
+        pass
+
+    def span(self, name):
+        return self._span
+
+    def gauge(self, name, value):
+        pass
+
+    def instrument_driver(self, driver):
+        # Драйвер, обернутый прошлым прогоном, больше не пишет в его замеры
+        if getattr(driver, "_metrics_wrapped", False):
+            driver._metrics = None
+        return driver
+
+    def export(self, directory=None, quiet=False):
+        pass
+
+
+def create_metrics(enabled: bool = None):
+    """Metrics или NullMetrics в зависимости от config.INSTRUMENTATION["enabled"]"""
+    if enabled is None:
+        enabled = INSTRUMENTATION["enabled"]
+    return Metrics() if enabled else NullMetrics()
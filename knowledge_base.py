@@ -0,0 +1,242 @@
+"""
+База ответов, собранная из всех источников в один индекс.
+
+Источники (KNOWLEDGE_BASE["sources"]):
+    *.py    - словарь QUESTIONS_ANSWERS (читается через ast, без импорта модуля)
+    *.txt   - формат "вопрос: ответ1, ответ2" (см. utils.parse_question_line)
+    *.jsonl - {"question": "...", "answers": ["...", "..."]} по строке на вопрос;
+              формат без потерь для ответов с запятыми, двоеточиями и кавычками.
+              Записи без ответов пропускаются, поэтому источником может быть
+              и журнал неизвестных вопросов (unknown_questions.jsonl) с вписанными
+              в него ответами
+
+Собранная база вместе с индексом вопросов сохраняется в бинарный кэш,
+привязанный к mtime/размеру каждого источника. При старте кэш загружается
+без повторной нормализации; изменившиеся источники разбираются заново,
+а в индекс добавляются/удаляются только изменившиеся вопросы. refresh()
+проверяет источники не чаще reload_interval, поэтому долгоживущий процесс
+подхватывает правки без перезапуска.
+
+learn() дописывает правильные ответы, узнанные во время прохождения, в
+KNOWLEDGE_BASE["learned"] и сразу применяет их. Несколько процессов могут
+пользоваться одной базой через answer_service.py.
+"""
+
+import ast
+import json
+import logging
+import os
+import pickle
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import KNOWLEDGE_BASE, MATCHING
+from option_matcher import AnswerSet
+from question_index import QuestionIndex, QuestionMatch
+from utils import load_custom_questions
+
+logger = logging.getLogger(__name__)
+
+# Меняется при изменении формата кэша или индекса
+CACHE_VERSION = 3
+
+
+def load_python_questions(filename: str, name: str = "QUESTIONS_ANSWERS") -> Dict[str, List[str]]:
+    """Словарь name из .py файла; файл разбирается, а не импортируется, поэтому правки видны сразу"""
+    with open(filename, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename)
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == name for target in node.targets):
+            return ast.literal_eval(node.value)
+    return {}
+
+
+def load_jsonl_questions(filename: str) -> Dict[str, List[str]]:
+    """Вопросы из JSONL: {"question": "...", "answers": [...]} на каждой строке; записи без ответов пропускаются"""
+    questions = {}
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                entry = json.loads(line)
+                if entry.get("answers"):
+                    questions[entry["question"]] = list(entry["answers"])
+    return questions
+
+
+def save_jsonl_questions(questions: Dict[str, List[str]], filename: str):
+    """Записывает вопросы в JSONL (формат без потерь)"""
+    with open(filename, "w", encoding="utf-8") as f:
+        for question, answers in questions.items():
+            f.write(json.dumps({"question": question, "answers": answers}, ensure_ascii=False) + "\n")
+
+
+def load_source(filename: str) -> Dict[str, List[str]]:
+    """Загружает источник по расширению файла"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".py":
+        return load_python_questions(filename)
+    if extension == ".jsonl":
+        return load_jsonl_questions(filename)
+    return load_custom_questions(filename)
+
+
+def fingerprint(filename: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, размер) файла или None, если файла нет"""
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class KnowledgeBase:
+    def __init__(self, sources: List[str] = None, cache_path: Optional[str] = KNOWLEDGE_BASE["cache"],
+                 reload_interval: float = KNOWLEDGE_BASE["reload_interval"]):
+        self.sources = list(KNOWLEDGE_BASE["sources"] if sources is None else sources)
+        self.cache_path = cache_path
+        self.reload_interval = reload_interval
+        self.questions: Dict[str, List[str]] = {}
+        self.index = QuestionIndex({})
+        self.answer_sets: Dict[str, AnswerSet] = {}     # вопрос -> ответы в канонической форме
+        self._source_entries: Dict[str, Tuple[Optional[Tuple[int, int]], Dict[str, List[str]]]] = {}
+        self._checked = 0.0
+
+    @classmethod
+    def load(cls, **kwargs) -> "KnowledgeBase":
+        """База из кэша и источников"""
+        knowledge_base = cls(**kwargs)
+        knowledge_base._load_cache()
+        knowledge_base.refresh(force=True)
+        return knowledge_base
+
+    @classmethod
+    def from_questions(cls, questions: Dict[str, List[str]]) -> "KnowledgeBase":
+        """База из готового словаря, без файлов-источников и кэша"""
+        knowledge_base = cls(sources=[], cache_path=None)
+        knowledge_base._apply(dict(questions))
+        return knowledge_base
+
+    def __len__(self):
+        return len(self.questions)
+
+    def lookup(self, question_text: str) -> Optional[QuestionMatch]:
+        """Самый похожий вопрос из базы (с подхватом изменений в источниках)"""
+        self.refresh()
+        return self.index.lookup(question_text)
+
+    def answers(self, question: str) -> List[str]:
+        return self.questions.get(question, [])
+
+    def answer_set(self, question: str) -> AnswerSet:
+        """Ответы на вопрос, подготовленные для сопоставления с вариантами на странице"""
+        answer_set = self.answer_sets.get(question)
+        return answer_set if answer_set is not None else AnswerSet(self.answers(question))
+
+    def learn(self, question: str, answers: List[str], path: Optional[str] = KNOWLEDGE_BASE["learned"]) -> bool:
+        """Запоминает правильные ответы: дописывает их в path (источник learned) и сразу применяет.
+
+        True, если база изменилась
+        """
+        answers = list(answers)
+        if not answers or self.questions.get(question) == answers:
+            return False
+        if path:
+            cached = self._source_entries.get(path)
+            unchanged = cached is not None and cached[0] == fingerprint(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"question": question, "answers": answers}, ensure_ascii=False) + "\n")
+            if unchanged:
+                # Файл менял только этот процесс: перечитывать его при refresh не нужно
+                entries = dict(cached[1])
+                entries[question] = answers
+                self._source_entries[path] = (fingerprint(path), entries)
+        questions = dict(self.questions)
+        questions[question] = answers
+        self._apply(questions)
+        self._save_cache()
+        return True
+
+    def refresh(self, force: bool = False) -> bool:
+        """Перечитывает изменившиеся источники; True, если база изменилась"""
+        now = time.monotonic()
+        if not force and now - self._checked < self.reload_interval:
+            return False
+        self._checked = now
+
+        changed = False
+        for filename in self.sources:
+            current = fingerprint(filename)
+            cached = self._source_entries.get(filename)
+            if cached is not None and cached[0] == current:
+                continue
+            try:
+                entries = load_source(filename) if current else {}
+            except Exception as e:
+                logger.error("Ошибка при загрузке вопросов из файла %s: %s", filename, e)
+                continue
+            self._source_entries[filename] = (current, entries)
+            changed = True
+
+        for filename in set(self._source_entries) - set(self.sources):
+            del self._source_entries[filename]
+            changed = True
+
+        if changed:
+            # Более поздние источники перекрывают более ранние, как в merge_questions_with_unknown
+            merged = {}
+            for filename in self.sources:
+                merged.update(self._source_entries.get(filename, (None, {}))[1])
+            self._apply(merged)
+            self._save_cache()
+            logger.info("📚 База ответов обновлена: %d вопросов", len(self.questions))
+        return changed
+
+    def _apply(self, questions: Dict[str, List[str]]):
+        """Обновляет индекс только по добавленным и удаленным вопросам, ответы - только по изменившимся"""
+        for question in self.questions.keys() - questions.keys():
+            self.index.remove(question)
+            self.answer_sets.pop(question, None)
+        for question in questions.keys() - self.questions.keys():
+            self.index.add(question)
+        for question, answers in questions.items():
+            answer_set = self.answer_sets.get(question)
+            if answer_set is None or answer_set.answers != answers:
+                self.answer_sets[question] = AnswerSet(answers)
+        self.questions = questions
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "rb") as f:
+                cache = pickle.load(f)
+            if cache.get("version") != CACHE_VERSION or cache.get("sources") != self.sources:
+                return
+            self._source_entries = cache["entries"]
+            self.questions = cache["questions"]
+            self.index = cache["index"]
+            self.answer_sets = cache["answer_sets"]
+            self.index.threshold = MATCHING["question_threshold"]
+        except Exception as e:
+            logger.warning("Кэш базы ответов не загружен (%s), база будет собрана заново", e)
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        cache = {
+            "version": CACHE_VERSION,
+            "sources": self.sources,
+            "entries": self._source_entries,
+            "questions": self.questions,
+            "index": self.index,
+            "answer_sets": self.answer_sets,
+        }
+        temporary = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.cache_path)
+        except OSError as e:
+            logger.error("Ошибка при сохранении кэша базы ответов: %s", e)
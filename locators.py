@@ -0,0 +1,265 @@
+"""
+Реестр локаторов: для каждого элемента страницы - несколько способов его найти.
+
+Первым идет селектор из config.SELECTORS, за ним запасные из
+config.LOCATOR_FALLBACKS. Браузер пробует их по порядку и останавливается
+на первом, который нашел элементы; время каждой попытки замеряется в самом
+браузере (performance.now) и возвращается вместе с результатом. Раз в
+LOCATORS["probe_every"] запросов пробуются все способы, чтобы набрать
+статистику и по запасным.
+
+Основной селектор остается первым, пока он не сломан (доля находок ниже
+min_hit_rate): запасные часто шире основного (span.white_color находит и
+span с несколькими классами), поэтому быстрый запасной не должен подменять
+точный. За основным идут запасные: надежные - по среднему времени, затем
+еще не проверенные, затем сломанные. Если основной селектор перестал
+находить элемент после смены верстки, первым становится запасной, а в
+отчете сразу видно, какой селектор сломан или медленный. Статистика сохраняется в LOCATORS["stats_file"] и
+используется в следующих прогонах.
+
+Несколько элементов находятся одним execute_script (resolve, снимок
+страницы в page_snapshot.py).
+
+Отчет по сохраненной статистике:
+    python locators.py
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, List, Optional
+
+from config import LOCATOR_FALLBACKS, LOCATORS, SELECTORS
+
+# Поиск по списку способов с замером времени каждой попытки; XPath отличается
+# от CSS по началу селектора. root - элемент, относительно которого ищем
+LOCATE_JS = """
+const __locatorReport = [];
+function isXPath(selector) {
+    return selector.startsWith('/') || selector.startsWith('(') || selector.startsWith('./')
+        || selector.startsWith('../');
+}
+function findAll(selector, root) {
+    root = root || document;
+    if (isXPath(selector)) {
+        const found = document.evaluate(selector, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nodes = [];
+        for (let i = 0; i < found.snapshotLength; i++) nodes.push(found.snapshotItem(i));
+        return nodes;
+    }
+    return Array.from(root.querySelectorAll(selector));
+}
+function locate(name, strategies, probe, root) {
+    let found = [];
+    const tried = [];
+    for (const selector of strategies) {
+        const started = performance.now();
+        let nodes;
+        try { nodes = findAll(selector, root); } catch (e) { nodes = []; }
+        tried.push([selector, performance.now() - started, nodes.length]);
+        if (nodes.length && !found.length) {
+            found = nodes;
+            if (!probe) break;
+        }
+    }
+    __locatorReport.push([name, tried]);
+    return found;
+}
+function findFirst(strategies, root) {
+    for (const selector of strategies) {
+        try {
+            const nodes = findAll(selector, root);
+            if (nodes.length) return nodes[0];
+        } catch (e) {}
+    }
+    return null;
+}
+function isVisible(element) {
+    return element && element.getClientRects().length ? element : null;
+}
+"""
+
+# Аргументы: {элемент: [способы]}, пробовать ли все способы
+RESOLVE_SCRIPT = """
+const [locators, probe] = arguments;
+""" + LOCATE_JS + """
+const found = {};
+for (const name of Object.keys(locators)) {
+    found[name] = isVisible(locate(name, locators[name], probe)[0]);
+}
+return {found: found, locators: __locatorReport};
+"""
+
+
+def default_strategies() -> Dict[str, List[str]]:
+    """Способы по элементам: селектор из SELECTORS, затем запасные"""
+    strategies = {name: [selector] for name, selector in SELECTORS.items()}
+    # Кликабельный div варианта ищется от родителя span с текстом варианта
+    strategies["answer_target"] = [f":scope > {SELECTORS['answer_container']} > div"]
+    for name, fallbacks in LOCATOR_FALLBACKS.items():
+        strategies.setdefault(name, [])
+        strategies[name] += [selector for selector in fallbacks if selector not in strategies[name]]
+    return strategies
+
+
+class StrategyStats:
+    """Статистика одного способа: попытки, когда элемент на странице был, находки и время"""
+
+    __slots__ = ("attempts", "hits", "seconds")
+
+    def __init__(self, attempts: int = 0, hits: int = 0, seconds: float = 0.0):
+        self.attempts = attempts
+        self.hits = hits
+        self.seconds = seconds
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.seconds * 1000 / self.attempts if self.attempts else 0.0
+
+
+class LocatorRegistry:
+    def __init__(self, strategies: Optional[Dict[str, List[str]]] = None,
+                 stats_file: Optional[str] = LOCATORS["stats_file"]):
+        self.strategies = strategies or default_strategies()
+        self.stats_file = stats_file
+        self.stats: Dict[str, Dict[str, StrategyStats]] = {name: {} for name in self.strategies}
+        self.absent: Dict[str, int] = {name: 0 for name in self.strategies}    # Ни один способ не нашел
+        self.resolutions = 0
+        if stats_file:
+            self.load()
+
+    def ordered(self, name: str) -> List[str]:
+        """Способы в порядке проверки: основной, если он не сломан; запасные - надежные по скорости,
+        непроверенные; сломанные"""
+        stats = self.stats[name]
+
+        def rank(item):
+            position, selector = item
+            entry = stats.get(selector)
+            verified = entry is not None and entry.attempts >= LOCATORS["min_samples"]
+            if verified and entry.hit_rate < LOCATORS["min_hit_rate"]:
+                return 3, position, 0.0
+            if position == 0:
+                return 0, 0.0, position
+            if not verified:
+                return 2, position, 0.0
+            return 1, entry.mean_ms, position
+
+        return [selector for _, selector in sorted(enumerate(self.strategies[name]), key=rank)]
+
+    def plan(self, names: List[str]):
+        """Способы для скрипта в браузере и признак полной проверки всех способов"""
+        self.resolutions += 1
+        probe = self.resolutions % LOCATORS["probe_every"] == 0
+        return {name: self.ordered(name) for name in names}, probe
+
+    def update(self, report: List[list]):
+        """Учитывает попытки из браузера: [[элемент, [[селектор, мс, найдено], ...]], ...]"""
+        for name, tried in report:
+            stats = self.stats.setdefault(name, {})
+            if not any(count for _, _, count in tried):
+                # Элемента нет на странице (например, кнопки "Ответить" на последнем вопросе)
+                self.absent[name] = self.absent.get(name, 0) + 1
+                continue
+            for selector, milliseconds, count in tried:
+                entry = stats.get(selector)
+                if entry is None:
+                    entry = stats[selector] = StrategyStats()
+                entry.attempts += 1
+                entry.hits += count > 0
+                entry.seconds += milliseconds / 1000
+
+    def resolve(self, driver, names: List[str]) -> Dict[str, object]:
+        """Видимые элементы по именам одним execute_script; None - элемент не найден"""
+        locators, probe = self.plan(names)
+        raw = driver.execute_script(RESOLVE_SCRIPT, locators, probe)
+        self.update(raw.get("locators", []))
+        return raw["found"]
+
+    def problems(self) -> List[str]:
+        """Сломанные и медленные способы, о которых стоит знать после смены верстки"""
+        problems = []
+        for name, strategies in self.strategies.items():
+            primary = self.stats[name].get(strategies[0])
+            if primary is None or primary.attempts < LOCATORS["min_samples"]:
+                continue
+            if primary.hit_rate < LOCATORS["min_hit_rate"]:
+                working = next((selector for selector in self.ordered(name)
+                                if self.stats[name].get(selector) and self.stats[name][selector].hit_rate
+                                >= LOCATORS["min_hit_rate"]), None)
+                problems.append(f"{name}: селектор {strategies[0]} находит элемент в {primary.hit_rate:.0%} случаев"
+                                + (f", работает {working}" if working else ", запасные тоже не работают"))
+            elif primary.mean_ms > LOCATORS["slow_ms"]:
+                problems.append(f"{name}: селектор {strategies[0]} медленный ({primary.mean_ms:.1f} мс)")
+        return problems
+
+    def report(self) -> List[tuple]:
+        """(элемент, селектор, попыток, доля находок, среднее время мс) в порядке проверки"""
+        rows = []
+        for name in self.strategies:
+            for selector in self.ordered(name):
+                entry = self.stats[name].get(selector) or StrategyStats()
+                rows.append((name, selector, entry.attempts, entry.hit_rate, entry.mean_ms))
+        return rows
+
+    def load(self):
+        try:
+            with open(self.stats_file, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, strategies in saved.items():
+            if name not in self.strategies:
+                continue
+            for selector, (attempts, hits, seconds) in strategies.items():
+                if selector in self.strategies[name]:
+                    self.stats[name][selector] = StrategyStats(attempts, hits, seconds)
+
+    def save(self):
+        if not self.stats_file:
+            return
+        data = {name: {selector: [entry.attempts, entry.hits, round(entry.seconds, 6)]
+                       for selector, entry in strategies.items()}
+                for name, strategies in self.stats.items() if strategies}
+        temporary = f"{self.stats_file}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(temporary, self.stats_file)
+
+
+_registry: Optional[LocatorRegistry] = None
+
+
+def default_registry() -> LocatorRegistry:
+    """Общий реестр процесса"""
+    global _registry
+    if _registry is None:
+        _registry = LocatorRegistry()
+    return _registry
+
+
+def element_visible(name: str, registry: Optional[LocatorRegistry] = None):
+    """Условие ожидания: видимый элемент по имени из реестра, иначе False"""
+    def condition(driver):
+        return (registry or default_registry()).resolve(driver, [name])[name] or False
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stats", default=LOCATORS["stats_file"])
+    args = parser.parse_args()
+
+    registry = LocatorRegistry(stats_file=args.stats)
+    for name, selector, attempts, hit_rate, mean_ms in registry.report():
+        print(f"{name:<20} {attempts:>6} {hit_rate:>5.0%} {mean_ms:>7.2f} мс  {selector}")
+    for problem in registry.problems():
+        print(f"⚠ {problem}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from concurrent.futures import ThreadPoolExecutor
 
-from test_automation import TestAutomation
-from config import LEVEL_UP_URL
+from config import BACKEND, LEVEL_UP_URL
+from utils import setup_logging
+
+
+def load_automation():
+    """Модуль автоматизации и база ответов (или клиент сервиса ответов); грузятся, пока запускается браузер"""
+    from answer_service import create_knowledge_base
+    from test_automation import TestAutomation
+
+    return TestAutomation, create_knowledge_base()
 
 
 def main():
@@ -11,19 +17,35 @@ def main():
     Скрипт проходит тест "Царь горы".
     Отвечает на имеющиеся вопросы с ответами в question.py
     Сохраняет вопросы без ответов в custom_question.txt
-
-    TODO: написать функционал для прохождения "Вопрос дня"
+    Для нескольких аккаунтов параллельно см. pool_runner.py
+    Ожидание открытия игры и "Вопрос дня" см. scheduler.py
     """
 
-    # настройки браузера (опционально)
-    options = Options()
+    setup_logging()
+
+    # Тяжелые модули импортируются здесь, а не при импорте main; база ответов
+    # собирается в фоне, пока стартуют chromedriver и Chrome
+    from browser import create_driver
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        loading = executor.submit(load_automation)
+
+        # инициализация браузера и запуск основного функционала
+        with create_driver() as driver:
+            driver.get(LEVEL_UP_URL)
+            TestAutomation, knowledge_base = loading.result()
+            if BACKEND == "async":
+                import trio
+                from async_backend import AsyncTestAutomation
+
+                trio.run(AsyncTestAutomation(driver, knowledge_base=knowledge_base).run_automation)
+            else:
+                from run_state import run_with_restarts
 
-    # инициализация браузера и запуск основного функционала
-    with webdriver.Chrome(options=options) as driver:
-        driver.get(LEVEL_UP_URL)
-        level_up = TestAutomation(driver)
+                level_up = TestAutomation(driver, knowledge_base=knowledge_base)
 
-        level_up.run_automation()
+                # Если Chrome упадет, браузер перезапускается и тест продолжается с контрольной точки
+                run_with_restarts(level_up, create_driver, LEVEL_UP_URL)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+"""
+Локальный тестовый сервер, повторяющий сценарий теста "Царь горы".
+
+Страницы собраны из тех же элементов, что ищет config.SELECTORS: кнопка
+"Начать игру", div.question_text > p, span.white_color с вариантами,
+section.orange_color.orange_bg для клика, кнопки "Ответить"/"Завершить".
+Как на сайте, на последнем вопросе вместо "Ответить" только "Завершить":
+она отправляет ответы и завершает тест. Количество вопросов и вариантов
+настраивается, задержка ответа сервера добавляется к каждому запросу.
+
+Запуск:
+    python mock_server.py --questions 20 --latency 0.05
+    python mock_server.py --start-page
+"""
+
+import argparse
+import html
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from config import MOCK_SERVER
+from questions import QUESTIONS_ANSWERS
+
+PAGE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>Царь горы</title>
+<style>
+  .answer {{ display: flex; align-items: center; margin: 8px 0; }}
+  section.orange_color.orange_bg > div {{ width: 24px; height: 24px; border: 2px solid #f80; cursor: pointer; }}
+  section.orange_color.orange_bg > div.selected {{ background: #f80; }}
+  .inlay {{ display: inline-block; padding: 8px 16px; background: #333; color: #fff; cursor: pointer; }}
+</style>
+</head>
+<body>
+{body}
+<script>
+  document.querySelectorAll('section.orange_color.orange_bg > div').forEach(function (box) {{
+    box.addEventListener('click', function () {{
+      box.classList.toggle('selected');
+      var selected = Array.from(document.querySelectorAll('section.orange_color.orange_bg > div.selected'))
+        .map(function (element) {{ return element.dataset.index; }});
+      document.querySelector('input[name=options]').value = selected.join(',');
+    }});
+  }});
+  document.querySelectorAll('.inlay > b').forEach(function (button) {{
+    button.addEventListener('click', function () {{
+      document.getElementById(button.dataset.form).submit();
+    }});
+  }});
+</script>
+</body>
+</html>
+"""
+
+
+def build_questions(count: int, options: int, seed: int = 0) -> List[Tuple[str, List[str], List[str]]]:
+    """Вопросы для сервера: (вопрос, варианты на странице, правильные ответы) из базы ответов"""
+    rng = random.Random(seed)
+    source = list(QUESTIONS_ANSWERS.items())
+    questions = []
+    for number in range(count):
+        question, answers = source[number % len(source)]
+        distractors = [f"Неверный вариант {k}" for k in range(1, max(options - len(answers), 1) + 1)]
+        page_options = list(answers) + distractors
+        rng.shuffle(page_options)
+        questions.append((question, page_options, list(answers)))
+    return questions
+
+
+class QuizState:
+    """Состояние прохождения для одной сессии (куки mock_session)"""
+
+    def __init__(self, started: bool):
+        self.started = started
+        self.position = 0
+        self.correct = 0
+        self.completed = False
+
+
+class MockQuizServer:
+    def __init__(self, host: str = MOCK_SERVER["host"], port: int = MOCK_SERVER["port"],
+                 questions: int = MOCK_SERVER["questions"], options: int = MOCK_SERVER["options"],
+                 latency: float = MOCK_SERVER["latency"], start_page: bool = False, seed: int = 0):
+        self.questions = build_questions(questions, options, seed)
+        self.latency = latency
+        self.start_page = start_page
+        self.sessions: Dict[str, QuizState] = {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> str:
+        """Запускает сервер в фоновом потоке и возвращает его адрес"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "completed": sum(state.completed for state in self.sessions.values()),
+                "answered": sum(state.position for state in self.sessions.values()),
+                "correct": sum(state.correct for state in self.sessions.values()),
+            }
+
+    # --- страницы ---
+
+    @staticmethod
+    def _button(text: str, form: str) -> str:
+        return (f'<form id="{form}" method="post" action="/{form}"><input type="hidden" name="options" value=""></form>'
+                f"<div class=\"inlay\"><b data-form=\"{form}\">{text}</b></div>")
+
+    def render(self, state: QuizState) -> str:
+        if not state.started:
+            body = self._button("Начать игру", "start")
+        elif state.completed:
+            body = f"<h1>Тест завершен</h1><p class=\"result\">Правильно: {state.correct} из {len(self.questions)}</p>"
+        elif state.position >= len(self.questions):
+            body = self._button("Завершить", "complete")
+        else:
+            question, options, _ = self.questions[state.position]
+            answers = "".join(
+                f'<div class="answer"><span class="white_color">{html.escape(option)}</span>'
+                f'<section class="orange_color orange_bg"><div data-index="{index}"></div></section></div>'
+                for index, option in enumerate(options)
+            )
+            last = state.position == len(self.questions) - 1
+            button = self._button("Завершить", "complete") if last else self._button("Ответить", "answer")
+            body = (f'<div class="question_text"><p>{html.escape(question)}</p></div>'
+                    f'<div class="answers">{answers}</div>' + button)
+        return PAGE.format(body=body)
+
+    def handle_post(self, state: QuizState, action: str, form: Dict[str, List[str]]):
+        if action == "start":
+            state.started = True
+        elif action in ("answer", "complete") and state.started and state.position < len(self.questions):
+            if action == "complete" and state.position != len(self.questions) - 1:
+                return
+            _, options, answers = self.questions[state.position]
+            raw = form.get("options", [""])[0]
+            selected = {options[int(index)] for index in raw.split(",") if index.isdigit() and int(index) < len(options)}
+            state.correct += selected == set(answers)
+            state.position += 1
+            state.completed = action == "complete"
+        elif action == "complete" and state.position >= len(self.questions):
+            state.completed = True
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _state(self) -> Tuple[str, QuizState]:
+                cookies = dict(
+                    part.strip().split("=", 1) for part in self.headers.get("Cookie", "").split(";") if "=" in part
+                )
+                session_id = cookies.get("mock_session") or uuid.uuid4().hex
+                with server.lock:
+                    state = server.sessions.setdefault(session_id, QuizState(started=not server.start_page))
+                return session_id, state
+
+            def _send(self, status: int, body: bytes, content_type: str, session_id: str, location: str = None):
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Set-Cookie", f"mock_session={session_id}; Path=/")
+                if location:
+                    self.send_header("Location", location)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    body = json.dumps(server.stats()).encode()
+                    return self._send(200, body, "application/json", "")
+                session_id, state = self._state()
+                with server.lock:
+                    page = server.render(state)
+                self._send(200, page.encode("utf-8"), "text/html; charset=utf-8", session_id)
+
+            def do_POST(self):
+                session_id, state = self._state()
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                with server.lock:
+                    server.handle_post(state, self.path.strip("/"), form)
+                self._send(303, b"", "text/plain", session_id, location="/")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=MOCK_SERVER["host"])
+    parser.add_argument("--port", type=int, default=MOCK_SERVER["port"])
+    parser.add_argument("--questions", type=int, default=MOCK_SERVER["questions"], help="Количество вопросов")
+    parser.add_argument("--options", type=int, default=MOCK_SERVER["options"], help="Вариантов ответа на вопрос")
+    parser.add_argument("--latency", type=float, default=MOCK_SERVER["latency"], help="Задержка ответа, секунды")
+    parser.add_argument("--start-page", action="store_true", help="Начинать с кнопки 'Начать игру'")
+    args = parser.parse_args()
+
+    server = MockQuizServer(args.host, args.port, args.questions, args.options, args.latency, args.start_page)
+    print(f"Тестовый сервер: {server.url} (Ctrl+C для остановки)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Несколько сессий теста во вкладках одного браузера.
+
+Вместо отдельного Chrome на каждый прогон открывается K вкладок одного Chrome.
+Каждая вкладка - свой конечный автомат поверх TestAutomation; планировщик
+по кругу переключается между вкладками и продвигает ту, у которой страница
+уже готова, пока остальные ждут своих переходов. Ответ отправляется через
+TestAutomation.answer_snapshot, как в обычном прохождении (история, трасса,
+запоминание правильных ответов); у каждой вкладки своя история и трасса,
+а замеры общие на все вкладки.
+
+Вкладки одного браузера делят профиль и куки, поэтому режим подходит для
+независимых страниц одного аккаунта (или тестового сервера). Для разных
+аккаунтов используйте pool_runner.py.
+
+Запуск:
+    python multitab.py --tabs 3
+    python multitab.py --url https://levelup.t2.ru/ --url https://levelup.t2.ru/daily
+"""
+
+import argparse
+import logging
+import time
+from typing import List
+
+from selenium.common.exceptions import WebDriverException
+
+from browser import create_driver
+from config import LEVEL_UP_URL, RECOVERY, WAIT_POLL_INTERVAL, WAIT_TIMEOUTS
+from instrumentation import create_metrics
+from run_state import FAILED_OUTCOMES
+from session_trace import create_recorder
+from test_automation import TestAutomation
+from utils import log_context, new_run_id, setup_logging
+from waits import question_changed, question_ready
+
+logger = logging.getLogger(__name__)
+
+
+class TabSession:
+    """Прохождение теста в одной вкладке, по одному неблокирующему шагу за раз"""
+
+    def __init__(self, driver, handle, name, **kwargs):
+        """kwargs передаются в TestAutomation (metrics, recorder, history...)"""
+        self.driver = driver
+        self.handle = handle
+        self.name = name
+        self.automation = TestAutomation(driver, **kwargs)
+        self.state = "first_question"
+        self.question = None
+        self.questions_count = 0
+        self.failures = 0
+        self.error = None
+        self.deadline = time.monotonic() + WAIT_TIMEOUTS["first_question"]
+
+    @property
+    def done(self):
+        return self.state == "done"
+
+    def fail(self, error):
+        self.error = error
+        self._enter("done")
+
+    def _enter(self, state):
+        self.state = state
+        if state in WAIT_TIMEOUTS:
+            self.deadline = time.monotonic() + WAIT_TIMEOUTS[state]
+        if state == "done":
+            # Итоги вкладки: история, трасса, статистика локаторов (замеры выгружает run_tabs)
+            self.automation.finish_run(export_metrics=False)
+
+    def _answer(self, snapshot):
+        outcome = self.automation.answer_snapshot(snapshot)
+        if outcome in FAILED_OUTCOMES:
+            # Ответ не ушел: вопрос повторяется по перечитанной странице
+            self.failures += 1
+            if self.failures > RECOVERY["question_retries"]:
+                self.fail(f"не удалось ответить на вопрос: {outcome}")
+            else:
+                self._enter("first_question")
+            return
+        self.failures = 0
+        self.question = snapshot.question
+        self.questions_count += 1
+        self._enter("done" if outcome == "complete" else "next_question")
+
+    def _finish(self, snapshot):
+        snapshot.complete_button.click()
+        logger.info("🏁 Прохождение теста завершено")
+        self._enter("done")
+
+    def step(self):
+        """Одна проверка страницы во вкладке (драйвер уже переключен на нее). True, если состояние сменилось"""
+        if self.state == "first_question":
+            # Первый вопрос или повтор вопроса, на который не удалось ответить
+            snapshot = question_ready(self.driver)
+            if snapshot:
+                self._answer(snapshot)
+        elif self.state == "next_question":
+            snapshot = question_changed(self.question)(self.driver)
+            if snapshot and snapshot.question and snapshot.question != self.question:
+                self._answer(snapshot)
+            elif snapshot:
+                self._finish(snapshot)
+        else:
+            return False
+
+        if not snapshot and time.monotonic() > self.deadline:
+            self.fail(f"таймаут ожидания: {self.state}")
+            return True
+        return bool(snapshot)
+
+
+def open_tabs(driver, urls: List[str], metrics=None) -> List[TabSession]:
+    """Открывает по вкладке на каждый URL (первая - текущее окно); metrics - общие замеры вкладок"""
+    run_id = getattr(metrics, "run_id", None) or new_run_id()
+    sessions = []
+    for number, url in enumerate(urls, 1):
+        if number > 1:
+            driver.switch_to.new_window("tab")
+        driver.get(url)
+        # Трасса у каждой вкладки своя: у вкладок одного процесса одинаковый run_id по умолчанию
+        sessions.append(TabSession(driver, driver.current_window_handle, f"вкладка {number}", metrics=metrics,
+                                   recorder=create_recorder(run_id=f"{run_id}-tab{number}")))
+    return sessions
+
+
+def run_tabs(driver, urls: List[str], metrics=None) -> List[TabSession]:
+    """Проходит тест во всех вкладках, чередуя их по готовности страниц"""
+    metrics = metrics if metrics is not None else create_metrics()
+    sessions = open_tabs(driver, urls, metrics)
+    current = None
+
+    while True:
+        active = [session for session in sessions if not session.done]
+        if not active:
+            break
+
+        progressed = False
+        for session in active:
+            try:
+                if current != session.handle:
+                    driver.switch_to.window(session.handle)
+                    current = session.handle
+                # События лога вкладки помечены ее именем (поле worker)
+                with log_context(worker=session.name, run_id=session.automation.run_id):
+                    progressed |= session.step()
+            except WebDriverException as e:
+                with log_context(worker=session.name, run_id=session.automation.run_id):
+                    session.fail(f"{type(e).__name__}: {e.msg}")
+
+        # Ни одна вкладка не готова - ждем, а не опрашиваем браузер впустую
+        if not progressed:
+            time.sleep(WAIT_POLL_INTERVAL)
+
+    for session in sessions:
+        status = f"ошибка: {session.error}" if session.error else "готово"
+        with log_context(worker=session.name, run_id=session.automation.run_id):
+            logger.info("Вопросов: %d, %s", session.questions_count, status)
+    metrics.export()
+    return sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tabs", type=int, default=2, help="Сколько вкладок открыть с LEVEL_UP_URL")
+    parser.add_argument("--url", action="append", help="URL для отдельной вкладки (можно указать несколько раз)")
+    args = parser.parse_args()
+
+    setup_logging()
+    urls = args.url or [LEVEL_UP_URL] * args.tabs
+    with create_driver() as driver:
+        run_tabs(driver, urls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Сопоставление правильных ответов из базы с вариантами на странице.
+
+Ответы в базе и на странице расходятся в мелочах: точка в конце ("Нельзя."),
+ё/е, кавычки, пробелы. Канонические формы и триграммы ответов считаются
+один раз при загрузке базы (AnswerSet), поэтому на странице нормализуется
+только каждый вариант, а совпадения ищутся по словарю за O(вариантов).
+Оставшиеся пары сравниваются нечетко по коэффициенту Дайса, но не больше
+max_fuzzy_pairs сравнений на вопрос. Нечеткое совпадение принимается, только если
+у варианта те же числа и отрицания, что у ответа (question_index.key_tokens), и он
+похож на ответ заметно сильнее следующего варианта (MATCHING["option_margin"]):
+"Не использовать..." и "В течение 30 дней" - другие ответы, а не перефразировка.
+Для каждого варианта возвращается уверенность совпадения.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from config import MATCHING
+from question_index import key_tokens, trigrams
+from utils import canonical_text
+
+
+class AnswerSet:
+    """Правильные ответы одного вопроса с заранее посчитанными каноническими формами"""
+
+    __slots__ = ("answers", "exact", "grams", "keys")
+
+    def __init__(self, answers: Iterable[str]):
+        self.answers: List[str] = list(answers)
+        self.exact: Dict[str, str] = {}                 # каноническая форма -> ответ
+        self.grams: List[Tuple[str, frozenset]] = []     # (ответ, триграммы канонической формы)
+        self.keys: Dict[str, tuple] = {}                # ответ -> числа и отрицания (key_tokens)
+        for answer in self.answers:
+            text = canonical_text(answer)
+            self.exact.setdefault(text, answer)
+            self.grams.append((answer, frozenset(trigrams(text))))
+            self.keys[answer] = key_tokens(text)
+
+    def __len__(self):
+        return len(self.answers)
+
+
+class OptionMatch(NamedTuple):
+    index: int              # Номер варианта на странице
+    option: str             # Текст варианта на странице
+    answer: Optional[str]   # Ответ из базы, которому соответствует вариант
+    score: float            # Уверенность 0..1 (1.0 - совпадение канонических форм)
+
+    @property
+    def selected(self) -> bool:
+        return self.answer is not None
+
+
+class OptionMatcher:
+    # Сколько пар (ответ, вариант) можно сравнить нечетко на один вопрос
+    max_fuzzy_pairs = 64
+
+    def __init__(self, threshold: Optional[float] = None, margin: Optional[float] = None):
+        self.threshold = MATCHING["option_threshold"] if threshold is None else threshold
+        self.margin = MATCHING["option_margin"] if margin is None else margin
+
+    def match(self, answer_set: AnswerSet, options: List[str]) -> List[OptionMatch]:
+        """Совпадение для каждого варианта на странице (answer=None, если вариант не из правильных)"""
+        results: List[Optional[OptionMatch]] = [None] * len(options)
+        canonical = [canonical_text(option) for option in options]
+
+        matched = set()
+        for index, text in enumerate(canonical):
+            answer = answer_set.exact.get(text)
+            if answer is not None and answer not in matched:
+                matched.add(answer)
+                results[index] = OptionMatch(index, options[index], answer, 1.0)
+
+        remaining = [(answer, grams) for answer, grams in answer_set.grams if answer not in matched]
+        free = [index for index, result in enumerate(results) if result is None]
+        best_scores = dict.fromkeys(free, 0.0)
+        if remaining and free:
+            pairs = []
+            budget = self.max_fuzzy_pairs
+            option_grams = {index: trigrams(canonical[index]) for index in free}
+            option_keys = {index: key_tokens(canonical[index]) for index in free}
+            for answer, answer_grams in remaining:
+                candidates = []
+                for index in free:
+                    if budget <= 0:
+                        break
+                    budget -= 1
+                    grams = option_grams[index]
+                    if not grams or not answer_grams:
+                        continue
+                    score = 2 * len(grams & answer_grams) / (len(grams) + len(answer_grams))
+                    best_scores[index] = max(best_scores[index], score)
+                    if option_keys[index] == answer_set.keys[answer]:
+                        candidates.append((score, index))
+
+                # Ответ принимается только за единственный явно лучший вариант
+                candidates.sort(reverse=True)
+                if candidates and candidates[0][0] >= self.threshold and (
+                        len(candidates) == 1 or candidates[0][0] - candidates[1][0] >= self.margin):
+                    pairs.append((candidates[0][0], candidates[0][1], answer))
+
+            # Каждый ответ и каждый вариант используются не больше одного раза, лучшие пары первыми
+            for score, index, answer in sorted(pairs, reverse=True):
+                if results[index] is None and answer not in matched:
+                    matched.add(answer)
+                    results[index] = OptionMatch(index, options[index], answer, score)
+
+        return [result or OptionMatch(index, options[index], None, best_scores.get(index, 0.0))
+                for index, result in enumerate(results)]
+
+    def select(self, answer_set: AnswerSet, options: List[str]) -> List[OptionMatch]:
+        """Только варианты, которые нужно выбрать"""
+        return [result for result in self.match(answer_set, options) if result.selected]
@@ -0,0 +1,118 @@
+"""
+Часы, паузы и случайные задержки прохождения.
+
+Все ожидания (PageWaiter, человекоподобный темп, паузы между кликами)
+получают время и засыпают через объект часов:
+
+    SystemClock  - настоящее время (time.perf_counter / time.sleep)
+    VirtualClock - виртуальное время: sleep только передвигает часы, поэтому
+                   прохождение с ожиданиями и таймаутами идет со скоростью CPU
+                   (прогон против фейкового драйвера, см. benchmarks/virtual_run.py)
+
+Pacer выдает задержки по ключам из config.PACING["delays"]: у каждого ключа
+свое распределение и свой генератор, засеянный от PACING["seed"] и имени
+ключа, поэтому последовательность задержек воспроизводима и не зависит от
+того, сколько раз запрашивались другие ключи.
+"""
+
+import functools
+import heapq
+import itertools
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import HUMAN_PACING, PACING
+
+
+class SystemClock:
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """Виртуальное время: sleep мгновенно передвигает часы и выполняет наступившие события"""
+
+    def __init__(self, start: float = 0.0):
+        self.time = start
+        self.slept = 0.0        # Сколько виртуального времени прошло в sleep (паузы и опрос страницы)
+        self._events: List[Tuple[float, int, Callable[[], None]]] = []
+        self._order = itertools.count()
+
+    def now(self) -> float:
+        return self.time
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self.slept += seconds
+            self.advance(seconds)
+
+    def advance(self, seconds: float):
+        """Передвигает часы на seconds, по пути выполняя запланированные события"""
+        target = self.time + seconds
+        while self._events and self._events[0][0] <= target:
+            at, _, callback = heapq.heappop(self._events)
+            self.time = max(self.time, at)
+            callback()
+        self.time = target
+
+    def call_at(self, at: float, callback: Callable[[], None]):
+        """Выполнить callback, когда виртуальное время дойдет до at (например, загрузка страницы)"""
+        heapq.heappush(self._events, (at, next(self._order), callback))
+
+    def call_later(self, delay: float, callback: Callable[[], None]):
+        self.call_at(self.time + delay, callback)
+
+
+def _sampler(rng: random.Random, distribution: tuple) -> Callable[[], float]:
+    """Функция без аргументов, выдающая задержку: ("uniform", 1, 3), ("triangular", 1, 3, 1.5),
+    ("lognormvariate", mu, sigma), ("constant", 0.5) - имя метода random.Random и его параметры"""
+    name, *params = distribution
+    if name == "constant":
+        value = float(params[0])
+        return lambda: value
+    return functools.partial(getattr(rng, name), *params)
+
+
+class Pacer:
+    def __init__(self, clock=None, seed: Optional[int] = PACING["seed"], enabled: bool = HUMAN_PACING,
+                 delays: Optional[Dict[str, tuple]] = None):
+        self.clock = clock or SystemClock()
+        self.enabled = enabled
+        self.seed = seed
+        delays = delays if delays is not None else PACING["delays"]
+        # Распределения компилируются один раз, а не на каждый запрос задержки
+        self._samplers = {key: _sampler(self._rng(key), distribution) for key, distribution in delays.items()}
+        self._default = _sampler(self._rng("default"), PACING["default"])
+
+    def _rng(self, key: str) -> random.Random:
+        return random.Random(None if self.seed is None else f"{self.seed}:{key}")
+
+    def delay(self, key: str) -> float:
+        """Случайная задержка для ключа (секунды)"""
+        return self._samplers.get(key, self._default)()
+
+    def pause(self, key: str, elapsed: float = 0.0) -> float:
+        """Добирает шаг до задержки ключа, если темп включен; возвращает время сна"""
+        if not self.enabled:
+            return 0.0
+        remaining = self.delay(key) - elapsed
+        if remaining > 0:
+            self.clock.sleep(remaining)
+            return remaining
+        return 0.0
+
+
+_pacer: Optional[Pacer] = None
+
+
+def default_pacer() -> Pacer:
+    """Общий Pacer процесса с настоящими часами"""
+    global _pacer
+    if _pacer is None:
+        _pacer = Pacer()
+    return _pacer
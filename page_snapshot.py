@@ -0,0 +1,96 @@
+"""
+Снимок страницы с вопросом, полученный одним вызовом execute_script.
+
+Вместо отдельных запросов к WebDriver на текст вопроса, каждый span с ответом,
+каждый клик-контейнер и кнопки "Ответить"/"Завершить" браузер сам собирает
+и возвращает одной структурой. Элементы для клика возвращаются как WebElement.
+Элементы ищутся способами из реестра locators.py в порядке, который он выбрал.
+"""
+
+from typing import Any, List, NamedTuple, Optional
+
+from config import RECOVERY
+from locators import LOCATE_JS, default_registry
+from utils import canonical_text
+
+# Способы поиска каждого элемента передаются аргументом (locators.LocatorRegistry.plan);
+# вместе со снимком возвращается время каждой попытки
+SNAPSHOT_SCRIPT = """
+const [locators, probe, selectedClasses] = arguments;
+""" + LOCATE_JS + """
+const question = locate('question', locators.question, probe)[0];
+const options = [];
+for (const span of locate('answer_options', locators.answer_options, probe)) {
+    const text = span.innerText.trim();
+    if (!text) continue;
+    const parent = span.parentElement;
+    const target = parent ? locate('answer_target', locators.answer_target, probe, parent)[0] || null : null;
+    const selected = !!target && (selectedClasses.some(name => target.classList.contains(name))
+        || target.getAttribute('aria-checked') === 'true' || target.getAttribute('aria-pressed') === 'true');
+    options.push({text: text, target: target, selected: selected});
+}
+
+// Кнопка считается доступной, если она отрисована на странице
+return {
+    question: question ? question.innerText.trim() : null,
+    options: options,
+    submit: isVisible(locate('submit_button', locators.submit_button, probe)[0]),
+    complete: isVisible(locate('complete_button', locators.complete_button, probe)[0]),
+    locators: __locatorReport,
+};
+"""
+
+SNAPSHOT_ELEMENTS = ["question", "answer_options", "answer_target", "submit_button", "complete_button"]
+
+# Тексты элементов по селектору (CSS или XPath), например вариантов, которые сайт
+# отметил правильными после отправки ответа
+RESULT_SCRIPT = """
+const [selector] = arguments;
+""" + LOCATE_JS + """
+return findAll(selector).map(element => element.innerText.trim()).filter(text => text);
+"""
+
+
+class AnswerOption(NamedTuple):
+    index: int      # Порядковый номер варианта на странице
+    text: str       # Текст варианта ответа
+    target: Any     # WebElement div внутри section.orange_color.orange_bg, по которому кликать
+    selected: bool = False  # Вариант уже выбран (например, до сбоя на этом вопросе)
+
+
+class PageSnapshot(NamedTuple):
+    question: Optional[str]
+    options: List[AnswerOption]
+    submit_button: Any = None       # WebElement кнопки "Ответить", если она видна
+    complete_button: Any = None     # WebElement кнопки "Завершить", если она видна
+
+    @property
+    def option_texts(self) -> List[str]:
+        return [option.text for option in self.options]
+
+    def find_option(self, text: str) -> Optional[AnswerOption]:
+        """Вариант ответа с таким текстом (без учета регистра, ё/е, пунктуации и пробелов)"""
+        for option in self.options:
+            if option.text == text:
+                return option
+        canonical = canonical_text(text)
+        for option in self.options:
+            if canonical_text(option.text) == canonical:
+                return option
+        return None
+
+
+def take_snapshot(driver, registry=None) -> PageSnapshot:
+    """Снимает вопрос, варианты ответов и кнопки за один запрос к браузеру"""
+    registry = registry or default_registry()
+    locators, probe = registry.plan(SNAPSHOT_ELEMENTS)
+    raw = driver.execute_script(SNAPSHOT_SCRIPT, locators, probe, RECOVERY["selected_classes"])
+    registry.update(raw.get("locators", []))
+    options = [AnswerOption(index, option["text"], option["target"], bool(option.get("selected")))
+               for index, option in enumerate(raw["options"])]
+    return PageSnapshot(raw["question"], options, raw["submit"], raw["complete"])
+
+
+def read_result(driver, selector: str) -> List[str]:
+    """Тексты элементов по селектору одним запросом к браузеру; пустой список - элементов нет"""
+    return driver.execute_script(RESULT_SCRIPT, selector) or []
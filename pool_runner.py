@@ -0,0 +1,194 @@
+"""
+Прохождение "Царя горы" для нескольких аккаунтов параллельно.
+
+Каждый аккаунт проходит тест в отдельном процессе со своим браузером и своим
+профилем Chrome. Одновременно работает не больше POOL["workers"] процессов;
+зависший процесс останавливается по таймауту вместе со своими chromedriver и
+Chrome (иначе профиль остается занятым), упавший не влияет на остальных.
+
+Запуск:
+    python pool_runner.py
+    python pool_runner.py --accounts accounts.json --workers 4 --timeout 600
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from collections import deque
+from typing import Dict, List
+
+import psutil
+
+from config import ACCOUNTS_FILE, DRIVER_SERVICE, LEVEL_UP_URL, POOL, PROFILES_DIR
+from utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def load_accounts(filename: str = ACCOUNTS_FILE) -> List[Dict[str, str]]:
+    """Загружает список аккаунтов: [{"name": "...", "profile_dir": "..."}]; profile_dir необязателен"""
+    with open(filename, "r", encoding="utf-8") as f:
+        accounts = json.load(f)
+
+    for account in accounts:
+        account.setdefault("profile_dir", os.path.join(PROFILES_DIR, account["name"]))
+    return accounts
+
+
+def check_accounts(accounts: List[Dict[str, str]]) -> None:
+    """Имена и профили аккаунтов должны быть разными: по имени собираются результаты,
+    а один профиль Chrome не открыть в двух браузерах сразу"""
+    for key in ("name", "profile_dir"):
+        seen = set()
+        for account in accounts:
+            value = os.path.abspath(account[key]) if key == "profile_dir" else account[key]
+            if value in seen:
+                raise ValueError(f"Повторяется {key} аккаунта: {account[key]}")
+            seen.add(value)
+
+
+def stop_worker(process, profile_dir: str, timeout: float = 5) -> None:
+    """Останавливает исполнителя и его браузер: процессы-потомки (chromedriver, Chrome) и
+    все процессы Chrome с профилем аккаунта. process.terminate() остановил бы только Python,
+    а в Windows Chrome продолжал бы держать профиль"""
+    profile_argument = f"--user-data-dir={os.path.abspath(profile_dir)}"
+    try:
+        processes = psutil.Process(process.pid).children(recursive=True)
+    except psutil.NoSuchProcess:
+        processes = []
+    if DRIVER_SERVICE["resident"]:
+        # Резидентный chromedriver общий для всех исполнителей
+        processes = [child for child in processes if "chromedriver" not in child.name().lower()]
+    for candidate in psutil.process_iter(["cmdline"]):
+        if profile_argument in (candidate.info["cmdline"] or []) and candidate not in processes:
+            processes.append(candidate)
+
+    process.terminate()
+    for child in processes:
+        try:
+            child.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    _, alive = psutil.wait_procs(processes, timeout=timeout)
+    for child in alive:
+        try:
+            child.kill()
+        except psutil.NoSuchProcess:
+            pass
+    process.join(timeout)
+
+
+def run_account(account: Dict[str, str], results) -> None:
+    """Точка входа процесса-исполнителя: один аккаунт, один браузер"""
+    # Selenium импортируется уже в дочернем процессе
+    from browser import create_driver
+    from config import RECOVERY
+    from run_state import Checkpoint, run_with_restarts
+    from test_automation import TestAutomation
+    from utils import set_log_defaults
+
+    # Свой поток записи лога в каждом процессе; события помечены именем аккаунта
+    set_log_defaults(worker=account["name"])
+    setup_logging()
+    started = time.monotonic()
+    result = {"account": account["name"], "status": "ok", "questions": 0, "error": None}
+    try:
+        profile_dir = os.path.abspath(account["profile_dir"])
+        # Своя контрольная точка у каждого аккаунта, рядом с его профилем
+        checkpoint = Checkpoint.load(f"{profile_dir}.{RECOVERY['checkpoint_file']}", LEVEL_UP_URL)
+        with create_driver(profile_dir) as driver:
+            driver.get(LEVEL_UP_URL)
+            result["questions"] = run_with_restarts(TestAutomation(driver), lambda: create_driver(profile_dir),
+                                                    LEVEL_UP_URL, checkpoint)
+    except Exception as e:
+        message = str(e).strip().splitlines()
+        result.update(status="error", error=f"{type(e).__name__}: {message[0] if message else ''}")
+    result["seconds"] = round(time.monotonic() - started, 1)
+    results.put(result)
+
+
+def run_pool(accounts: List[Dict[str, str]], workers: int = POOL["workers"],
+             timeout: float = POOL["timeout"]) -> List[Dict]:
+    """Запускает аккаунты в пуле из workers процессов и возвращает результаты по каждому"""
+    check_accounts(accounts)
+    context = multiprocessing.get_context("spawn")
+    results_queue = context.Queue()
+    pending = deque(accounts)
+    running = {}    # имя аккаунта -> (процесс, время запуска, профиль)
+    results = {}
+
+    while pending or running:
+        while pending and len(running) < workers:
+            account = pending.popleft()
+            process = context.Process(target=run_account, args=(account, results_queue), name=account["name"])
+            process.start()
+            running[account["name"]] = (process, time.monotonic(), account["profile_dir"])
+            logger.info("▶ %s: запущен (pid %d)", account["name"], process.pid)
+
+        try:
+            result = results_queue.get(timeout=0.5)
+            results[result["account"]] = result
+        except queue.Empty:
+            pass
+
+        for name, (process, started, profile_dir) in list(running.items()):
+            elapsed = time.monotonic() - started
+            if process.is_alive() and elapsed > timeout:
+                stop_worker(process, profile_dir)
+                results[name] = {"account": name, "status": "timeout", "questions": 0,
+                                 "seconds": round(elapsed, 1), "error": f"не уложился в {timeout} с"}
+            elif process.is_alive():
+                continue
+
+            process.join()
+            if name not in results:
+                # Результат мог еще не дойти через очередь
+                try:
+                    result = results_queue.get(timeout=1)
+                    results[result["account"]] = result
+                except queue.Empty:
+                    pass
+            if name not in results:
+                results[name] = {"account": name, "status": "crashed", "questions": 0,
+                                 "seconds": round(elapsed, 1), "error": f"код завершения {process.exitcode}"}
+            logger.info("■ %s: %s", name, results[name]["status"])
+            del running[name]
+
+    return [results[account["name"]] for account in accounts]
+
+
+def print_summary(results: List[Dict], wall_seconds: float) -> None:
+    """Сводка по всем аккаунтам"""
+    print("\nИтоги:")
+    print("=" * 50)
+    for result in results:
+        status = "✓" if result["status"] == "ok" else "✗"
+        line = f"{status} {result['account']}: {result['status']}, вопросов: {result['questions']}, {result['seconds']} с"
+        if result["error"]:
+            line += f" ({result['error']})"
+        print(line)
+
+    succeeded = sum(result["status"] == "ok" for result in results)
+    print(f"\nУспешно: {succeeded}/{len(results)}, общее время: {wall_seconds:.1f} с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", default=ACCOUNTS_FILE, help="JSON со списком аккаунтов")
+    parser.add_argument("--workers", type=int, default=POOL["workers"], help="Сколько браузеров одновременно")
+    parser.add_argument("--timeout", type=float, default=POOL["timeout"], help="Таймаут на аккаунт, секунды")
+    args = parser.parse_args()
+
+    setup_logging()
+    accounts = load_accounts(args.accounts)
+    started = time.monotonic()
+    results = run_pool(accounts, max(1, args.workers), args.timeout)
+    print_summary(results, time.monotonic() - started)
+
+
+if __name__ == "__main__":
+    main()
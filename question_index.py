@@ -0,0 +1,139 @@
+"""
+Индекс вопросов для быстрого нечеткого поиска.
+
+Тексты нормализуются один раз при построении индекса. Поиск идет в два шага:
+точное совпадение канонической формы (O(1)), затем кандидаты из инвертированного
+индекса по символьным триграммам с оценкой похожести по коэффициенту Дайса.
+Кандидаты с другими числами или отрицаниями (key_tokens) не принимаются:
+"Кому нельзя..." и "Кому можно..." - разные вопросы.
+"""
+
+import math
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+from config import MATCHING
+from utils import canonical_text
+
+
+class QuestionMatch(NamedTuple):
+    question: str   # Вопрос в том виде, в котором он записан в базе
+    score: float    # Похожесть 0..1 (1.0 - точное совпадение канонической формы)
+
+
+def trigrams(text: str) -> set:
+    """Множество символьных триграмм канонического текста"""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+_NEGATIONS = frozenset(MATCHING["negations"])
+_MODAL_WORDS = frozenset(MATCHING["modal_words"])
+
+
+def key_tokens(text: str) -> tuple:
+    """Слова канонического текста, от которых зависит смысл: числа, отрицания со следующим словом, модальные слова
+
+    "не буду переходить" и "буду переходить ... не фишинговая" почти совпадают по триграммам,
+    но дают разные key_tokens
+    """
+    words = text.split()
+    tokens = []
+    for position, word in enumerate(words):
+        if word in _NEGATIONS:
+            tokens.append(" ".join(words[position:position + 2]))
+        elif word in _MODAL_WORDS or any(char.isdigit() for char in word):
+            tokens.append(word)
+    return tuple(sorted(tokens))
+
+
+class QuestionIndex:
+    # Сколько самых редких триграмм запроса просматривается в инвертированном индексе
+    max_probe = 16
+    # Сколько лучших кандидатов проверяется точным подсчетом похожести
+    max_candidates = 8
+
+    def __init__(self, questions: Dict[str, List[str]], threshold: Optional[float] = None):
+        self.threshold = MATCHING["question_threshold"] if threshold is None else threshold
+        self._questions = []
+        self._canonical = []
+        self._sizes = []
+        self._ids = {}          # вопрос -> номер в индексе
+        self._exact = {}        # каноническая форма -> номер
+        self._postings = {}     # триграмма -> номера вопросов
+        self._deleted = set()   # номера удаленных вопросов (записи в _postings остаются)
+
+        for question in questions:
+            self.add(question)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, question: str):
+        """Добавляет вопрос в индекс без перестройки остальных"""
+        if question in self._ids:
+            return
+        question_id = len(self._questions)
+        text = canonical_text(question)
+        grams = trigrams(text)
+        self._questions.append(question)
+        self._canonical.append(text)
+        self._sizes.append(len(grams))
+        self._ids[question] = question_id
+        self._exact.setdefault(text, question_id)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(question_id)
+
+    def remove(self, question: str):
+        """Убирает вопрос из поиска"""
+        question_id = self._ids.pop(question, None)
+        if question_id is None:
+            return
+        self._deleted.add(question_id)
+        if self._exact.get(self._canonical[question_id]) == question_id:
+            del self._exact[self._canonical[question_id]]
+
+    def __contains__(self, question_text):
+        return canonical_text(question_text) in self._exact
+
+    def lookup(self, question_text: str, threshold: Optional[float] = None) -> Optional[QuestionMatch]:
+        """Находит самый похожий вопрос; None, если похожесть ниже порога"""
+        threshold = self.threshold if threshold is None else threshold
+        text = canonical_text(question_text)
+
+        question_id = self._exact.get(text)
+        if question_id is not None:
+            return QuestionMatch(self._questions[question_id], 1.0)
+
+        grams = trigrams(text)
+        if not grams:
+            return None
+
+        # Фильтр по префиксу: если кандидат похож не меньше чем на threshold,
+        # он обязан встретиться хотя бы в одной из probe_count самых редких триграмм запроса.
+        # Частые триграммы с длинными списками не просматриваются, а max_probe
+        # ограничивает стоимость поиска для длинных вопросов.
+        probe_count = len(grams) - math.ceil(threshold * len(grams) / 2) + 1
+        probe = sorted(grams, key=lambda gram: len(self._postings.get(gram, ())))
+        hits = Counter()
+        for gram in probe[:max(1, min(probe_count, self.max_probe))]:
+            hits.update(self._postings.get(gram, ()))
+        for question_id in self._deleted & hits.keys():
+            del hits[question_id]
+        if not hits:
+            return None
+
+        keys = key_tokens(text)
+        best_id, best_score = None, 0.0
+        for question_id, _ in hits.most_common(self.max_candidates):
+            # Верхняя оценка похожести по размеру множеств - отсекаем без подсчета пересечения
+            if 2 * min(len(grams), self._sizes[question_id]) / (len(grams) + self._sizes[question_id]) <= best_score:
+                continue
+            common = len(grams & trigrams(self._canonical[question_id]))
+            score = 2 * common / (len(grams) + self._sizes[question_id])
+            if score > best_score and key_tokens(self._canonical[question_id]) == keys:
+                best_id, best_score = question_id, score
+
+        if best_id is None or best_score < threshold:
+            return None
+        return QuestionMatch(self._questions[best_id], best_score)
@@ -0,0 +1,340 @@
+"""
+История прохождений в SQLite.
+
+Каждый вопрос дописывается в таблицу answers: выбранные ответы, правильные
+ответы из базы, исход и время. Старые записи не меняются. В той же
+транзакции обновляются агрегаты:
+
+    runs            - по прогону: сколько вопросов, попаданий, промахов, неизвестных
+    question_stats  - по вопросу (ключ - нормализованный текст): то же и суммарное время
+    totals          - итоги по всем прогонам, одна строка
+
+Отчеты читают агрегаты по ключу и не перебирают историю, поэтому их
+стоимость не зависит от числа прогонов.
+
+Неудачные попытки ответа (no_options, click_failed, submit_failed: страница
+перечитывается и вопрос повторяется) пишутся в отдельную таблицу attempts и
+в агрегаты не попадают: вопрос, отвеченный со второй попытки, считается один
+раз, по исходу отправленного ответа.
+
+Исход вопроса:
+    hit     - вопрос найден в базе, выбраны все правильные ответы
+    miss    - вопрос найден, но выбраны не все правильные ответы
+    unknown - вопроса нет в базе
+
+Отчет:
+    python run_history.py
+    python run_history.py --worst 20
+    python run_history.py --question "Текст вопроса"
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import time
+from typing import List, NamedTuple, Optional
+
+from config import RUN_HISTORY
+from option_matcher import AnswerSet
+from utils import canonical_text
+
+logger = logging.getLogger(__name__)
+
+HIT, MISS, UNKNOWN = "hit", "miss", "unknown"
+# Исходы, при которых ответ отправлен; остальные - неудачные попытки, после которых вопрос повторяется
+SENT_OUTCOMES = ("submitted", "complete")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL,
+    backend TEXT,
+    questions INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    unknown INTEGER NOT NULL DEFAULT 0,
+    seconds REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    recorded REAL NOT NULL,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    selected TEXT NOT NULL,
+    expected TEXT,
+    status TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    recorded REAL NOT NULL,
+    key TEXT NOT NULL,
+    question TEXT NOT NULL,
+    selected TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_key ON attempts (key);
+CREATE TABLE IF NOT EXISTS question_stats (
+    key TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    seen INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    unknown INTEGER NOT NULL DEFAULT 0,
+    seconds REAL NOT NULL DEFAULT 0,
+    last_seen REAL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    runs INTEGER NOT NULL DEFAULT 0,
+    questions INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    unknown INTEGER NOT NULL DEFAULT 0,
+    seconds REAL NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO totals (id) VALUES (1);
+"""
+
+
+class QuestionStats(NamedTuple):
+    question: str
+    seen: int
+    hits: int
+    misses: int
+    unknown: int
+    seconds: float
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.seen if self.seen else 0.0
+
+    @property
+    def miss_rate(self) -> float:
+        return self.misses / self.seen if self.seen else 0.0
+
+    @property
+    def unknown_rate(self) -> float:
+        return self.unknown / self.seen if self.seen else 0.0
+
+    @property
+    def average_seconds(self) -> float:
+        return self.seconds / self.seen if self.seen else 0.0
+
+
+def question_status(expected: Optional[List[str]], options: List[str], clicked: List[int], outcome: str) -> str:
+    """hit, miss или unknown; expected - None, если вопроса нет в базе.
+
+    hit - ответ отправлен, каждый выбранный вариант совпадает с ответом из базы (с точностью до
+    канонической формы), и выбраны все ответы из базы, которые есть среди вариантов на странице.
+    Нечеткие совпадения и лишние клики считаются промахом.
+    """
+    if expected is None:
+        return UNKNOWN
+    if outcome not in SENT_OUTCOMES or not clicked:
+        return MISS
+    answers = AnswerSet(expected).exact
+    selected = {canonical_text(options[index]) for index in clicked if index < len(options)}
+    shown = {canonical_text(option) for option in options} & answers.keys()
+    return HIT if selected and selected <= answers.keys() and shown <= selected else MISS
+
+
+class RunHistory:
+    def __init__(self, path: str = RUN_HISTORY["path"], backend: str = None):
+        self.path = path
+        self.backend = backend
+        self.run_id: Optional[int] = None
+        # Несколько процессов (pool_runner) пишут в одну базу: WAL и ожидание блокировки
+        self._connection = sqlite3.connect(path, timeout=RUN_HISTORY["busy_timeout"])
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def start_run(self) -> int:
+        with self._connection:
+            self.run_id = self._connection.execute(
+                "INSERT INTO runs (started, backend) VALUES (?, ?)", (time.time(), self.backend)
+            ).lastrowid
+            self._connection.execute("UPDATE totals SET runs = runs + 1 WHERE id = 1")
+        return self.run_id
+
+    def record(self, question: str, options: List[str], clicked: List[int], expected: Optional[List[str]],
+               outcome: str, seconds: float) -> str:
+        """Дописывает вопрос и обновляет агрегаты; возвращает исход (hit, miss, unknown).
+
+        Неудачная попытка (ответ не отправлен) только дописывается в attempts; возвращается None
+        """
+        if self.run_id is None:
+            self.start_run()
+        now = time.time()
+        selected = [options[index] for index in clicked if index < len(options)]
+        if outcome not in SENT_OUTCOMES:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT INTO attempts (run_id, recorded, key, question, selected, outcome, seconds)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.run_id, now, canonical_text(question), question, json.dumps(selected, ensure_ascii=False),
+                     outcome, seconds),
+                )
+            return None
+
+        status = question_status(expected, options, clicked, outcome)
+        counters = (int(status == HIT), int(status == MISS), int(status == UNKNOWN))
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO answers (run_id, recorded, question, options, selected, expected, status, outcome, seconds)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.run_id, now, question, json.dumps(options, ensure_ascii=False),
+                 json.dumps(selected, ensure_ascii=False),
+                 json.dumps(expected, ensure_ascii=False) if expected is not None else None,
+                 status, outcome, seconds),
+            )
+            self._connection.execute(
+                "INSERT INTO question_stats (key, question, seen, hits, misses, unknown, seconds, last_seen)"
+                " VALUES (?, ?, 1, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET question = excluded.question, seen = seen + 1,"
+                " hits = hits + excluded.hits, misses = misses + excluded.misses,"
+                " unknown = unknown + excluded.unknown, seconds = seconds + excluded.seconds,"
+                " last_seen = excluded.last_seen",
+                (canonical_text(question), question, *counters, seconds, now),
+            )
+            for table, key in (("runs", self.run_id), ("totals", 1)):
+                self._connection.execute(
+                    f"UPDATE {table} SET questions = questions + 1, hits = hits + ?, misses = misses + ?,"
+                    f" unknown = unknown + ?, seconds = seconds + ? WHERE id = ?",
+                    (*counters, seconds, key),
+                )
+        return status
+
+    def finish_run(self):
+        if self.run_id is None:
+            return
+        with self._connection:
+            self._connection.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), self.run_id))
+        summary = self.run_summary()
+        logger.info("📒 История: %d/%d верно, неизвестных %d (%s)",
+                    summary.hits, summary.seen, summary.unknown, self.path)
+        self.run_id = None
+
+    def close(self):
+        self.finish_run()
+        self._connection.close()
+
+    # --- чтение агрегатов ---
+
+    def question_stats(self, question: str) -> Optional[QuestionStats]:
+        row = self._connection.execute(
+            "SELECT question, seen, hits, misses, unknown, seconds FROM question_stats WHERE key = ?",
+            (canonical_text(question),),
+        ).fetchone()
+        return QuestionStats(*row) if row else None
+
+    def failed_attempts(self, question: str) -> int:
+        """Сколько раз ответ на вопрос не удалось отправить с первой попытки"""
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM attempts WHERE key = ?", (canonical_text(question),)
+        ).fetchone()[0]
+
+    def totals(self) -> QuestionStats:
+        """Итоги по всем прогонам; в поле question - количество прогонов"""
+        runs, *counters = self._connection.execute(
+            "SELECT runs, questions, hits, misses, unknown, seconds FROM totals WHERE id = 1"
+        ).fetchone()
+        return QuestionStats(f"прогонов: {runs}", *counters)
+
+    def run_summary(self, run_id: int = None) -> QuestionStats:
+        run_id = run_id or self.run_id
+        row = self._connection.execute(
+            "SELECT started, questions, hits, misses, unknown, seconds FROM runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return QuestionStats("", 0, 0, 0, 0, 0.0)
+        started, *counters = row
+        return QuestionStats(time.strftime("%Y-%m-%d %H:%M", time.localtime(started)), *counters)
+
+    def worst_questions(self, limit: int = 10, min_seen: int = 1) -> List[QuestionStats]:
+        """Вопросы с наименьшей долей попаданий"""
+        rows = self._connection.execute(
+            "SELECT question, seen, hits, misses, unknown, seconds FROM question_stats WHERE seen >= ?"
+            " ORDER BY CAST(hits AS REAL) / seen, seen DESC LIMIT ?",
+            (min_seen, limit),
+        ).fetchall()
+        return [QuestionStats(*row) for row in rows]
+
+    def recent_runs(self, limit: int = 10) -> List[QuestionStats]:
+        rows = self._connection.execute("SELECT id FROM runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self.run_summary(run_id) for run_id, in rows]
+
+
+class NullHistory:
+    """История прохождений выключена"""
+
+    def record(self, *args, **kwargs):
+        return None
+
+    def finish_run(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def create_history(enabled: bool = None, backend: str = None):
+    """RunHistory или NullHistory в зависимости от config.RUN_HISTORY["enabled"]"""
+    if enabled is None:
+        enabled = RUN_HISTORY["enabled"]
+    if not enabled:
+        return NullHistory()
+    try:
+        return RunHistory(backend=backend)
+    except sqlite3.Error as e:
+        logger.warning("История прохождений недоступна: %s", e)
+        return NullHistory()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=RUN_HISTORY["path"])
+    parser.add_argument("--worst", type=int, default=10, help="Сколько вопросов с наименьшей долей попаданий показать")
+    parser.add_argument("--min-seen", type=int, default=2, help="Только вопросы, встреченные не реже")
+    parser.add_argument("--runs", type=int, default=5, help="Сколько последних прогонов показать")
+    parser.add_argument("--question", help="Статистика одного вопроса")
+    args = parser.parse_args()
+
+    history = RunHistory(args.path)
+    try:
+        if args.question:
+            stats = history.question_stats(args.question)
+            if stats is None:
+                print("Вопрос не встречался")
+            else:
+                print(f"{stats.question}\n  встречен: {stats.seen}, попаданий: {stats.hit_rate:.0%}, "
+                      f"промахов: {stats.miss_rate:.0%}, неизвестен: {stats.unknown_rate:.0%}, "
+                      f"среднее время: {stats.average_seconds:.2f} с, "
+                      f"неудачных попыток: {history.failed_attempts(args.question)}")
+            return
+
+        totals = history.totals()
+        print(f"Всего ({totals.question}): вопросов {totals.seen}, попаданий {totals.hit_rate:.1%}, "
+              f"промахов {totals.miss_rate:.1%}, неизвестных {totals.unknown_rate:.1%}, "
+              f"в среднем {totals.average_seconds:.2f} с на вопрос")
+
+        print("\nПоследние прогоны:")
+        for run in history.recent_runs(args.runs):
+            print(f"  {run.question}  {run.hits}/{run.seen} верно, неизвестных {run.unknown}, {run.seconds:.1f} с")
+
+        print(f"\nХуже всего (встречены не реже {args.min_seen} раз):")
+        for stats in history.worst_questions(args.worst, args.min_seen):
+            print(f"  {stats.hit_rate:4.0%} из {stats.seen:<4} {stats.question}")
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Прохождение теста как конечный автомат с контрольной точкой.
+
+Состояния RunMachine:
+
+    fetch   - ожидание первого вопроса
+    answer  - выбор ответов и отправка
+    next    - ожидание следующего вопроса
+    recover - после сбоя: продолжить на открытой странице или перезагрузить ее
+    done    - конец прохождения
+
+После каждого отправленного ответа позиция (номер вопроса и множество
+отвеченных вопросов) сохраняется в контрольную точку RECOVERY["checkpoint_file"].
+Временные ошибки драйвера (устаревший элемент, элемент не найден, клик
+перехвачен) переводят автомат в recover: сбой стоит одного вопроса, а не
+всего прохождения. На вопрос и на прогон отведено ограниченное число
+повторов. Если браузер упал, RunMachine поднимает BrowserLost, и
+run_with_restarts запускает новый браузер и продолжает с контрольной точки.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Iterable, Optional
+
+import urllib3
+from selenium.common.exceptions import (InvalidSessionIdException, NoSuchWindowException, TimeoutException,
+                                        WebDriverException)
+
+from config import RECOVERY
+from page_snapshot import take_snapshot
+from unknown_journal import question_hash
+from waits import question_ready
+
+logger = logging.getLogger(__name__)
+
+FETCH, ANSWER, NEXT, RECOVER, DONE = "fetch", "answer", "next", "recover", "done"
+
+# Исходы TestAutomation.answer_snapshot, после которых страницу нужно перечитать. no_options -
+# на странице нет ни одного варианта (она не догрузилась); если варианты есть, но не совпали
+# с базой, TestAutomation.decide выбирает запасной вариант, и повторы на это не тратятся
+FAILED_OUTCOMES = {"no_options", "click_failed", "submit_failed"}
+
+# Признаки в тексте ошибки, по которым понятно, что браузер или вкладка потеряны
+BROWSER_LOST_MARKERS = ("disconnected", "not reachable", "session deleted", "no such window",
+                        "target window already closed", "invalid session id")
+
+
+class BrowserLost(Exception):
+    """Браузер упал или сессия chromedriver потеряна - нужен новый браузер"""
+
+
+class StepFailed(Exception):
+    """Шаг не выполнен (не прошли клики или отправка) - страницу нужно перечитать"""
+
+
+def browser_lost(error: BaseException) -> bool:
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException, OSError, urllib3.exceptions.HTTPError)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in BROWSER_LOST_MARKERS)
+
+
+class Checkpoint:
+    """Позиция прохождения: сколько вопросов отвечено и какие (по хэшу нормализованного текста)"""
+
+    def __init__(self, path: str = RECOVERY["checkpoint_file"], url: Optional[str] = None, position: int = 0,
+                 answered: Iterable[str] = (), started: Optional[float] = None):
+        self.path = path
+        self.url = url
+        self.position = position
+        self.answered = set(answered)
+        self.started = started or time.time()
+
+    @classmethod
+    def load(cls, path: str = RECOVERY["checkpoint_file"], url: Optional[str] = None,
+             max_age: float = RECOVERY["max_age"]) -> "Checkpoint":
+        """Сохраненная позиция, если она не старше max_age и для того же url; иначе пустая"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path, url)
+        if time.time() - data.get("updated", 0) > max_age or (url and data.get("url") not in (None, url)):
+            return cls(path, url)
+        checkpoint = cls(path, data.get("url") or url, data.get("position", 0), data.get("answered", []),
+                         data.get("started"))
+        logger.info("📍 Продолжение с контрольной точки: отвечено %d вопросов", checkpoint.position)
+        return checkpoint
+
+    def answered_before(self, question: str) -> bool:
+        return question_hash(question) in self.answered
+
+    def mark_answered(self, question: str):
+        key = question_hash(question)
+        if key not in self.answered:
+            self.answered.add(key)
+            self.position += 1
+        self.save()
+
+    def save(self):
+        data = {"url": self.url, "position": self.position, "answered": sorted(self.answered),
+                "started": self.started, "updated": time.time()}
+        # Запись во временный файл и замена: падение посреди записи не портит точку
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class RunMachine:
+    def __init__(self, automation, checkpoint: Optional[Checkpoint] = None,
+                 question_retries: int = RECOVERY["question_retries"], run_retries: int = RECOVERY["run_retries"]):
+        self.automation = automation
+        self.checkpoint = checkpoint if checkpoint is not None else Checkpoint()
+        self.question_retries = question_retries
+        self.run_retries = run_retries
+        self.state = FETCH
+        self.snapshot = None
+        self.question_failures = 0
+        self.failures = 0
+        self.finished = False           # Тест пройден до конца (не остановлен по лимиту повторов)
+        self._question_started = None
+
+    def run(self) -> int:
+        """Прохождение до конца или до исчерпания повторов; возвращает номер достигнутого вопроса"""
+        steps = {FETCH: self._fetch, ANSWER: self._answer, NEXT: self._next, RECOVER: self._recover}
+        while self.state != DONE:
+            try:
+                self.state = steps[self.state]()
+            except (WebDriverException, StepFailed, OSError, urllib3.exceptions.HTTPError) as e:
+                if browser_lost(e):
+                    raise BrowserLost(_first_line(e)) from e
+                self.state = self._fail(e)
+
+        if self.finished:
+            self.checkpoint.clear()
+        return self.checkpoint.position
+
+    def _fetch(self):
+        try:
+            with self.automation.metrics.span("question_fetch"):
+                self.snapshot = self.automation.waiter.until("first_question", question_ready)
+        except TimeoutException:
+            logger.warning("🌚 Не удалось найти вопрос на странице")
+            return DONE
+        return ANSWER
+
+    def _answer(self):
+        question = self.snapshot.question
+        if self._question_started is None:
+            self._question_started = self.automation.clock.now()
+        if self.checkpoint.answered_before(question):
+            logger.info("↩ Вопрос уже был отвечен до сбоя, отвечаем снова")
+
+        outcome = self.automation.answer_snapshot(self.snapshot)
+        if outcome in FAILED_OUTCOMES:
+            raise StepFailed(outcome)
+        self.question_failures = 0
+        self.checkpoint.mark_answered(question)
+        if outcome == "complete":
+            self._question_done()
+            self.finished = True
+            return DONE
+        return NEXT
+
+    def _next(self):
+        snapshot = self.automation.wait_next_question(self.snapshot.question)
+        self._question_done()
+        if not snapshot:
+            logger.info("🏁 Прохождение теста завершено")
+            self.finished = True
+            return DONE
+        self.snapshot = snapshot
+        return ANSWER
+
+    def _recover(self):
+        """Продолжение на открытой странице; если вопроса на ней нет - перезагрузка"""
+        snapshot = take_snapshot(self.automation.driver)
+        if snapshot.question:
+            self.snapshot = snapshot
+            return ANSWER
+        if snapshot.complete_button and not snapshot.submit_button:
+            snapshot.complete_button.click()
+            logger.info("🏁 Прохождение теста завершено")
+            self.finished = True
+            return DONE
+        logger.warning("🔄 Вопрос не найден, перезагрузка страницы")
+        self.automation.driver.refresh()
+        return FETCH
+
+    def _fail(self, error: BaseException):
+        self.question_failures += 1
+        self.failures += 1
+        logger.warning("⚠ Сбой на вопросе %d: %s: %s (попытка %d из %d)", self.checkpoint.position + 1,
+                       type(error).__name__, _first_line(error), self.question_failures, self.question_retries)
+        if self.question_failures > self.question_retries or self.failures > self.run_retries:
+            logger.error("🛑 Лимит повторов исчерпан; продолжить можно с контрольной точки %s", self.checkpoint.path)
+            return DONE
+        return RECOVER
+
+    def _question_done(self):
+        if self._question_started is not None:
+            self.automation.metrics.record("question", self.automation.clock.now() - self._question_started)
+            self._question_started = None
+
+
+def _first_line(error: BaseException) -> str:
+    lines = str(error).strip().splitlines()
+    return lines[0] if lines else ""
+
+
+def quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def run_with_restarts(automation, driver_factory, url: str, checkpoint: Optional[Checkpoint] = None,
+                      restarts: int = RECOVERY["browser_restarts"]) -> int:
+    """run_automation с перезапуском браузера, если он упал; прохождение продолжается с контрольной точки.
+
+    driver_factory() создает новый драйвер; браузер, с которым создан automation,
+    закрывает вызывающий код, новые - эта функция.
+    """
+    checkpoint = checkpoint if checkpoint is not None else Checkpoint.load(url=url)
+    replacement = None
+    try:
+        for attempt in range(restarts + 1):
+            try:
+                return automation.run_automation(checkpoint)
+            except BrowserLost as e:
+                logger.error("💥 Браузер недоступен: %s", e)
+                if attempt == restarts:
+                    break
+                logger.warning("🔁 Перезапуск браузера (%d из %d)", attempt + 1, restarts)
+                if replacement is not None:
+                    quit_quietly(replacement)
+                replacement = driver_factory()
+                replacement.get(url)
+                automation.attach(replacement)
+        logger.error("🛑 Браузер не удалось восстановить; контрольная точка: %s", checkpoint.path)
+        automation.finish_run()
+        return checkpoint.position
+    finally:
+        if replacement is not None:
+            quit_quietly(replacement)
@@ -0,0 +1,205 @@
+"""
+Ожидание открытия игр без браузера.
+
+Доступность "Царя горы" и "Вопроса дня" проверяется легким GET запросом
+через requests.Session (соединения переиспользуются, куки берутся из
+браузера - см. export_cookies). Пока игра закрыта, проверки повторяются
+с экспоненциально растущей паузой и случайным отклонением. Chrome
+запускается только для открытой игры; после прохождения куки из браузера
+сохраняются для следующих проверок.
+
+Если проверка не дает ответа (нет сети, нет кук, сессия истекла),
+игра проходится в браузере как раньше - профиль браузера остается
+главным источником авторизации.
+
+Постоянная работа по расписанию с одним браузером на все прогоны - daemon.py.
+
+Запуск:
+    python scheduler.py
+    python scheduler.py --games king_of_the_hill --once
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import SCHEDULER
+from utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+OPEN, CLOSED, UNKNOWN = "open", "closed", "unknown"
+
+
+def load_cookies(session: requests.Session, filename: str = SCHEDULER["cookies_file"]) -> int:
+    """Загружает куки, выгруженные из браузера; возвращает их количество"""
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            cookies = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    for cookie in cookies:
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"),
+                            expires=cookie.get("expiry"))
+    return len(cookies)
+
+
+def authenticated(session: requests.Session, name: Optional[str] = SCHEDULER["session_cookie"]) -> bool:
+    """Есть ли в сессии непросроченная кука авторизации (name=None - любая непросроченная кука)"""
+    now = time.time()
+    cookies = [cookie for cookie in session.cookies if not cookie.is_expired(now)]
+    return any(cookie.name == name for cookie in cookies) if name else bool(cookies)
+
+
+def export_cookies(driver, filename: str = SCHEDULER["cookies_file"]):
+    """Сохраняет куки текущей страницы браузера для проверок без браузера"""
+    try:
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(driver.get_cookies(), f, ensure_ascii=False)
+    except Exception as e:
+        logger.warning("Куки не сохранены: %s", e)
+
+
+def create_session() -> requests.Session:
+    """Сессия с пулом соединений: повторные проверки не открывают новое TLS соединение"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    load_cookies(session)
+    return session
+
+
+def probe(session: requests.Session, url: str, marker: Optional[str]) -> str:
+    """open, closed или unknown (не удалось проверить, например истекла авторизация)"""
+    if not authenticated(session):
+        # Без кук сайт отдает страницу входа с ответом 200 и без marker - это не значит, что игра закрыта
+        return UNKNOWN
+    try:
+        response = session.get(url, timeout=SCHEDULER["request_timeout"])
+    except requests.RequestException as e:
+        logger.warning("Проверка %s не удалась: %s", url, e)
+        return UNKNOWN
+    if (response.status_code in (401, 403) or urlparse(response.url).netloc != urlparse(url).netloc
+            or not authenticated(session)):
+        # Перенаправление на вход: кукам из браузера нужно обновление
+        return UNKNOWN
+    if response.status_code != 200:
+        return CLOSED
+    return OPEN if marker is None or marker in response.text else CLOSED
+
+
+class Backoff:
+    """Экспоненциальная пауза с отклонением: initial * factor^попытка, не больше max_delay"""
+
+    def __init__(self, initial: float = SCHEDULER["initial_delay"], max_delay: float = SCHEDULER["max_delay"],
+                 factor: float = SCHEDULER["backoff_factor"], jitter: float = SCHEDULER["jitter"]):
+        self.initial = initial
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        delay = min(self.max_delay, self.initial * self.factor ** self.attempt)
+        self.attempt += 1
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+def play(game: str, url: str, browser=None, knowledge_base=None) -> bool:
+    """Проходит игру в браузере; True, если игра пройдена.
+
+    browser - daemon.WarmBrowser: прогон в уже запущенном браузере, без запуска Chrome
+    """
+    from browser import create_driver
+
+    try:
+        if browser is None:
+            with create_driver() as driver:
+                return play_in(driver, game, url, knowledge_base)
+        driver = browser.acquire()
+        try:
+            return play_in(driver, game, url, knowledge_base)
+        finally:
+            browser.release()
+    except Exception as e:
+        message = str(e).strip().splitlines()
+        logger.error("Ошибка при прохождении %s: %s: %s", game, type(e).__name__, message[0] if message else "")
+        return False
+
+
+def play_in(driver, game: str, url: str, knowledge_base=None) -> bool:
+    from browser import create_driver
+    from run_state import run_with_restarts
+    from test_automation import TestAutomation
+
+    driver.get(url)
+    automation = TestAutomation(driver, knowledge_base=knowledge_base)
+    try:
+        if game == "question_of_the_day":
+            return automation.run_question_of_the_day()
+        if not automation.start_every_day_quest():
+            return False
+        return run_with_restarts(automation, create_driver, url) > 0
+    finally:
+        export_cookies(driver)
+
+
+def run_scheduler(games: List[str], once: bool = False, deadline: float = SCHEDULER["deadline"],
+                  player: Callable[[str, str], bool] = play) -> Dict[str, bool]:
+    """Ждет открытия каждой игры и проходит ее через player(game, url); результат по каждой игре"""
+    session = create_session()
+    backoffs = {game: Backoff() for game in games}
+    next_check = {game: time.monotonic() for game in games}
+    results: Dict[str, bool] = {}
+    stop_at = time.monotonic() + deadline
+
+    while len(results) < len(games) and time.monotonic() < stop_at:
+        game = min((game for game in games if game not in results), key=next_check.get)
+        if next_check[game] > stop_at:
+            break
+        time.sleep(max(0.0, next_check[game] - time.monotonic()))
+
+        settings = SCHEDULER["games"][game]
+        state = probe(session, settings["url"], settings.get("marker"))
+        logger.info("🔎 %s: %s", game, state)
+        if state in (OPEN, UNKNOWN) and player(game, settings["url"]):
+            results[game] = True
+            # Куки из браузера обновлены - следующие проверки идут с ними
+            load_cookies(session)
+            continue
+
+        if once:
+            results[game] = False
+            continue
+        delay = backoffs[game].next_delay()
+        next_check[game] = time.monotonic() + delay
+        logger.info("⏳ %s: следующая проверка через %.1f мин", game, delay / 60)
+
+    for game in games:
+        results.setdefault(game, False)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", nargs="+", choices=list(SCHEDULER["games"]), default=list(SCHEDULER["games"]))
+    parser.add_argument("--once", action="store_true", help="Одна проверка без ожидания")
+    parser.add_argument("--deadline", type=float, default=SCHEDULER["deadline"], help="Сколько ждать, секунды")
+    args = parser.parse_args()
+
+    setup_logging()
+    results = run_scheduler(args.games, args.once, args.deadline)
+    for game, done in results.items():
+        print(f"{'✅' if done else '❌'} {game}")
+
+
+if __name__ == "__main__":
+    main()
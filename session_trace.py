@@ -0,0 +1,190 @@
+"""
+Запись прохождений в трассы и их воспроизведение без браузера.
+
+TraceRecorder пишет по строке JSON на каждый увиденный вопрос в сжатый
+файл traces/trace-<id>.jsonl.gz:
+
+    {"q": вопрос, "o": [варианты], "p": [план кликов], "c": [прошедшие клики],
+     "r": результат, "s": секунды на вопрос}
+
+Результат: submitted - ответ отправлен, complete - нажата "Завершить",
+no_options - не из чего выбирать, click_failed - клики не прошли,
+submit_failed - не удалось нажать кнопку после кликов.
+
+replay() прогоняет записанные вопросы через TestAutomation.choose_options
+(та же база ответов и OptionMatcher, что при живом прохождении) или через
+utils.find_best_match/validate_answers, с driver=None, и сравнивает решения
+с записанными. Так изменения поиска и сопоставления проверяются на корпусе
+реальных прохождений за секунды:
+
+    python session_trace.py traces/
+    python session_trace.py traces/ --path utils --show 20
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from config import TRACES
+from utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+
+
+class TraceRecorder:
+    def __init__(self, directory: str = TRACES["output_dir"], run_id: Optional[str] = None):
+        run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"trace-{run_id}.jsonl.gz")
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._write({"v": TRACE_VERSION, "run_id": run_id, "started": time.time()})
+
+    def record(self, question: str, options: List[str], plan: List[int], clicked: List[int],
+               outcome: str, seconds: float):
+        self._write({"q": question, "o": options, "p": plan, "c": clicked, "r": outcome, "s": round(seconds, 4)})
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            logger.info("🎞 Трасса прохождения сохранена в %s", self.path)
+
+    def _write(self, entry: dict):
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+class NullRecorder:
+    """Запись трасс выключена"""
+
+    def record(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+
+def create_recorder(enabled: bool = None, run_id: Optional[str] = None):
+    """TraceRecorder или NullRecorder в зависимости от config.TRACES["enabled"]"""
+    if enabled is None:
+        enabled = TRACES["enabled"]
+    return TraceRecorder(run_id=run_id) if enabled else NullRecorder()
+
+
+def trace_files(paths: List[str]) -> List[str]:
+    """Файлы трасс из списка файлов и каталогов"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.jsonl.gz")) + glob.glob(os.path.join(path, "*.jsonl")))
+        else:
+            files.append(path)
+    return files
+
+
+def read_trace(path: str) -> Iterator[dict]:
+    """Записи о вопросах из трассы; оборванный конец файла (прерванный прогон) пропускается"""
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if "q" in entry:
+                        yield entry
+    except (EOFError, gzip.BadGzipFile, json.JSONDecodeError) as e:
+        logger.warning("Трасса %s прочитана не полностью: %s", path, e)
+
+
+class ReplayJournal:
+    """Журнал неизвестных вопросов для воспроизведения: ничего не пишет на диск"""
+
+    path = "(replay)"
+
+    def __init__(self):
+        self.questions: List[str] = []
+
+    def record(self, question: str, options: List[str], match=None):
+        if match is None:
+            self.questions.append(question)
+
+
+class ReplayResult(NamedTuple):
+    observations: int
+    changed: List[dict]     # Записи, для которых решение отличается от записанного
+    unknown: int            # Вопросов, не найденных в базе
+    seconds: float          # Время только на решения
+
+    @property
+    def per_second(self) -> float:
+        return self.observations / self.seconds if self.seconds else 0.0
+
+
+def replay(entries: List[dict], path: str = "automation", knowledge_base=None) -> ReplayResult:
+    """Решения по записанным вопросам без браузера; path: automation или utils"""
+    from knowledge_base import KnowledgeBase
+    from run_history import NullHistory
+    from test_automation import TestAutomation
+    from utils import find_best_match, validate_answers
+
+    knowledge_base = knowledge_base if knowledge_base is not None else KnowledgeBase.load()
+    journal = ReplayJournal()
+    automation = TestAutomation(None, knowledge_base=knowledge_base, unknown_journal=journal,
+                                recorder=NullRecorder(), history=NullHistory())
+    questions = knowledge_base.questions
+
+    def decide_with_utils(question: str, options: List[str]) -> List[int]:
+        match = find_best_match(question, questions, knowledge_base.index)
+        if match is None:
+            journal.record(question, options)
+            return [0] if options else []
+        return [options.index(option) for option in validate_answers(question, questions[match], options)]
+
+    decide = automation.choose_options if path == "automation" else decide_with_utils
+    changed = []
+    # Решения пишут подробности в лог; при воспроизведении они не нужны
+    automation_logger = logging.getLogger(TestAutomation.__module__)
+    disabled, automation_logger.disabled = automation_logger.disabled, True
+    try:
+        started = time.perf_counter()
+        for entry in entries:
+            decision = decide(entry["q"], entry["o"])
+            if sorted(decision) != sorted(entry["p"]):
+                changed.append(dict(entry, new=decision))
+        seconds = time.perf_counter() - started
+    finally:
+        automation_logger.disabled = disabled
+    return ReplayResult(len(entries), changed, len(journal.questions), seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", default=[TRACES["output_dir"]], help="Файлы трасс или каталоги")
+    parser.add_argument("--path", choices=("automation", "utils"), default="automation",
+                        help="Через что принимать решения")
+    parser.add_argument("--show", type=int, default=10, help="Сколько изменившихся решений показать")
+    args = parser.parse_args()
+
+    setup_logging()
+    files = trace_files(args.paths)
+    entries = [entry for path in files for entry in read_trace(path)]
+    result = replay(entries, args.path)
+
+    print(f"Трасс: {len(files)}, вопросов: {result.observations}, не найдено в базе: {result.unknown}")
+    print(f"Решений в секунду: {result.per_second:,.0f} ({result.seconds:.2f} с)")
+    print(f"Решение изменилось: {len(result.changed)}")
+    outcomes: Dict[str, int] = {}
+    for entry in entries:
+        outcomes[entry.get("r")] = outcomes.get(entry.get("r"), 0) + 1
+    print("Записанные результаты: " + ", ".join(f"{outcome}={count}" for outcome, count in sorted(outcomes.items())))
+    for entry in result.changed[:args.show]:
+        print(f"  {entry['q']}: {entry['p']} -> {entry['new']} ({', '.join(entry['o'])})")
+
+
+if __name__ == "__main__":
+    main()
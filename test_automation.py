@@ -1,195 +1,407 @@
-import time
-import random
+import logging
+from typing import List, NamedTuple, Optional
+
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
+
+from knowledge_base import KnowledgeBase
+from unknown_journal import default_journal, question_hash
+from option_matcher import OptionMatcher
+from click_plan import ClickPlan, ClickResult, run_click_plan
+from page_snapshot import read_result, take_snapshot
+from locators import default_registry, element_visible
+from waits import PageWaiter, buttons_ready, question_changed, question_ready
+from instrumentation import create_metrics
+from session_trace import create_recorder
+from run_history import create_history
+from run_state import RunMachine
+from pacing import default_pacer
+from answer_service import create_knowledge_base
+from utils import log_context, new_run_id
+from config import ANSWER_SERVICE, WAIT_TIMEOUTS
 
-from questions import QUESTIONS_ANSWERS
-from config import RandomDelays, SELECTORS
+logger = logging.getLogger(__name__)
 
-DELAYS = RandomDelays()
+
+class Decision(NamedTuple):
+    indices: List[int]                  # Номера вариантов, которые нужно выбрать
+    expected: Optional[List[str]]       # Правильные ответы из базы; None - вопроса нет в базе
 
 
 class TestAutomation:
-    def __init__(self, driver):
-        self.driver = driver
-        self.wait = WebDriverWait(driver, 10)
-        self.questions_answers = QUESTIONS_ANSWERS
+    def __init__(self, driver, metrics=None, knowledge_base=None, unknown_journal=None, recorder=None,
+                 history=None, pacer=None):
+        # Часы и задержки темпа; с pacing.VirtualClock все ожидания идут в виртуальном времени
+        self.pacer = pacer or default_pacer()
+        self.clock = self.pacer.clock
+        # Замеры фаз и команд WebDriver; при выключенных замерах - пустая заглушка
+        self.metrics = metrics if metrics is not None else create_metrics()
+        # Идентификатор прогона в каждом событии лога; совпадает с run_id замеров, если они включены
+        self.run_id = getattr(self.metrics, "run_id", None) or new_run_id()
+        self.attach(driver)
+        # Собранная база ответов из всех источников (кэшируется и подхватывает правки)
+        # или общий сервис базы ответов (answer_service.py)
+        self.knowledge_base = knowledge_base if knowledge_base is not None else create_knowledge_base()
+        # Неизвестные вопросы пишутся фоновым потоком, без ожидания диска
+        self.unknown_journal = unknown_journal if unknown_journal is not None else default_journal()
+        self.option_matcher = OptionMatcher()
+        # Способы поиска элементов со статистикой (locators.py)
+        self.locators = default_registry()
+        # Трасса прохождения для воспроизведения без браузера (session_trace.py)
+        self.recorder = recorder if recorder is not None else create_recorder()
+        # История прохождений и статистика по вопросам (run_history.py)
+        self.history = history if history is not None else create_history()
+
+    def attach(self, driver):
+        """Работа с другим драйвером, например после перезапуска упавшего браузера"""
+        self.driver = self.metrics.instrument_driver(driver)
+        self.waiter = PageWaiter(driver, self.pacer)
+
+    @property
+    def questions_answers(self):
+        return self.knowledge_base.questions
+
+    @questions_answers.setter
+    def questions_answers(self, questions):
+        """Замена базы ответов готовым словарем; индекс строится один раз, а не на каждый вопрос"""
+        self.knowledge_base = KnowledgeBase.from_questions(questions)
 
     def start_every_day_quest(self):
-        """ Нажатие на 'Начать игру' """
+        """ Нажатие на 'Начать игру'. True, если игра запущена """
+        with self.metrics.span("start"):
+            return self._click_start_game()
+
+    def _click_start_game(self):
         try:
-            start_game = self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, SELECTORS['start_game']))
-            )
+            start_game = self.waiter.until("start_game", element_visible("start_game", self.locators))
 
             # Прокрутим до найденного элемента
             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", start_game)
-            time.sleep(DELAYS['scrol'])
 
             start_game.click()
-            print('🚀 Ракетка запущена...')
+            logger.info('🚀 Ракетка запущена...')
+            return True
         except TimeoutException:
-            print('🛑 Игра еще не доступна, побереги робота!')
+            logger.warning('🛑 Игра еще не доступна, побереги робота!')
+            return False
 
-    def get_current_question(self):
-        """Получает текущий вопрос со страницы"""
+    def get_page_snapshot(self):
+        """Снимок страницы: вопрос и варианты ответов за один запрос к браузеру"""
         try:
-            # TODO: проверить селектор
-            question_element = self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, SELECTORS['question']))
-            )
-            return question_element.text.strip()
+            # Ждем появления вопроса; каждая проверка - один execute_script
+            return self.waiter.wait(self._snapshot_with_question, WAIT_TIMEOUTS["next_question"])
         except TimeoutException:
-            print("🌚 Не удалось найти вопрос на странице")
+            logger.warning("🌚 Не удалось найти вопрос на странице")
             return None
 
+    @staticmethod
+    def _snapshot_with_question(driver):
+        """Условие ожидания: снимок, если вопрос уже на странице, иначе False"""
+        snapshot = take_snapshot(driver)
+        return snapshot if snapshot.question else False
+
+    def get_current_question(self):
+        """Получает текущий вопрос со страницы"""
+        snapshot = self.get_page_snapshot()
+        return snapshot.question if snapshot else None
+
     def get_answer_options(self):
         """Получает все варианты ответов со страницы"""
-        try:
-            answer_elements = self.driver.find_elements(By.XPATH, SELECTORS['answer_options'])
-            print([elem.text.strip() for elem in answer_elements if elem.text.strip()])
-            return [elem.text.strip() for elem in answer_elements if elem.text.strip()]
-        except NoSuchElementException:
-            print("🌚 Не удалось найти варианты ответов")
+        snapshot = self.get_page_snapshot()
+        if not snapshot or not snapshot.options:
+            logger.warning("🌚 Не удалось найти варианты ответов")
             return []
+        return snapshot.option_texts
 
-    def select_answer(self, answer_text):
+    def select_answer(self, answer_text, snapshot=None):
         """Выбирает ответ по тексту"""
-        try:
-            # Ищем span с нужным текстом
-            answer_spans = self.driver.find_elements(By.XPATH, SELECTORS['answer_options'])
-
-            for span in answer_spans:
-                print(span.text)
-                if span.text.strip() == answer_text:
-
-                    # Ищем родительский section с классом orange_color orange_bg для клика
-                    div = span.find_element(By.XPATH, "./../section[@class='orange_color orange_bg']/div")
-                    div.click()
-                    print(f"Выбран ответ: {answer_text}")
-                    return True
-
-            print(f"Ответ '{answer_text}' не найден на странице")
+        snapshot = snapshot or self.get_page_snapshot()
+        option = snapshot.find_option(answer_text) if snapshot else None
+        if option is None or option.target is None:
+            logger.warning("Ответ '%s' не найден на странице", answer_text)
             return False
 
+        try:
+            with self.metrics.span("click"):
+                option.target.click()
+            logger.debug("Выбран ответ: %s", answer_text)
+            return True
         except Exception as e:
-            print(f"Ошибка при выборе ответа '{answer_text}': {e}")
+            logger.error("Ошибка при выборе ответа '%s': %s", answer_text, e)
             return False
 
-    def answer_question(self, question_text):
-        """Отвечает на конкретный вопрос"""
-        if question_text not in self.questions_answers:
-            print(f"ಠ_ಠ Вопрос '{question_text}' | не найден в базе ответов")
+    def choose_options(self, question_text, option_texts):
+        """Решение без обращения к браузеру: номера вариантов, которые нужно выбрать"""
+        return self.decide(question_text, option_texts).indices
+
+    def decide(self, question_text, option_texts):
+        """Решение вместе с правильными ответами из базы (для истории прохождений)"""
+        with self.metrics.span("kb_lookup"):
+            match = self.knowledge_base.lookup(question_text)
+        if match is None:
+            logger.warning("ಠ_ಠ Вопрос '%s' | не найден в базе ответов", question_text)
             # Сохраняем неизвестный вопрос
-            self.save_unknown_question(question_text)
+            self.save_unknown_question(question_text, option_texts)
+
+            # выберем первый ответ для перехода к след вопросу:
+            return Decision([0] if option_texts else [], None)
+
+        correct_answers = self.knowledge_base.answers(match.question)
+        logger.info("Вопрос: %s", question_text)
+        if match.score < 1.0:
+            logger.info("≈ Найден похожий вопрос (%.2f): %s", match.score, match.question)
+            # Нечеткое совпадение отмечается в журнале, чтобы его можно было проверить
+            self.unknown_journal.record(question_text, option_texts, match)
+        logger.debug("Правильные ответы: %s", correct_answers)
+        logger.debug("Доступные ответы: %s", option_texts)
+
+        with self.metrics.span("option_extraction"):
+            selected = self.option_matcher.select(self.knowledge_base.answer_set(match.question), option_texts)
+        for option in selected:
+            if option.score < 1.0:
+                logger.info("≈ Вариант '%s' принят за '%s' (%.2f)", option.option, option.answer, option.score)
+        logger.info("Найдено на странице %d из %d правильных ответов", len(selected), len(correct_answers))
+        if not selected and option_texts:
+            # Ответы в базе разошлись с вариантами на сайте: вопрос отмечается как неизвестный,
+            # а прохождение идет дальше, как с вопросом не из базы
+            logger.warning("ಠ_ಠ Вопрос '%s' | ни один вариант не совпал с ответами из базы", question_text)
+            self.save_unknown_question(question_text, option_texts)
+            return Decision([0], correct_answers)
+        return Decision([option.index for option in selected], correct_answers)
+
+    def plan_answers(self, question_text, option_texts, submit=False):
+        """План кликов для вопроса; submit - сразу нажать "Ответить" """
+        return ClickPlan(self.choose_options(question_text, option_texts), submit)
+
+    def execute_plan(self, plan, snapshot):
+        """Выполняет план одним запросом к браузеру и проверяет результат"""
+        try:
+            with self.metrics.span("click"):
+                result = run_click_plan(self.driver, snapshot, plan, self.waiter.click_delays(len(plan.indices)))
+        except Exception as e:
+            logger.error("Ошибка при выборе ответов: %s", e)
+            return ClickResult([], None, str(e))
+
+        if logger.isEnabledFor(logging.DEBUG):
+            # Список выбранных вариантов собирается, только если он попадет в лог
+            logger.debug("Выбраны ответы: %s", [snapshot.options[index].text for index in result.clicked])
+        for index in set(plan.indices) - set(result.clicked):
+            logger.warning("Ответ '%s' не выбран", snapshot.options[index].text)
+        logger.info("Выбрано %d из %d ответов", len(result.clicked), len(plan.indices))
+        return result
+
+    def answer_question(self, question_text, snapshot=None):
+        """Отвечает на конкретный вопрос"""
+        snapshot = snapshot or self.get_page_snapshot()
+        if not snapshot:
+            return False
 
-            # выберем рандомный ответ для перехода к след вопросу:
-            parent_section = self.driver.find_element(By.XPATH, '//section[@class="orange_color orange_bg"]/div')
-            # print('Вариантов ответов: ', len(parent_section))
-            parent_section.click()
-            time.sleep(1)
+        plan = self.plan_answers(question_text, snapshot.option_texts)
+        if not plan.indices:
+            logger.warning("🌚 Не удалось найти варианты ответов")
+            return False
 
-            return True
+        return bool(self.execute_plan(plan, snapshot).clicked)
 
-        correct_answers = self.questions_answers[question_text]
-        print(f"Вопрос: {question_text}")
-        print(f"Правильные ответы: {correct_answers}")
+    def save_unknown_question(self, question_text, available_answers=None):
+        """Отмечает неизвестный вопрос и варианты ответов в журнале"""
+        # Варианты ответов со страницы, если их не передали из снимка
+        if available_answers is None:
+            available_answers = self.get_answer_options()
 
-        # Получаем варианты ответов со страницы
-        available_answers = self.get_answer_options()
-        print(f"Доступные ответы: {available_answers}")
+        self.unknown_journal.record(question_text, available_answers)
+        logger.info("🧷 Неизвестный вопрос отмечен в %s", self.unknown_journal.path)
 
-        # Выбираем правильные ответы
-        selected_count = 0
-        for correct_answer in correct_answers:
-            if correct_answer in available_answers:
-                if self.select_answer(correct_answer):
-                    selected_count += 1
-                    time.sleep(0.5)  # Небольшая пауза между кликами
+    def process_current_page(self):
+        """Обрабатывает текущую страницу с вопросом"""
+        snapshot = self.get_page_snapshot()
+        if snapshot:
+            return self.answer_question(snapshot.question, snapshot)
+        return False
 
-        print(f"Выбрано {selected_count} из {len(correct_answers)} правильных ответов")
-        return selected_count > 0
+    def submit_answers(self):
+        """Отправляет ответ кнопкой "Ответить" или завершает тест кнопкой "Завершить".
+
+        True - ответ отправлен, False - тест завершен, None - кнопку нажать не удалось
+        """
+        with self.metrics.span("submit"):
+            return self._submit_answers()
 
-    def save_unknown_question(self, question_text):
-        """Сохраняет неизвестный вопрос и варианты ответов в файл"""
+    def _submit_answers(self):
         try:
-            # Получаем варианты ответов со страницы
-            available_answers = self.get_answer_options()
+            # Ждем, пока на странице появится одна из кнопок
+            snapshot = self.waiter.until("buttons", buttons_ready)
+            if snapshot.submit_button:
+                snapshot.submit_button.click()
+                logger.info("✅ Ответ отправлен")
+                return True
+
+            snapshot.complete_button.click()
+            logger.info("🚀 Прохождение теста завершено")
+            return False
 
-            # Формируем строку для записи
-            question_line = f"{question_text}: {', '.join(available_answers)}\n"
+        except TimeoutException:
+            logger.warning("🌚 Не удалось найти кнопку отправки ответа")
+            return None
 
-            # Записываем в файл
-            with open("unknown_questions.txt", "a", encoding="utf-8") as f:
-                f.write(question_line)
+        except Exception as e:
+            logger.error("Ошибка при отправке ответов: %s", e)
+            return None
 
-            print(f"🧷 Неизвестный вопрос сохранен в unknown_questions.txt")
+    def wait_next_question(self, previous_question):
+        """Ждет смены вопроса после отправки ответа; None, если следующего вопроса нет"""
+        try:
+            with self.metrics.span("question_fetch"):
+                snapshot = self.waiter.until("next_question", question_changed(previous_question))
+        except TimeoutException:
+            return None
 
-        except Exception as e:
-            print(f"Ошибка при сохранении неизвестного вопроса: {e}")
+        if snapshot.question and snapshot.question != previous_question:
+            return snapshot
 
-    def process_current_page(self):
-        """Обрабатывает текущую страницу с вопросом"""
-        question = self.get_current_question()
-        if question:
-            return self.answer_question(question)
-        return False
+        # Нового вопроса нет, доступна только кнопка "Завершить"
+        snapshot.complete_button.click()
+        logger.info("🚀 Прохождение теста завершено")
+        return None
 
-    def submit_answers(self):
-        """Отправляет ответы (если есть кнопка отправки)"""
+    def run_automation(self, checkpoint=None):
+        """Основной метод для запуска автоматизации. Возвращает количество обработанных вопросов
+
+        checkpoint - run_state.Checkpoint, с которого продолжить прохождение. Если
+        браузер упал, поднимается run_state.BrowserLost (см. run_state.run_with_restarts).
+        """
+
+        # self.start_every_day_quest()
+        # Конечный автомат: ответ, отправка, ожидание следующего вопроса и
+        # восстановление после временных ошибок драйвера
+        with log_context(run_id=self.run_id):
+            questions_count = RunMachine(self, checkpoint).run()
+            self.finish_run()
+        return questions_count
+
+    def finish_run(self, export_metrics=True):
+        """Итоги прогона: экономия на ожиданиях, замеры, трасса и история
+
+        export_metrics=False - замеры общие с другими прогонами (вкладки multitab.py) и выгружаются отдельно
+        """
+        logger.info("⏱ Сэкономлено на ожиданиях: %.1f с", self.waiter.saved_seconds)
+        if export_metrics:
+            self.metrics.export()
+        self.recorder.close()
+        self.history.finish_run()
+        self.save_locator_stats()
+
+    def save_locator_stats(self):
+        """Сохраняет статистику локаторов и предупреждает о сломанных и медленных селекторах"""
+        for problem in self.locators.problems():
+            logger.warning("⚠ Локатор %s", problem)
         try:
-            # Ищем кнопку отправки
-            submit_button = self.driver.find_element(By.XPATH, SELECTORS["submit_button"])
-            submit_button.click()
-            print("✅ Ответ отправлен")
-            time.sleep(2)  # Ждем загрузки следующей страницы
-            return True
+            self.locators.save()
+        except OSError as e:
+            logger.error("Статистика локаторов не сохранена: %s", e)
 
-        except NoSuchElementException:
-            time.sleep(2)
-            complete_button = self.driver.find_element(By.XPATH, SELECTORS["complete_button"])
-            complete_button.click()
-            print("🚀 Прохождение теста завершено ")
-            return False
+    def run_question_of_the_day(self):
+        """Вопрос дня: один вопрос без перехода к следующему. True, если ответ отправлен"""
+        with log_context(run_id=self.run_id):
+            return self._run_question_of_the_day()
 
-        except Exception as e:
-            print(f"Ошибка при отправке ответов: {e}")
-            return False
+    def _run_question_of_the_day(self):
+        # Кнопка "Вопрос дня", если вопрос открывается с общей страницы
+        button = self.locators.resolve(self.driver, ["question_of_the_day"])["question_of_the_day"]
+        if button:
+            button.click()
 
-    def run_automation(self):
-        """Основной метод для запуска автоматизации"""
+        try:
+            with self.metrics.span("question_fetch"):
+                snapshot = self.waiter.until("first_question", question_ready)
+        except TimeoutException:
+            logger.warning("🌚 Вопрос дня не найден на странице")
+            return False
 
-        # self.start_every_day_quest()
-        time.sleep(8)
-        # try:
-        while True:
-            # Обрабатываем текущую страницу
-            if not self.process_current_page():
-                print("Не удалось обработать текущую страницу")
-                break
-
-            # Небольшая пауза
-            time.sleep(1)
-
-            # Пытаемся отправить ответы, если кнопки ответить нет, есть 'завершить тест'
-            if not self.submit_answers():
-                complete_button = self.driver.find_element(By.XPATH, SELECTORS["complete_button"])
-                complete_button.click()
-                break
-
-            # Проверяем, есть ли еще вопросы
-            try:
-                next_question = self.get_current_question()
-                if not next_question:
-
-                    print("🏁 Прохождение теста завершено")
-                    break
-            except:
-                print("🏁 Прохождение теста завершено")
-                break
-
-        # except Exception as e:
-        #     print(f"Ошибка во время автоматизации: {e}")
\ No newline at end of file
+        with self.metrics.span("question"):
+            started = self.clock.now()
+            decision = self.decide(snapshot.question, snapshot.option_texts)
+            plan = ClickPlan(decision.indices, submit=True)
+            result = self.execute_plan(plan, snapshot) if plan.indices else ClickResult([])
+            sent = result.action is not None
+            if sent:
+                self.learn_result(snapshot, decision)
+            self._record(snapshot, decision, result.clicked, "submitted" if sent else "click_failed", started)
+
+        if sent:
+            logger.info("✅ Вопрос дня: ответ отправлен")
+        else:
+            logger.warning("🌚 Вопрос дня: ответ не отправлен")
+        self.metrics.export()
+        self.recorder.close()
+        self.history.finish_run()
+        self.save_locator_stats()
+        return sent
+
+    def answer_snapshot(self, snapshot):
+        """Ответ на вопрос снимка с отправкой.
+
+        Исход: submitted - ответ отправлен, complete - нажата "Завершить",
+        no_options, click_failed, submit_failed - страницу нужно перечитать.
+        """
+        with log_context(question_id=question_hash(snapshot.question)):
+            return self._answer_snapshot(snapshot)
+
+    def _answer_snapshot(self, snapshot):
+        started = self.clock.now()
+        # Выбор ответов и кнопка "Ответить" (или "Завершить") одним скриптом в браузере
+        decision = self.decide(snapshot.question, snapshot.option_texts)
+        if not decision.indices:
+            logger.warning("🌚 Не удалось найти варианты ответов")
+            self._record(snapshot, decision, [], "no_options", started)
+            return "no_options"
+
+        # После сбоя (клики прерваны, кнопка не нажата) часть вариантов уже выбрана: повторный
+        # клик снял бы выбор, поэтому кликаются только невыбранные, а если выбраны все - сразу отправка
+        selected = [index for index in decision.indices if snapshot.options[index].selected]
+        plan = ClickPlan([index for index in decision.indices if index not in selected], submit=True)
+        if selected:
+            logger.info("↩ Уже выбрано %d из %d ответов", len(selected), len(decision.indices))
+
+        result = self.execute_plan(plan, snapshot)
+        if plan.indices and not result.clicked:
+            logger.warning("Не удалось обработать текущую страницу")
+            self._record(snapshot, decision, selected, "click_failed", started)
+            return "click_failed"
+        clicked = selected + result.clicked
+
+        if result.action == "submit":
+            outcome = "submitted"
+            logger.info("✅ Ответ отправлен")
+        elif result.action == "complete":
+            outcome = "complete"
+            logger.info("🚀 Прохождение теста завершено")
+        else:
+            # Ни одна кнопка не появилась за WAIT_TIMEOUTS["buttons"]
+            outcome = "submit_failed"
+            logger.warning("🌚 Не удалось найти кнопку отправки ответа")
+        if outcome in ("submitted", "complete"):
+            # Отметки правильных ответов на странице относятся к этому вопросу, только если ответ отправлен
+            self.learn_result(snapshot, decision)
+        self._record(snapshot, decision, clicked, outcome, started)
+        return outcome
+
+    def learn_result(self, snapshot, decision):
+        """Правильные ответы, которые сайт показал после отправки, записываются в базу (и сервис ответов)"""
+        selector = ANSWER_SERVICE["result_selector"]
+        if not selector:
+            return
+        try:
+            correct = self.waiter.wait(lambda driver: read_result(driver, selector), ANSWER_SERVICE["result_timeout"])
+        except TimeoutException:
+            return
+        except Exception as e:
+            logger.warning("Результат ответа не прочитан: %s", e)
+            return
+        if set(correct) != set(decision.expected or []) and self.knowledge_base.learn(snapshot.question, correct):
+            logger.info("🎓 Запомнены правильные ответы: %s", correct)
+
+    def _record(self, snapshot, decision, clicked, outcome, started):
+        seconds = self.clock.now() - started
+        self.recorder.record(snapshot.question, snapshot.option_texts, decision.indices, clicked, outcome, seconds)
+        self.history.record(snapshot.question, snapshot.option_texts, clicked, decision.expected, outcome, seconds)
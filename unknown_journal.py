@@ -0,0 +1,222 @@
+"""
+Журнал неизвестных вопросов.
+
+Каждый вопрос, которого нет в базе ответов, хранится одной записью JSONL:
+вопрос, варианты ответов со страницы, сколько раз встречался, когда впервые
+и когда последний раз. Записи дедуплицируются по хэшу нормализованного
+вопроса, поэтому файл растет только с числом разных вопросов, а не прогонов.
+Вопросы, найденные в базе только нечетко (похожесть ниже 1.0), тоже попадают
+в журнал с полем "fuzzy": вопрос из базы и похожесть, чтобы совпадение можно
+было проверить.
+
+record() только кладет событие в очередь; чтение и перезапись файла делает
+фоновый поток пачками, раз в flush_interval. Перечитывание и замена файла
+идут под межпроцессной блокировкой (файл <журнал>.lock), и к файлу
+применяются только новые события этого процесса, поэтому несколько процессов
+(например, исполнители pool_runner) могут вести один журнал, не теряя
+событий друг друга.
+
+Список самых частых неизвестных вопросов:
+    python unknown_journal.py --top 20
+"""
+
+import argparse
+import atexit
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import UNKNOWN_JOURNAL
+from question_index import QuestionMatch
+from utils import canonical_text
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def question_hash(question: str) -> str:
+    """Ключ дедупликации: хэш нормализованного текста вопроса"""
+    return hashlib.sha1(canonical_text(question).encode("utf-8")).hexdigest()[:16]
+
+
+def read_journal(path: str) -> Dict[str, dict]:
+    """Записи журнала по хэшу вопроса"""
+    records = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["hash"]] = record
+    except FileNotFoundError:
+        pass
+    return records
+
+
+@contextlib.contextmanager
+def _locked(path: str):
+    """Межпроцессная блокировка журнала (файл path.lock) на время перечитывания и замены"""
+    with open(f"{path}.lock", "a+b") as lock:
+        if os.name == "nt":
+            lock.seek(0)
+            while True:
+                try:
+                    # LK_LOCK ждет блокировку около 10 секунд, затем поднимает OSError
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def _replace(source: str, target: str, attempts: int = 10):
+    """os.replace с повторами: в Windows файл нельзя заменить, пока другой процесс держит его открытым"""
+    for attempt in range(attempts):
+        try:
+            os.replace(source, target)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+class UnknownJournal:
+    def __init__(self, path: str = UNKNOWN_JOURNAL["path"], flush_interval: float = UNKNOWN_JOURNAL["flush_interval"]):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._pending: Dict[str, dict] = {}     # Еще не записанные изменения: хэш -> запись с приращением count
+        self._thread = threading.Thread(target=self._writer, name="unknown-journal", daemon=True)
+        self._thread.start()
+
+    def record(self, question: str, options: List[str], match: Optional[QuestionMatch] = None):
+        """Отмечает неизвестный вопрос (или нечеткое совпадение match); не ждет диска"""
+        fuzzy = {"question": match.question, "score": round(match.score, 3)} if match else None
+        self._queue.put((question, list(options), fuzzy, time.time()))
+
+    def flush(self, timeout: Optional[float] = None):
+        """Дожидается записи всех отмеченных вопросов"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _writer(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is None or item is _STOP or isinstance(item, threading.Event):
+                self._write_pending()
+                next_flush = time.monotonic() + self.flush_interval
+                if isinstance(item, threading.Event):
+                    item.set()
+                if item is _STOP:
+                    return
+                continue
+
+            question, options, fuzzy, seen = item
+            key = question_hash(question)
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = {"hash": key, "question": question, "options": options,
+                                                "count": 1, "first_seen": seen, "last_seen": seen}
+            else:
+                pending["count"] += 1
+                pending["options"] = options
+                pending["last_seen"] = seen
+            if fuzzy:
+                pending["fuzzy"] = fuzzy
+            else:
+                pending.pop("fuzzy", None)
+
+    def _write_pending(self):
+        """Под блокировкой перечитывает журнал, добавляет новые события и атомарно заменяет файл"""
+        if not self._pending:
+            return
+        try:
+            with _locked(self.path):
+                records = read_journal(self.path)
+                for key, pending in self._pending.items():
+                    record = records.get(key)
+                    if record is None:
+                        records[key] = dict(pending)
+                    else:
+                        record["count"] += pending["count"]
+                        record["options"] = pending["options"]
+                        if "fuzzy" in pending:
+                            record["fuzzy"] = pending["fuzzy"]
+                        else:
+                            record.pop("fuzzy", None)
+                        record["first_seen"] = min(record["first_seen"], pending["first_seen"])
+                        record["last_seen"] = max(record["last_seen"], pending["last_seen"])
+
+                temporary = f"{self.path}.{os.getpid()}.tmp"
+                with open(temporary, "w", encoding="utf-8") as f:
+                    for record in records.values():
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                _replace(temporary, self.path)
+            self._pending.clear()
+        except Exception as e:
+            logger.error("Ошибка при сохранении неизвестных вопросов: %s", e)
+
+
+_journal: Optional[UnknownJournal] = None
+
+
+def default_journal() -> UnknownJournal:
+    """Общий журнал процесса; при выходе из процесса записывается все, что осталось в очереди"""
+    global _journal
+    if _journal is None:
+        _journal = UnknownJournal()
+        atexit.register(_journal.close)
+    return _journal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=UNKNOWN_JOURNAL["path"])
+    parser.add_argument("--top", type=int, default=20, help="Сколько самых частых вопросов показать")
+    args = parser.parse_args()
+
+    records = sorted(read_journal(args.path).values(), key=lambda record: record["count"], reverse=True)
+    fuzzy = sum("fuzzy" in record for record in records)
+    print(f"Неизвестных вопросов: {len(records) - fuzzy}, нечетких совпадений: {fuzzy}")
+    for record in records[:args.top]:
+        last_seen = time.strftime("%Y-%m-%d %H:%M", time.localtime(record["last_seen"]))
+        print(f"[{record['count']:>4}] {last_seen}  {record['question']}: {', '.join(record['options'])}")
+        if "fuzzy" in record:
+            print(f"       ≈ {record['fuzzy']['question']} ({record['fuzzy']['score']:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,120 @@
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import re
+import time
 from typing import List, Dict, Optional
-from config import LOGGING
+from config import LOGGING, MATCHING
 
+# Всё, кроме букв, цифр и пробелов: пунктуация, кавычки «», "", тире и т.д.
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
 
-def setup_logging():
-    """Настройка логирования"""
-    logging.basicConfig(
-        level=getattr(logging, LOGGING["level"]),
-        format=LOGGING["format"]
-    )
+# Поля контекста каждого события лога: прогон, исполнитель (аккаунт, вкладка), вопрос
+_log_context = contextvars.ContextVar("log_context", default={})
+_log_defaults = {"run_id": "-", "worker": str(os.getpid()), "question_id": "-"}
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+# Атрибуты, которые есть у любой записи лога; остальные - поля из extra=
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+def set_log_defaults(**fields):
+    """Поля контекста для всего процесса, например worker="account-1" в pool_runner"""
+    _log_defaults.update(fields)
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """Поля контекста для событий внутри блока: with log_context(run_id=..., question_id=...)"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def new_run_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи поля контекста; выполняется в потоке, который пишет в лог"""
+
+    def filter(self, record):
+        context = _log_context.get()
+        for key, default in _log_defaults.items():
+            if not hasattr(record, key):
+                setattr(record, key, context.get(key, default))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Событие - одна строка JSON: время, уровень, сообщение, поля контекста и extra="""
+
+    def format(self, record):
+        event = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        event.update((key, value) for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            event["exception"] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Кладет запись в очередь как есть: сообщение форматируется в потоке QueueListener"""
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Очередь переполнена (диск или консоль не успевают): событие теряется, прохождение не ждет
+            pass
+
+
+def setup_logging(level: str = None, json_output: bool = None, filename: str = None):
+    """Настройка логирования: события уходят в очередь, запись в консоль или файл - в отдельном потоке.
+
+    Повторный вызов ничего не меняет. filename может содержать {worker} - свой файл на исполнителя
+    """
+    global _log_listener
+    if _log_listener is None:
+        level = level or LOGGING["level"]
+        json_output = LOGGING["json"] if json_output is None else json_output
+        filename = filename or LOGGING["file"]
+
+        if filename:
+            filename = filename.format(worker=_log_defaults["worker"], pid=os.getpid())
+            directory = os.path.dirname(filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            output = logging.FileHandler(filename, encoding="utf-8")
+        else:
+            output = logging.StreamHandler()
+        output.setFormatter(JsonFormatter() if json_output else logging.Formatter(LOGGING["format"]))
+
+        records = queue.Queue(LOGGING["queue_size"])
+        handler = _DeferredQueueHandler(records)
+        handler.addFilter(ContextFilter())
+        root = logging.getLogger()
+        root.setLevel(getattr(logging, level))
+        root.addHandler(handler)
+
+        _log_listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
     return logging.getLogger(__name__)
 
 
@@ -17,41 +123,41 @@ def normalize_text(text: str) -> str:
     return " ".join(text.strip().lower().split())
 
 
-def find_best_match(question_text: str, questions_dict: Dict[str, List[str]]) -> Optional[str]:
-    """Находит наиболее подходящий вопрос в словаре по тексту"""
-    normalized_input = normalize_text(question_text)
-    
-    best_match = None
-    best_score = 0
-    
-    for question in questions_dict.keys():
-        normalized_question = normalize_text(question)
-        
-        # Простое сравнение по включению
-        if normalized_input in normalized_question or normalized_question in normalized_input:
-            score = len(set(normalized_input.split()) & set(normalized_question.split()))
-            if score > best_score:
-                best_score = score
-                best_match = question
-    
-    return best_match
+def canonical_text(text: str) -> str:
+    """Каноническая форма текста для нечеткого сравнения (регистр, ё/е, пунктуация, кавычки, пробелы)"""
+    text = text.lower().replace("ё", "е")
+    return " ".join(_PUNCTUATION_RE.sub(" ", text).split())
+
+
+def find_best_match(question_text: str, questions_dict: Dict[str, List[str]], index=None) -> Optional[str]:
+    """Находит наиболее подходящий вопрос в словаре по тексту
+
+    index - готовый QuestionIndex по questions_dict (например, KnowledgeBase.index, который база
+    обновляет вместе со словарем); без него индекс строится по словарю на каждый вызов
+    """
+    if index is None:
+        from question_index import QuestionIndex
+
+        index = QuestionIndex(questions_dict, MATCHING["question_threshold"])
+
+    match = index.lookup(question_text)
+    return match.question if match else None
 
 
 def validate_answers(question: str, answers: List[str], available_options: List[str]) -> List[str]:
     """Проверяет, какие из правильных ответов доступны на странице"""
-    valid_answers = []
-    
-    for answer in answers:
-        normalized_answer = normalize_text(answer)
-        
-        for option in available_options:
-            normalized_option = normalize_text(option)
-            
-            if normalized_answer == normalized_option:
-                valid_answers.append(option)
-                break
-    
-    return valid_answers
+    from option_matcher import OptionMatcher
+
+    matches = OptionMatcher().select(_answer_set(tuple(answers)), available_options)
+    return [match.option for match in sorted(matches, key=lambda match: answers.index(match.answer))]
+
+
+@functools.lru_cache(maxsize=1024)
+def _answer_set(answers):
+    """Канонические формы ответов считаются один раз на набор ответов"""
+    from option_matcher import AnswerSet
+
+    return AnswerSet(answers)
 
 
 def format_question_display(question: str, max_length: int = 80) -> str:
@@ -85,6 +191,22 @@ def save_results(results: Dict[str, bool], filename: str = "test_results.txt"):
         print(f"Ошибка при сохранении результатов: {e}")
 
 
+def parse_question_line(line: str):
+    """
+    Разбирает строку "вопрос: ответ1, ответ2".
+    Если в вопросе есть двоеточие, разделителем считается "?:" после вопроса.
+    Если ответы содержат запятые, их можно разделять символом "|": "вопрос: ответ, с запятой | ответ2"
+    """
+    question, separator, answers = line.partition('?:')
+    if separator:
+        question += '?'
+    else:
+        question, _, answers = line.partition(':')
+
+    delimiter = '|' if '|' in answers else ','
+    return question.strip(), [answer.strip() for answer in answers.split(delimiter) if answer.strip()]
+
+
 def load_custom_questions(filename: str) -> Dict[str, List[str]]:
     """Загружает вопросы из внешнего файла"""
     try:
@@ -97,9 +219,7 @@ def load_custom_questions(filename: str) -> Dict[str, List[str]]:
         
         for line in lines:
             if ':' in line and not line.startswith('#'):
-                parts = line.split(':', 1)
-                question = parts[0].strip()
-                answers = [ans.strip() for ans in parts[1].split(',')]
+                question, answers = parse_question_line(line)
                 questions[question] = answers
         
         return questions
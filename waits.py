@@ -0,0 +1,119 @@
+"""
+Ожидания по событиям на странице вместо фиксированных пауз.
+
+Каждый шаг ждет конкретного изменения DOM (появился вопрос, сменился вопрос,
+стала доступна кнопка) и продолжает работу сразу, как только оно произошло.
+PageWaiter также считает, сколько времени сэкономлено по сравнению
+с прежними фиксированными паузами.
+
+Время и паузы берутся из часов Pacer (pacing.py): с VirtualClock опрос
+страницы, таймауты и человекоподобные паузы идут в виртуальном времени.
+"""
+
+from typing import Dict
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+from config import WAIT_POLL_INTERVAL, WAIT_TIMEOUTS
+from page_snapshot import take_snapshot
+from pacing import default_pacer
+
+# Фиксированные паузы прежней версии run_automation для отчета об экономии
+LEGACY_SLEEPS = {
+    "first_question": 8.0,  # time.sleep(8) перед началом
+    "buttons": 1.0,         # time.sleep(1) перед отправкой ответа
+    "next_question": 2.0,   # time.sleep(2) после нажатия "Ответить"
+    "after_click": 0.5,     # time.sleep(0.5) между кликами по ответам
+    "start_game": 2.0,      # DELAYS['scrol'] перед кликом по "Начать игру" (в среднем)
+}
+
+# Какая из задержек config.PACING задает темп шага при HUMAN_PACING
+PACING_DELAYS = {
+    "first_question": "page_load",
+    "buttons": "between_clicks",
+    "next_question": "after_submit",
+    "after_click": "between_clicks",
+    "start_game": "scrol",
+}
+
+
+def question_ready(driver):
+    """Снимок страницы, как только на ней есть вопрос"""
+    snapshot = take_snapshot(driver)
+    return snapshot if snapshot.question else False
+
+
+def buttons_ready(driver):
+    """Снимок страницы, как только видна кнопка "Ответить" или "Завершить" """
+    snapshot = take_snapshot(driver)
+    return snapshot if snapshot.submit_button or snapshot.complete_button else False
+
+
+def question_changed(previous_question):
+    """Снимок страницы, как только вопрос сменился или тест можно завершить"""
+    def condition(driver):
+        snapshot = take_snapshot(driver)
+        if snapshot.question and snapshot.question != previous_question:
+            return snapshot
+        if snapshot.complete_button and not snapshot.submit_button:
+            return snapshot
+        return False
+    return condition
+
+
+class PageWaiter:
+    def __init__(self, driver, pacer=None):
+        self.driver = driver
+        self.pacer = pacer or default_pacer()
+        self.clock = self.pacer.clock
+        self.saved_seconds = 0.0
+        self.waited: Dict[str, float] = {}
+
+    def wait(self, condition, timeout):
+        """Опрашивает условие, пока оно не вернет истинное значение; TimeoutException через timeout секунд"""
+        deadline = self.clock.now() + timeout
+        while True:
+            try:
+                value = condition(self.driver)
+                if value:
+                    return value
+            except NoSuchElementException:
+                pass
+            if self.clock.now() >= deadline:
+                raise TimeoutException(f"Условие не выполнено за {timeout} с")
+            self.clock.sleep(WAIT_POLL_INTERVAL)
+
+    def until(self, step, condition):
+        """Ждет выполнения условия не дольше таймаута шага; TimeoutException, если не дождались"""
+        started = self.clock.now()
+        try:
+            return self.wait(condition, WAIT_TIMEOUTS[step])
+        finally:
+            self.pace(step, started)
+            self.record(step, started)
+
+    def skip(self, step):
+        """Шаг, для которого раньше была фиксированная пауза, а теперь ждать нечего"""
+        started = self.clock.now()
+        self.pace(step, started)
+        self.record(step, started)
+
+    def click_delays(self, count):
+        """Паузы после каждого из count кликов для выполнения в браузере (см. click_plan)"""
+        key = PACING_DELAYS["after_click"]
+        delays = [self.pacer.delay(key) if self.pacer.enabled else 0.0 for _ in range(count)]
+        for delay in delays:
+            self.waited["after_click"] = self.waited.get("after_click", 0.0) + delay
+            self.saved_seconds += LEGACY_SLEEPS["after_click"] - delay
+        return delays
+
+    def record(self, step, started):
+        """Учитывает фактическое время шага против прежней фиксированной паузы"""
+        elapsed = self.clock.now() - started
+        self.waited[step] = self.waited.get(step, 0.0) + elapsed
+        self.saved_seconds += LEGACY_SLEEPS.get(step, 0.0) - elapsed
+
+    def pace(self, step, started=None):
+        """Человекоподобная пауза: добирает время шага до случайной задержки, если темп включен"""
+        elapsed = 0.0 if started is None else self.clock.now() - started
+        self.pacer.pause(PACING_DELAYS.get(step, step), elapsed)